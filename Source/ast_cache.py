@@ -0,0 +1,175 @@
+#######################################
+# AST CACHE
+#######################################
+
+import gc
+import hashlib
+import os
+import pickle
+import stat
+import sys
+
+import lexer
+import parser
+import parse_result
+import nodes
+import tokens
+import position
+import xml_doc_parser
+from lexer import Lexer
+from parser import Parser
+from token_stream import TokenStream
+
+CACHE_FORMAT = b'jcache 2'
+
+# Every module that decides what a parsed tree looks like: a change to
+# any of them, or a different Python, makes every cached tree stale
+PARSER_MODULES = (lexer, parser, parse_result, nodes, tokens, position, xml_doc_parser)
+
+parser_fingerprint = None
+
+def get_parser_fingerprint():
+  global parser_fingerprint
+  if parser_fingerprint is None:
+    digest = hashlib.sha256(CACHE_FORMAT)
+    digest.update(sys.implementation.cache_tag.encode())
+    for module in PARSER_MODULES:
+      with open(module.__file__, 'rb') as file:
+        digest.update(file.read())
+    parser_fingerprint = digest.digest()
+  return parser_fingerprint
+
+def cache_directory():
+  """The current user's cache directory: $JCODE_CACHE_DIR, else jcode under their cache home."""
+  directory = os.environ.get('JCODE_CACHE_DIR')
+  if directory: return directory
+  if os.name == 'nt':
+    home = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+  else:
+    home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+  return os.path.join(home, 'jcode')
+
+def cache_path(filename, lazy=False):
+  """Where the tree of `filename` is cached: <name>-<hash of its path>.ast in cache_directory() (.lazy.ast for lazy trees)."""
+  path = os.path.abspath(filename)
+  path_hash = hashlib.sha256(path.encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+  return os.path.join(cache_directory(), f'{os.path.basename(path)}-{path_hash}' + ('.lazy.ast' if lazy else '.ast'))
+
+def cache_header(key):
+  return CACHE_FORMAT + b' ' + key.encode('ascii') + b'\n'
+
+def is_private(status):
+  """Whether only the current user can have written the file `status` describes."""
+  # Windows has no uids; the cache directory is under the user's own profile
+  if not hasattr(os, 'getuid'): return True
+  return status.st_uid == os.getuid() and not status.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def cache_key(filename, text, lazy=False):
+  # The filename is part of the tree (every position names its file)
+  digest = hashlib.sha256(get_parser_fingerprint())
+  if lazy: digest.update(b'lazy\0')
+  digest.update(filename.encode('utf-8', 'surrogatepass') + b'\0')
+  digest.update(text.encode('utf-8', 'surrogatepass'))
+  return digest.hexdigest()
+
+def parse(filename, text, lazy=False):
+  """
+  Lexes and parses `text`, returning (node, error). With `lazy`, function
+  and method bodies are parsed on their first call (see Parser.lazy_body).
+  """
+  source_lexer = Lexer(filename, text)
+  if lazy:
+    # Skipping a body looks ahead to its end, so every token is needed at once
+    token_list = list(source_lexer.generate_tokens())
+    if source_lexer.error: return None, source_lexer.error
+    ast = Parser(token_list, lazy_bodies=True).parse()
+    if ast.error: return None, ast.error
+    return ast.node, None
+
+  # The parser pulls tokens as the lexer produces them
+  token_stream = TokenStream(source_lexer.generate_tokens())
+  ast = Parser(token_stream).parse()
+
+  # A lexing error anywhere in the file is reported ahead of a syntax error
+  token_stream.drain()
+  if source_lexer.error: return None, source_lexer.error
+  if ast.error: return None, ast.error
+  return ast.node, None
+
+def load(path, key):
+  """Returns the tree cached at `path` if it was stored under `key`, else None."""
+  # Unpickling runs whatever code the file asks for, so a file is only
+  # unpickled once it is known to be the current user's, for this text
+  header = cache_header(key)
+  try:
+    descriptor = os.open(path, os.O_RDONLY | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_BINARY', 0))
+    with os.fdopen(descriptor, 'rb') as file:
+      if not stat.S_ISREG(os.fstat(descriptor).st_mode) or not is_private(os.fstat(descriptor)): return None
+      if not is_private(os.stat(os.path.dirname(path))): return None
+      if file.read(len(header)) != header: return None
+
+      # Loading only makes new objects, none of them garbage: collecting
+      # while they are made would take longer than the load itself
+      gc_was_enabled = gc.isenabled()
+      gc.disable()
+      try:
+        return pickle.load(file)
+      finally:
+        if gc_was_enabled: gc.enable()
+  except Exception:
+    # Missing, truncated or unreadable: parse the file again
+    return None
+
+def store(path, key, node):
+  temporary_path = f'{path}.{os.getpid()}.tmp'
+  try:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    # A directory someone else could write to would hand load() their files
+    if not is_private(os.stat(directory)): return
+
+    descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o600)
+    with os.fdopen(descriptor, 'wb') as file:
+      file.write(cache_header(key))
+      pickle.dump(node, file, pickle.HIGHEST_PROTOCOL)
+    # Readers see either the old cache file or the complete new one
+    os.replace(temporary_path, path)
+  except (OSError, pickle.PicklingError, RecursionError):
+    # A read-only directory or a tree too deep to pickle just isn't cached
+    try:
+      os.remove(temporary_path)
+    except OSError:
+      pass
+
+def parse_source(filename, text, use_cache=True, jobs=1, lazy=False):
+  """
+  Parses `text`, the contents of `filename`, returning (node, error).
+
+  The tree of a file on disk is cached in the current user's cache
+  directory (see cache_directory), keyed by a hash of the text, the
+  filename and the parser's own source. A cached tree is used only if all
+  three match and only the user can have written it; programs with errors
+  are never cached. With `jobs` other than 1, a file that isn't cached is
+  parsed across that many processes (see parallel_parser.parse). With
+  `lazy`, function bodies are left to their first call and a syntax error
+  in one is only reported then; a lazy parse runs in one process.
+  """
+  if lazy:
+    parse_text = lambda filename, text: parse(filename, text, lazy=True)
+  elif jobs == 1:
+    parse_text = parse
+  else:
+    import parallel_parser
+    parse_text = lambda filename, text: parallel_parser.parse(filename, text, jobs)
+
+  if not use_cache or not os.path.isfile(filename):
+    return parse_text(filename, text)
+
+  path = cache_path(filename, lazy)
+  key = cache_key(filename, text, lazy)
+  node = load(path, key)
+  if node is not None: return node, None
+
+  node, error = parse_text(filename, text)
+  if not error: store(path, key, node)
+  return node, error
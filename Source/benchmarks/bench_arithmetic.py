@@ -0,0 +1,101 @@
+#######################################
+# ARITHMETIC BENCHMARK
+#######################################
+# Runs arithmetic-heavy loops under each engine and reports the time per
+# binary operation. The workloads follow the `for i = 0 to len` loops in
+# Source/code/example.jcode: counting loops whose bodies are dominated by
+# +, -, *, / and comparisons on numbers, plus string concatenation.
+#
+#   python benchmarks/bench_arithmetic.py [--repeat N]
+
+import argparse
+
+from bench_utils import parse_program, silenced, best_time, print_table
+
+import main
+from context import Context
+from interpreter import Interpreter
+from nodes import BinaryOperationNode
+
+NUMBER_PROGRAM = '''
+func crunch(int n) {
+    var total: 0
+    var last: n - 1
+    for i = 0 to n {
+        var total: total + i * 3 - i / 2
+        if i != last: var total: total - 1
+        if total > 100000: var total: total - 100000
+    }
+    return total
+}
+
+print(crunch(20000))
+'''
+
+STRING_PROGRAM = '''
+func join(list elements, string separator) {
+    var result: ""
+    var count: len(elements)
+    for i = 0 to count {
+        var result: result + elements[i]
+        if i != count - 1: var result: result + separator
+    }
+    return result
+}
+
+var words: []
+for i = 0 to 2000: append(words, "word")
+for round = 0 to 5: join(words, ", ")
+'''
+
+WORKLOADS = [
+  ('numbers', NUMBER_PROGRAM),
+  ('strings', STRING_PROGRAM),
+]
+
+def new_context():
+  context = Context('<program>')
+  context.symbol_table = main.global_symbol_table
+  return context
+
+def count_operations(node):
+  counter = [0]
+  original = Interpreter.visit
+
+  def visit(self, node, context):
+    if type(node) is BinaryOperationNode: counter[0] += 1
+    return original(self, node, context)
+
+  Interpreter.visit = visit
+  try:
+    with silenced():
+      main.prepare(node, 'interpreter')(new_context())
+  finally:
+    Interpreter.visit = original
+  return counter[0]
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  for name, text in WORKLOADS:
+    node = parse_program(f'<{name}>', text)
+    operations = count_operations(node)
+    row = [name, operations]
+
+    for engine in main.ENGINES:
+      runner = main.prepare(node, engine)
+      with silenced():
+        seconds = best_time(lambda: runner(new_context()), arguments.repeat)
+      row += [f'{seconds * 1000:.1f} ms', f'{seconds * 1e9 / operations:.0f}']
+    rows.append(row)
+
+  headers = ['workload', 'binary ops']
+  for engine in main.ENGINES:
+    headers += [engine, 'ns/op']
+  print_table(headers, rows)
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,65 @@
+#######################################
+# AST CACHE BENCHMARK
+#######################################
+# Compares parsing a program (cold) with loading its cached tree (warm),
+# both in process and as a whole `python main.py` run, for generated
+# programs of --lines lines. Files and the cache (JCODE_CACHE_DIR) go in a
+# temporary directory.
+#
+#   python benchmarks/bench_ast_cache.py [--lines N ...] [--repeat N]
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_utils import SOURCE_DIR, generated_program, best_time, print_table
+
+import ast_cache
+
+def run_main(path, *options):
+  start = time.perf_counter()
+  subprocess.run([sys.executable, os.path.join(SOURCE_DIR, 'main.py'), *options, path], check=True, stdout=subprocess.DEVNULL)
+  return time.perf_counter() - start
+
+def best_run(path, repeat, *options):
+  return min(run_main(path, *options) for _ in range(repeat))
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--lines', type=int, nargs='+', default=[200, 2000, 20000])
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  with tempfile.TemporaryDirectory() as directory:
+    # main.py runs inherit it
+    os.environ['JCODE_CACHE_DIR'] = os.path.join(directory, 'cache')
+    for lines in arguments.lines:
+      path = os.path.join(directory, f'program_{lines}.jcode')
+      text = generated_program(lines)
+      with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+      node, error = ast_cache.parse_source(path, text)
+      if error: raise SystemExit(error.as_string())
+      cache_path = ast_cache.cache_path(path)
+      key = ast_cache.cache_key(path, text)
+
+      parse_seconds = best_time(lambda: ast_cache.parse(path, text), arguments.repeat)
+      load_seconds = best_time(lambda: ast_cache.load(cache_path, key), arguments.repeat)
+      cold_seconds = best_run(path, arguments.repeat, '--no-cache')
+      warm_seconds = best_run(path, arguments.repeat)
+
+      rows.append([
+        f'{lines:,}', f'{os.path.getsize(cache_path) / 1024:,.0f} KB',
+        f'{parse_seconds * 1000:.1f} ms', f'{load_seconds * 1000:.1f} ms', f'{parse_seconds / load_seconds:.1f}x',
+        f'{cold_seconds * 1000:.0f} ms', f'{warm_seconds * 1000:.0f} ms', f'{cold_seconds / warm_seconds:.1f}x',
+      ])
+
+  print_table(['lines', 'cache', 'parse', 'load', 'speedup', 'main.py cold', 'main.py warm', 'speedup'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
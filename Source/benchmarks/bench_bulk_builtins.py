@@ -0,0 +1,110 @@
+#######################################
+# BULK BUILTIN BENCHMARK
+#######################################
+# Times each bulk list builtin (list_add, list_mul, sum, min, max, dot,
+# range) against the jcode loop it replaces, over lists of --size
+# numbers under --engine, and checks both give the same result. The
+# input lists xs and ys are set as globals beforehand.
+#
+#   python benchmarks/bench_bulk_builtins.py [--size N] [--engine NAME] [--repeat N]
+
+import argparse
+from array import array
+
+from bench_utils import best_time, print_table, parse_program
+
+import main
+from context import Context
+from values import List, ListElements
+
+OPERATIONS = [
+  ('list_add', '''
+var out: []
+for i = 0 to len(xs) {
+    append(out, xs / i + ys / i)
+}
+''', 'var out: list_add(xs, ys)'),
+  ('list_mul', '''
+var out: []
+for i = 0 to len(xs) {
+    append(out, xs / i * 3)
+}
+''', 'var out: list_mul(xs, 3)'),
+  ('sum', '''
+var out: 0
+for i = 0 to len(xs) {
+    var out: out + xs / i
+}
+''', 'var out: sum(xs)'),
+  ('min', '''
+var out: xs / 0
+for i = 1 to len(xs) {
+    if xs / i < out: var out: xs / i
+}
+''', 'var out: min(xs)'),
+  ('max', '''
+var out: xs / 0
+for i = 1 to len(xs) {
+    if xs / i > out: var out: xs / i
+}
+''', 'var out: max(xs)'),
+  ('dot', '''
+var out: 0
+for i = 0 to len(xs) {
+    var out: out + (xs / i) * (ys / i)
+}
+''', 'var out: dot(xs, ys)'),
+  ('range', '''
+var out: []
+for i = 0 to len(xs) {
+    append(out, i)
+}
+''', 'var out: range(0, len(xs))'),
+]
+
+def outcome(value):
+  return list(value.elements.contents()) if isinstance(value, List) else value.value
+
+def run_time(program, engine, repeat):
+  """Seconds the fastest run of `program` took, and the value it left in `out`."""
+  prepared = main.prepare(parse_program('<bulk builtins>', program), engine)
+
+  def run():
+    context = Context('<program>')
+    context.symbol_table = main.global_symbol_table
+    result = prepared(context)
+    if result.error: raise SystemExit(result.error.as_string())
+
+  seconds = best_time(run, repeat)
+  return seconds, outcome(main.global_symbol_table.get('out'))
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--size', type=int, default=1_000_000)
+  argument_parser.add_argument('--engine', choices=main.ENGINES, default='closure')
+  argument_parser.add_argument('--repeat', type=int, default=1)
+  arguments = argument_parser.parse_args()
+
+  # Ints, so the loop and the builtin add up exactly the same way
+  main.global_symbol_table.set('xs', List(ListElements(array('q', ((n * 7919) % 1000 for n in range(arguments.size))))))
+  main.global_symbol_table.set('ys', List(ListElements(array('q', range(arguments.size)))))
+
+  rows = []
+  mismatches = 0
+  for name, loop_program, builtin_program in OPERATIONS:
+    loop_seconds, loop_outcome = run_time(loop_program, arguments.engine, arguments.repeat)
+    builtin_seconds, builtin_outcome = run_time(builtin_program, arguments.engine, max(arguments.repeat, 3))
+    if loop_outcome != builtin_outcome:
+      print(f'{name}: the builtin gives a different result from the loop')
+      mismatches += 1
+
+    rows.append([
+      name, f'{arguments.size:,}', f'{loop_seconds * 1000:.0f} ms', f'{builtin_seconds * 1000:.1f} ms',
+      f'{loop_seconds / builtin_seconds:,.0f}x',
+    ])
+
+  print_table(['builtin', 'elements', 'jcode loop', 'builtin', 'speedup'], rows)
+  if mismatches: raise SystemExit(f'{mismatches} builtins differ from their loops')
+
+if __name__ == '__main__':
+  main_benchmark()
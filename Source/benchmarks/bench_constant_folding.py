@@ -0,0 +1,70 @@
+#######################################
+# CONSTANT FOLDING BENCHMARK
+#######################################
+# Runs a loop whose body recomputes constant expressions and literal `if`
+# conditions, with and without the optimizer pass, under every engine.
+#
+#   python benchmarks/bench_constant_folding.py [--repeat N]
+
+import argparse
+
+from bench_utils import silenced, best_time, print_table
+
+import main
+from context import Context
+from lexer import Lexer
+from parser import Parser
+from resolver import Resolver
+from optimizer import Optimizer
+
+CONSTANT_PROGRAM = '''
+func circles(int n) {
+    var total: 0
+    for i = 0 to n {
+        var total: total + 2 * math_pi * 10 - (60 * 60) / 3600
+        if true: var total: total + (1 == 1) * 0.5
+        if 10 > 20: var total: 0
+    }
+    return total
+}
+
+print(circles(20000))
+'''
+
+def parse(text, optimize):
+  tokens, error = Lexer('<benchmark>', text).Tokenize()
+  if error: raise SystemExit(error.as_string())
+  ast = Parser(tokens).parse()
+  if ast.error: raise SystemExit(ast.error.as_string())
+  error = Resolver(main.global_symbol_table, main.builtins).resolve(ast.node)
+  if error: raise SystemExit(error.as_string())
+  return Optimizer(main.global_symbol_table).optimize(ast.node) if optimize else ast.node
+
+def timed(node, engine, repeat):
+  runner = main.prepare(node, engine)
+
+  def run():
+    context = Context('<program>')
+    context.symbol_table = main.global_symbol_table
+    result = runner(context)
+    if result.error: raise SystemExit(result.error.as_string())
+
+  with silenced():
+    return best_time(run, repeat)
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  plain = parse(CONSTANT_PROGRAM, optimize=False)
+  folded = parse(CONSTANT_PROGRAM, optimize=True)
+  for engine in main.ENGINES:
+    before = timed(plain, engine, arguments.repeat)
+    after = timed(folded, engine, arguments.repeat)
+    rows.append([engine, f'{before * 1000:.2f} ms', f'{after * 1000:.2f} ms', f'{before / after:.2f}x'])
+  print_table(['engine', 'unoptimized', 'optimized', 'speedup'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
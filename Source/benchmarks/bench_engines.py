@@ -0,0 +1,52 @@
+#######################################
+# ENGINE BENCHMARK
+#######################################
+# Runs every program in Source/code, plus a loop-heavy workload, under each
+# execution engine. Checks that every engine prints the same output and
+# reports execution time (parsing excluded, engine compilation included).
+#
+#   python benchmarks/bench_engines.py [--repeat N]
+
+import argparse
+import contextlib
+import io
+import os
+
+from bench_utils import sample_programs, parse_program, best_time, print_table, LOOP_PROGRAM
+
+import main
+from context import Context
+
+def execute_captured(node, engine):
+  context = Context('<program>')
+  context.symbol_table = main.global_symbol_table
+  output = io.StringIO()
+  with contextlib.redirect_stdout(output):
+    result = main.execute(node, context, engine)
+  return output.getvalue(), result.error.as_string() if result.error else None
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  programs = sample_programs() + [('<loop workload>', LOOP_PROGRAM)]
+  rows = []
+  for filename, text in programs:
+    node = parse_program(filename, text)
+    reference = execute_captured(node, main.ENGINES[0])
+    row = [os.path.basename(filename)]
+
+    for engine in main.ENGINES:
+      if execute_captured(node, engine) != reference:
+        row.append('MISMATCH')
+        continue
+      seconds = best_time(lambda: execute_captured(node, engine), arguments.repeat)
+      row.append(f'{seconds * 1000:.2f} ms')
+
+    rows.append(row)
+
+  print_table(['program'] + list(main.ENGINES), rows)
+
+if __name__ == '__main__':
+  main_benchmark()
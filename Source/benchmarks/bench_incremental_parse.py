@@ -0,0 +1,104 @@
+#######################################
+# INCREMENTAL PARSE BENCHMARK
+#######################################
+# Checks IncrementalParser against a full parse: every program in
+# Source/code gets runs of random edits (typed and deleted characters,
+# deleted, duplicated and pasted lines), and after each one the tree or
+# error must be the same as parsing the new text from scratch. Then times
+# a one character edit in the middle of generated programs of --lines
+# lines, re-parsed incrementally and in full.
+#
+#   python benchmarks/bench_incremental_parse.py [--edits N] [--seed N] [--lines N ...] [--repeat N]
+
+import argparse
+import random
+
+from bench_utils import generated_program, sample_programs, best_time, print_table, dump_tree
+
+import ast_cache
+from incremental_parser import IncrementalParser
+
+TYPED_CHARACTERS = 'abx019 ._,:(){}[]+-*/^<>=!"\n#'
+
+def outcome(node, error):
+  return ('error', error.as_string()) if error else dump_tree(node)
+
+def random_edit(text, lines, rng):
+  """Returns a random (start, end, replacement) for `text`."""
+  kind = rng.randrange(5)
+  if kind == 0 or not text:
+    index = rng.randint(0, len(text))
+    return index, index, rng.choice(TYPED_CHARACTERS)
+  if kind == 1:
+    index = rng.randrange(len(text))
+    return index, index + 1, ''
+
+  line_starts = [0] + [index + 1 for index, character in enumerate(text) if character == '\n']
+  line = rng.randrange(len(line_starts))
+  start = line_starts[line]
+  end = line_starts[line + 1] if line + 1 < len(line_starts) else len(text)
+  if kind == 2: return start, end, ''
+  if kind == 3: return end, end, text[start:end] if text[start:end].endswith('\n') else '\n' + text[start:end]
+  return start, start, rng.choice(lines) + '\n'
+
+def check_edits(edit_count, seed):
+  rng = random.Random(seed)
+  programs = sample_programs()
+  lines = [line for _, text in programs for line in text.splitlines() if line.strip()]
+
+  rows = []
+  for filename, original_text in programs:
+    edits = mismatches = failed = 0
+    while edits < edit_count:
+      # Runs of a few edits from the original, so programs don't just decay into errors
+      document = IncrementalParser(filename, original_text)
+      for _ in range(8):
+        start, end, replacement = random_edit(document.text, lines, rng)
+        node, error = document.edit(start, end, replacement)
+        expected = ast_cache.parse(filename, document.text)
+        if outcome(node, error) != outcome(*expected):
+          mismatches += 1
+        failed += error is not None
+        edits += 1
+
+    rows.append([filename.rsplit('/', 1)[-1], edits, failed, mismatches])
+
+  print_table(['program', 'edits', 'with errors', 'mismatches'], rows)
+  return sum(row[3] for row in rows)
+
+def time_edits(line_counts, repeat):
+  rows = []
+  for lines in line_counts:
+    text = generated_program(lines)
+    filename = f'<generated {lines}>'
+    document = IncrementalParser(filename, text)
+    if document.error: raise SystemExit(document.error.as_string())
+
+    # Type a digit in the middle of the program, then delete it again
+    index = text.index('(1, 2)', len(text) // 2) + 1
+    edits = iter([(index, index, '7'), (index, index + 1, '')] * repeat)
+    def edit():
+      node, error = document.edit(*next(edits))
+      if error: raise SystemExit(error.as_string())
+
+    incremental_seconds = best_time(edit, repeat * 2)
+    full_seconds = best_time(lambda: ast_cache.parse(filename, document.text), repeat)
+    rows.append([f'{lines:,}', f'{full_seconds * 1000:.1f} ms', f'{incremental_seconds * 1000:.2f} ms', f'{full_seconds / incremental_seconds:.0f}x'])
+
+  print_table(['lines', 'full parse', 'incremental', 'speedup'], rows)
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--edits', type=int, default=400)
+  argument_parser.add_argument('--seed', type=int, default=0)
+  argument_parser.add_argument('--lines', type=int, nargs='+', default=[200, 2000, 20000])
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  mismatches = check_edits(arguments.edits, arguments.seed)
+  print()
+  time_edits(arguments.lines, arguments.repeat)
+  if mismatches: raise SystemExit(f'{mismatches} incremental parses differ from a full parse')
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,135 @@
+#######################################
+# LAZY PARSE BENCHMARK
+#######################################
+# Checks lazy parsing against a full parse: every program in Source/code
+# and a generated one, parsed lazily with every skipped body then parsed,
+# must give the same tree, and a syntax error put into a body must be
+# the same error once that body is parsed. Then times loading (parsing,
+# resolving, optimizing and compiling for --engine) and running generated
+# libraries of --functions functions of which the program calls three,
+# parsed in full and lazily.
+#
+#   python benchmarks/bench_lazy_parse.py [--functions N ...] [--engine NAME] [--repeat N]
+
+import argparse
+
+from bench_utils import generated_program, sample_programs, best_time, print_table, dump_tree, silenced
+
+import ast_cache
+import main
+from nodes import FuncDefNode, MethodDefNode, LazyBodyNode
+from resolver import Resolver
+from optimizer import Optimizer
+from context import Context
+
+LIBRARY_FUNCTION = '''func library_{n}(int a, list values) {{
+    var total: a
+    for i = 0 to len(values) {{
+        var total: total + values / i * {n}
+    }}
+    while total > 1000 {{
+        var total: total / 2
+    }}
+    var label: "library " + str({n})
+    var scaled: [total, total * 2, total * 3]
+    return total + scaled / 1
+}}
+
+'''
+
+LIBRARY_MAIN = '''var inputs: [1, 2, 3, 4, 5]
+print(library_0(1, inputs))
+print(library_{middle}(2, inputs))
+print(library_{last}(3, inputs))
+'''
+
+def library_program(function_count):
+  functions = ''.join(LIBRARY_FUNCTION.format(n=n) for n in range(function_count))
+  return functions + LIBRARY_MAIN.format(middle=function_count // 2, last=function_count - 1)
+
+def load_all(value):
+  """Parses every body a lazy parse skipped, in the tree of `value`; returns the first error."""
+  if type(value) is FuncDefNode or type(value) is MethodDefNode:
+    if type(value.body_node) is LazyBodyNode:
+      _, error = value.body_node.load()
+      if error: return error
+  if type(value) is list:
+    children = value
+  else:
+    children = [getattr(value, slot, None) for slot in getattr(type(value), '__slots__', ())]
+  for child in children:
+    if type(child) is list or hasattr(type(child), '__slots__'):
+      error = load_all(child)
+      if error: return error
+  return None
+
+def lazy_outcome(filename, text):
+  node, error = ast_cache.parse(filename, text, lazy=True)
+  if not error: error = load_all(node)
+  return ('error', error.as_string()) if error else dump_tree(node)
+
+def eager_outcome(filename, text):
+  node, error = ast_cache.parse(filename, text)
+  return ('error', error.as_string()) if error else dump_tree(node)
+
+def check_programs():
+  programs = sample_programs() + [('<generated>', generated_program(400))]
+  text = library_program(40)
+  for line in ['var x: [1, 2', 'var y: 1 +', 'return )']:
+    # Into the body of a function in the middle
+    middle = text.index('    var label', len(text) // 2)
+    programs.append((f'<library with "{line}">', text[:middle] + '    ' + line + '\n' + text[middle:]))
+
+  mismatches = 0
+  for filename, text in programs:
+    if lazy_outcome(filename, text) != eager_outcome(filename, text):
+      print(f'{filename}: the lazy parse differs')
+      mismatches += 1
+  return mismatches
+
+def load(filename, text, engine, lazy):
+  node, error = ast_cache.parse(filename, text, lazy)
+  if error: raise SystemExit(error.as_string())
+  error = Resolver(main.global_symbol_table, main.builtins).resolve(node)
+  if error: raise SystemExit(error.as_string())
+  node = Optimizer(main.global_symbol_table).optimize(node)
+  return main.prepare(node, engine)
+
+def load_and_run(filename, text, engine, lazy):
+  context = Context('<program>')
+  context.symbol_table = main.global_symbol_table
+  result = load(filename, text, engine, lazy)(context)
+  if result.error: raise SystemExit(result.error.as_string())
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--functions', type=int, nargs='+', default=[100, 1000, 5000])
+  argument_parser.add_argument('--engine', choices=main.ENGINES, default='closure')
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  mismatches = check_programs()
+
+  rows = []
+  for function_count in arguments.functions:
+    filename = f'<library {function_count}>'
+    text = library_program(function_count)
+    times = {}
+    for lazy in (False, True):
+      times['load', lazy] = best_time(lambda: load(filename, text, arguments.engine, lazy), arguments.repeat)
+      with silenced():
+        times['run', lazy] = best_time(lambda: load_and_run(filename, text, arguments.engine, lazy), arguments.repeat)
+
+    rows.append([
+      f'{function_count:,}', f'{text.count(chr(10)):,}',
+      f"{times['load', False] * 1000:.1f} ms", f"{times['load', True] * 1000:.1f} ms",
+      f"{times['load', False] / times['load', True]:.1f}x",
+      f"{times['run', False] * 1000:.1f} ms", f"{times['run', True] * 1000:.1f} ms",
+      f"{times['run', False] / times['run', True]:.1f}x",
+    ])
+
+  print_table(['functions', 'lines', 'load', 'lazy load', 'speedup', 'load and run', 'lazy', 'speedup'], rows)
+  if mismatches: raise SystemExit(f'{mismatches} lazy parses differ from a full parse')
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,87 @@
+#######################################
+# LEXER THROUGHPUT BENCHMARK
+#######################################
+# Concatenates the programs in Source/code until the text reaches --size
+# megabytes, and generates identifier-dense code (names and keywords
+# with few operators) of the same size, tokenizes each and reports
+# throughput in MB/s and tokens/s, and how many string objects the
+# tokens of all the names hold.
+#
+# Then times symbol table lookups of every name in the identifier-dense
+# code, by the tokens' own strings and by equal copies of them: the
+# lexer interns names, so the tokens' strings are the ones the table
+# holds and each lookup hits on identity.
+#
+#   python benchmarks/bench_lexer.py [--size MB] [--repeat N]
+
+import argparse
+import random
+
+from bench_utils import sample_programs, best_time, print_table
+
+from lexer import Lexer
+from symbol_table import SymbolTable
+from tokens import TT_IDENTIFIER, TT_KEYWORD
+
+def sample_text(size):
+  # Each program ends with a blank line so no comment or block runs into the next
+  programs = ''.join(text.rstrip('\n') + '\n\n' for _, text in sample_programs())
+  return programs * max(1, round(size / len(programs.encode('utf-8'))))
+
+def identifier_text(size):
+  rng = random.Random(0)
+  names = [f'{word}_{n}' for word in ('total', 'count', 'item', 'value', 'result', 'index') for n in range(40)]
+  lines = []
+  for _ in range(2000):
+    words = rng.sample(names, 6)
+    lines.append(f'var {words[0]}: {words[1]} and not {words[2]} or {words[3]}({words[4]}, {words[5]})\n')
+  text = ''.join(lines)
+  return text * max(1, round(size / len(text.encode('utf-8'))))
+
+def name_strings(tokens):
+  return len({id(token.value) for token in tokens if token.type in (TT_IDENTIFIER, TT_KEYWORD)})
+
+def lookup_times(tokens, repeat):
+  names = [token.value for token in tokens if token.type == TT_IDENTIFIER]
+  copies = [''.join(name) for name in names]
+  symbol_table = SymbolTable()
+  for name in names:
+    symbol_table.set(name, 0)
+
+  def look_up(keys):
+    get = symbol_table.get
+    for key in keys: get(key)
+
+  return len(names), best_time(lambda: look_up(names), repeat), best_time(lambda: look_up(copies), repeat)
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--size', type=float, default=4.0)
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  for label, text in (
+    ('samples', sample_text(arguments.size * 1024 * 1024)),
+    ('identifiers', identifier_text(arguments.size * 1024 * 1024)),
+  ):
+    megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+    tokens, error = Lexer(f'<{label}>', text).Tokenize()
+    if error: raise SystemExit(error.as_string())
+
+    seconds = best_time(lambda: Lexer(f'<{label}>', text).Tokenize(), arguments.repeat)
+    rows.append([
+      label, f'{megabytes:.1f} MB', f'{len(tokens):,}', f'{seconds:.2f} s',
+      f'{megabytes / seconds:.2f}', f'{len(tokens) / seconds:,.0f}', f'{name_strings(tokens):,}',
+    ])
+  print_table(['source', 'size', 'tokens', 'time', 'MB/s', 'tokens/s', 'name strings'], rows)
+  print()
+
+  lookups, interned_seconds, copied_seconds = lookup_times(tokens, arguments.repeat)
+  print_table(['lookups', 'token strings', 'equal copies', 'speedup'], [[
+    f'{lookups:,}', f'{interned_seconds * 1000:.0f} ms', f'{copied_seconds * 1000:.0f} ms',
+    f'{copied_seconds / interned_seconds:.2f}x',
+  ]])
+
+if __name__ == '__main__':
+  main_benchmark()
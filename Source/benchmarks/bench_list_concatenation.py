@@ -0,0 +1,90 @@
+#######################################
+# LIST CONCATENATION BENCHMARK
+#######################################
+# Times jcode loops that build a list of --sizes elements one '+' at a
+# time (var xs: xs + i), and with '*' (var xs: xs * [i]), under --engine.
+#
+# '+' and '*' make a new list and leave the old one as it was. Lists
+# share their storage (see values.ListElements), so each step only adds
+# to its end; the "copying" column makes every step copy the whole list
+# instead, as a new list with copied elements would. That is quadratic,
+# so copying is only timed up to --copy-limit elements.
+#
+#   python benchmarks/bench_list_concatenation.py [--sizes N ...] [--copy-limit N] [--engine NAME] [--repeat N]
+
+import argparse
+import contextlib
+
+from bench_utils import best_time, print_table, parse_program, silenced
+
+import main
+from context import Context
+from values import ListElements
+
+PROGRAMS = {
+  '+': '''
+var xs: []
+for i = 0 to {size} {{
+    var xs: xs + i
+}}
+print(len(xs))
+''',
+  '*': '''
+var xs: []
+for i = 0 to {size} {{
+    var xs: xs * [i]
+}}
+print(len(xs))
+''',
+}
+
+@contextlib.contextmanager
+def copying():
+  """Makes '+' and '*' copy the whole list every time."""
+  plus, concatenated = ListElements.plus, ListElements.concatenated
+  ListElements.plus = lambda elements, value: plus(elements.copied(), value)
+  ListElements.concatenated = lambda elements, other: concatenated(elements.copied(), other)
+  try:
+    yield
+  finally:
+    ListElements.plus, ListElements.concatenated = plus, concatenated
+
+def run_time(program, engine, repeat):
+  prepared = main.prepare(parse_program('<list concatenation>', program), engine)
+
+  def run():
+    context = Context('<program>')
+    context.symbol_table = main.global_symbol_table
+    result = prepared(context)
+    if result.error: raise SystemExit(result.error.as_string())
+
+  with silenced():
+    return best_time(run, repeat)
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+  argument_parser.add_argument('--copy-limit', type=int, default=10000)
+  argument_parser.add_argument('--engine', choices=main.ENGINES, default='closure')
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  for operator, template in PROGRAMS.items():
+    for size in arguments.sizes:
+      program = template.format(size=size)
+      seconds = run_time(program, arguments.engine, arguments.repeat)
+      row = [operator, f'{size:,}', f'{seconds * 1000:.0f} ms', f'{seconds / size * 1e6:.1f} us']
+
+      if size <= arguments.copy_limit:
+        with copying():
+          copy_seconds = run_time(program, arguments.engine, 1)
+        row += [f'{copy_seconds * 1000:.0f} ms', f'{copy_seconds / size * 1e6:.1f} us', f'{copy_seconds / seconds:.1f}x']
+      else:
+        row += ['', '', '']
+      rows.append(row)
+
+  print_table(['operator', 'elements', 'shared', 'per step', 'copying', 'per step', 'speedup'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,106 @@
+#######################################
+# MAP LOOKUP BENCHMARK
+#######################################
+# Times --lookups lookups in a table of each of --sizes keys, under
+# --engine: as a jcode loop that scans a list of keys for the index of
+# its value in a parallel list, and in a Map with '/' and with map_get.
+# The table, its keys and the keys to look up are set as globals
+# beforehand; the scan uses Number keys, as jcode Strings have no '=='.
+#
+#   python benchmarks/bench_map_lookup.py [--sizes N ...] [--lookups N] [--engine NAME] [--repeat N]
+
+import argparse
+import random
+
+from bench_utils import best_time, print_table, parse_program
+
+import main
+from context import Context
+from values import List, Map, Number, String
+
+SCAN_PROGRAM = '''
+var total: 0
+for q = 0 to len(queries) {
+    var key: queries / q
+    for i = 0 to len(keys) {
+        if keys / i == key:
+            var total: total + values / i
+            break
+    }
+}
+'''
+
+DIVIDE_PROGRAM = '''
+var total: 0
+for q = 0 to len(queries) {
+    var total: total + table / (queries / q)
+}
+'''
+
+GET_PROGRAM = '''
+var total: 0
+for q = 0 to len(queries) {
+    var total: total + map_get(table, queries / q)
+}
+'''
+
+def run_time(program, engine, repeat):
+  """Seconds the fastest run of `program` took, and the total it added up."""
+  prepared = main.prepare(parse_program('<map lookup>', program), engine)
+
+  def run():
+    context = Context('<program>')
+    context.symbol_table = main.global_symbol_table
+    result = prepared(context)
+    if result.error: raise SystemExit(result.error.as_string())
+
+  seconds = best_time(run, repeat)
+  return seconds, main.global_symbol_table.get('total').value
+
+def set_table(keys, lookups):
+  """Sets the globals for a table of `keys`, each mapped to its index."""
+  rng = random.Random(0)
+  main.global_symbol_table.set('keys', List(keys))
+  main.global_symbol_table.set('values', List([Number.of(index) for index in range(len(keys))]))
+  main.global_symbol_table.set('queries', List([rng.choice(keys) for _ in range(lookups)]))
+
+  table = Map()
+  for index, key in enumerate(keys):
+    table.entries[Map.key(key)] = Number.of(index)
+  main.global_symbol_table.set('table', table)
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000])
+  argument_parser.add_argument('--lookups', type=int, default=1000)
+  argument_parser.add_argument('--engine', choices=main.ENGINES, default='closure')
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  mismatches = 0
+  for size in arguments.sizes:
+    set_table([Number.of(n * 7919 + 1) for n in range(size)], arguments.lookups)
+    scan_seconds, scan_total = run_time(SCAN_PROGRAM, arguments.engine, arguments.repeat)
+    divide_seconds, divide_total = run_time(DIVIDE_PROGRAM, arguments.engine, arguments.repeat)
+    get_seconds, get_total = run_time(GET_PROGRAM, arguments.engine, arguments.repeat)
+
+    set_table([String(f'key_{n}') for n in range(size)], arguments.lookups)
+    string_seconds, string_total = run_time(DIVIDE_PROGRAM, arguments.engine, arguments.repeat)
+
+    if not scan_total == divide_total == get_total == string_total:
+      print(f'{size} keys: the map lookups add up to a different total from the scan')
+      mismatches += 1
+
+    rows.append([
+      f'{size:,}', f'{scan_seconds * 1000:.1f} ms', f'{divide_seconds * 1000:.1f} ms',
+      f'{get_seconds * 1000:.1f} ms', f'{string_seconds * 1000:.1f} ms',
+      f'{scan_seconds / divide_seconds:,.1f}x',
+    ])
+
+  print(f'{arguments.lookups:,} lookups')
+  print_table(['keys', 'list scan', "map '/'", 'map_get', "'/' string keys", 'speedup'], rows)
+  if mismatches: raise SystemExit(f'{mismatches} tables differ from their scans')
+
+if __name__ == '__main__':
+  main_benchmark()
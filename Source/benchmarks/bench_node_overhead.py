@@ -0,0 +1,93 @@
+#######################################
+# NODE OVERHEAD BENCHMARK
+#######################################
+# Measures the cost of evaluating one AST node under each engine. The
+# tree-walking interpreter wraps every node result in a RuntimeResult; the
+# closure engine returns values directly and only raises signals for
+# errors, return, break and continue.
+#
+# For every program in Source/code (plus the loop workload) this counts the
+# nodes the interpreter visits and the RuntimeResults each engine allocates,
+# then reports run time per visited node. Compilation is excluded.
+#
+#   python benchmarks/bench_node_overhead.py [--repeat N]
+
+import argparse
+import contextlib
+import os
+
+from bench_utils import sample_programs, parse_program, silenced, best_time, print_table, LOOP_PROGRAM
+
+import main
+from context import Context
+from interpreter import Interpreter
+from runtime_result import RuntimeResult
+
+def new_context():
+  context = Context('<program>')
+  context.symbol_table = main.global_symbol_table
+  return context
+
+@contextlib.contextmanager
+def counting(cls, method_name, counter):
+  original = getattr(cls, method_name)
+
+  def counted(*arguments, **keywords):
+    counter[0] += 1
+    return original(*arguments, **keywords)
+
+  setattr(cls, method_name, counted)
+  try:
+    yield
+  finally:
+    setattr(cls, method_name, original)
+
+def count_calls(cls, method_name, runner):
+  counter = [0]
+  with counting(cls, method_name, counter), silenced():
+    runner(new_context())
+  return counter[0]
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  programs = sample_programs() + [('<loop workload>', LOOP_PROGRAM)]
+  headers = ['program', 'nodes']
+  for engine in main.ENGINES:
+    headers += [f'{engine} ns/node', f'{engine} results/node']
+
+  rows = []
+  totals = {engine: [0.0, 0] for engine in main.ENGINES}
+  total_nodes = 0
+
+  for filename, text in programs:
+    node = parse_program(filename, text)
+    runners = {engine: main.prepare(node, engine) for engine in main.ENGINES}
+
+    node_count = count_calls(Interpreter, 'visit', runners['interpreter'])
+    total_nodes += node_count
+    row = [os.path.basename(filename), node_count]
+
+    for engine, runner in runners.items():
+      allocations = count_calls(RuntimeResult, '__init__', runner)
+      with silenced():
+        seconds = best_time(lambda: runner(new_context()), arguments.repeat)
+
+      totals[engine][0] += seconds
+      totals[engine][1] += allocations
+      row += [f'{seconds * 1e9 / node_count:.0f}', f'{allocations / node_count:.2f}']
+
+    rows.append(row)
+
+  total_row = ['<total>', total_nodes]
+  for engine in main.ENGINES:
+    seconds, allocations = totals[engine]
+    total_row += [f'{seconds * 1e9 / total_nodes:.0f}', f'{allocations / total_nodes:.2f}']
+  rows.append(total_row)
+
+  print_table(headers, rows)
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,95 @@
+#######################################
+# NUMBER INTERNING BENCHMARK
+#######################################
+# Runs a million-iteration counting loop under each engine and reports:
+#
+#   iterations/s   a block-bodied loop whose arithmetic and comparisons
+#                  only produce small ints and booleans
+#   bytes/iter     peak traced memory of a single-line loop that keeps its
+#                  million comparison results in a list, per iteration
+#   bytes/Number   the size of one Number, including its attribute dict
+#
+#   python benchmarks/bench_number_interning.py [--iterations N] [--engines ...]
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from bench_utils import parse_program, silenced, print_table
+
+import main
+from context import Context
+from values import Number
+
+COUNTING_PROGRAM = '''
+func count(int n) {{
+    var parity: 0
+    for i = 0 to n {{
+        var parity: 1 - parity
+        var small: i < 100
+    }}
+    return parity
+}}
+
+count({iterations})
+'''
+
+COLLECTING_PROGRAM = '''
+var flags: for i = 0 to {iterations}: i < 100
+'''
+
+def new_context():
+  context = Context('<program>')
+  context.symbol_table = main.global_symbol_table
+  return context
+
+def run_once(node, engine):
+  runner = main.prepare(node, engine)
+  with silenced():
+    start = time.perf_counter()
+    result = runner(new_context())
+    seconds = time.perf_counter() - start
+  if result.error: raise SystemExit(result.error.as_string())
+  return seconds
+
+def peak_memory(node, engine):
+  runner = main.prepare(node, engine)
+  tracemalloc.start()
+  try:
+    with silenced():
+      result = runner(new_context())
+    _, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+  if result.error: raise SystemExit(result.error.as_string())
+  main.global_symbol_table.symbols.pop('flags', None)
+  return peak
+
+def number_size():
+  number = Number(12345)
+  size = sys.getsizeof(number)
+  if hasattr(number, '__dict__'): size += sys.getsizeof(number.__dict__)
+  return size
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--iterations', type=int, default=1_000_000)
+  argument_parser.add_argument('--engines', nargs='+', choices=main.ENGINES, default=list(main.ENGINES))
+  arguments = argument_parser.parse_args()
+
+  iterations = arguments.iterations
+  counting = parse_program('<counting>', COUNTING_PROGRAM.format(iterations=iterations))
+  collecting = parse_program('<collecting>', COLLECTING_PROGRAM.format(iterations=iterations))
+
+  rows = []
+  for engine in arguments.engines:
+    seconds = run_once(counting, engine)
+    peak = peak_memory(collecting, engine)
+    rows.append([engine, f'{iterations / seconds:,.0f}', f'{peak / iterations:.1f}'])
+
+  print(f'{iterations:,} iterations, {number_size()} bytes/Number')
+  print_table(['engine', 'iterations/s', 'bytes/iter'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
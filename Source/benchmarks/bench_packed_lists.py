@@ -0,0 +1,110 @@
+#######################################
+# PACKED LIST BENCHMARK
+#######################################
+# Compares lists of numbers packed into arrays (see values.ListElements)
+# with lists of boxed Number objects, made by turning packing off.
+#
+# Memory: the bytes held by a List of --size ints or floats, built from
+# its Numbers as a list literal or a loop would build it.
+#
+# Time: jcode programs that append --size numbers to a list, then read
+# every one back with '/' to sum them, run under --engine.
+#
+#   python benchmarks/bench_packed_lists.py [--size N] [--engine NAME] [--repeat N]
+
+import argparse
+import contextlib
+import gc
+import tracemalloc
+
+from bench_utils import best_time, print_table, silenced, parse_program
+
+import main
+import values
+from values import List, Number
+from context import Context
+
+BUILD_PROGRAM = '''
+var values: []
+for i = 0 to {size} {{
+    append(values, i {operation})
+}}
+'''
+
+SUM_PROGRAM = BUILD_PROGRAM + '''
+var total: 0
+for i = 0 to len(values) {{
+    var total: total + values / i
+}}
+print(total)
+'''
+
+@contextlib.contextmanager
+def boxed():
+  """Keeps every list's elements as a list of Numbers, as before packing."""
+  packed = values.packed
+  values.packed = lambda elements: None
+  try:
+    yield
+  finally:
+    values.packed = packed
+
+def list_bytes(numbers):
+  """Bytes still allocated for a List of `numbers` once it is built."""
+  gc.collect()
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  list_value = List([Number.of(number) for number in numbers])
+  held = tracemalloc.get_traced_memory()[0] - before
+  tracemalloc.stop()
+  del list_value
+  return held
+
+def run_time(program, engine, repeat):
+  node = parse_program('<packed lists>', program)
+  prepared = main.prepare(node, engine)
+
+  def run():
+    context = Context('<program>')
+    context.symbol_table = main.global_symbol_table
+    result = prepared(context)
+    if result.error: raise SystemExit(result.error.as_string())
+
+  with silenced():
+    return best_time(run, repeat)
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--size', type=int, default=200_000)
+  argument_parser.add_argument('--engine', choices=main.ENGINES, default='closure')
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+  size = arguments.size
+
+  rows = []
+  for kind, numbers in (('int', range(1000, 1000 + size)), ('float', [n + 0.5 for n in range(size)])):
+    with boxed():
+      boxed_bytes = list_bytes(numbers)
+    packed_bytes = list_bytes(numbers)
+    rows.append([
+      kind, f'{size:,}', f'{boxed_bytes / 1e6:.1f} MB', f'{packed_bytes / 1e6:.1f} MB',
+      f'{boxed_bytes / size:.0f}', f'{packed_bytes / size:.0f}', f'{boxed_bytes / packed_bytes:.1f}x',
+    ])
+  print_table(['elements', 'count', 'boxed', 'packed', 'bytes each', 'packed each', 'smaller'], rows)
+  print()
+
+  rows = []
+  for kind, operation in (('int', '* 3'), ('float', '+ 0.5')):
+    for label, template in (('append', BUILD_PROGRAM), ('append and sum', SUM_PROGRAM)):
+      program = template.format(size=size, operation=operation)
+      with boxed():
+        boxed_seconds = run_time(program, arguments.engine, arguments.repeat)
+      packed_seconds = run_time(program, arguments.engine, arguments.repeat)
+      rows.append([
+        kind, label, f'{boxed_seconds * 1000:.0f} ms', f'{packed_seconds * 1000:.0f} ms',
+        f'{boxed_seconds / packed_seconds:.2f}x',
+      ])
+  print_table(['elements', 'program', 'boxed', 'packed', 'speedup'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,117 @@
+#######################################
+# PARALLEL PARSE BENCHMARK
+#######################################
+# Times lexing and parsing generated programs of --lines lines in one
+# process (ast_cache.parse) and split across --workers processes
+# (parallel_parser.parse), pool start-up included, and checks both give
+# the same tree. Every program in Source/code, and copies of a generated
+# one with an error, are split into the smallest chunks possible to check
+# the parallel parse gives the same tree or error there too.
+#
+# Measured times are bounded by the cores actually available
+# (os.cpu_count()). The projected time on `workers` free cores adds the
+# pool's start-up, the chunks' parse and pickle times (measured one by one
+# in process) spread over the workers, and the parent's unpickling of
+# every chunk, which stays serial.
+#
+#   python benchmarks/bench_parallel_parse.py [--lines N ...] [--workers N ...] [--repeat N]
+
+import argparse
+import gc
+import multiprocessing
+import os
+import time
+
+from bench_utils import generated_program, sample_programs, best_time, print_table, dump_tree
+
+import ast_cache
+import parallel_parser
+
+def outcome(node, error):
+  return ('error', error.as_string()) if error else dump_tree(node)
+
+def check_programs(workers):
+  programs = sample_programs()
+  text = generated_program(400)
+  for line in ['func broken(a {', 'var x: [1, 2', 'var y: 1 +', '@', '/* unclosed']:
+    middle = text.index('\nfunc', len(text) // 2) + 1
+    programs.append((f'<generated with "{line}">', text[:middle] + line + '\n' + text[middle:]))
+
+  minimum_chunk_size = parallel_parser.MINIMUM_CHUNK_SIZE
+  parallel_parser.MINIMUM_CHUNK_SIZE = 1
+  try:
+    mismatches = 0
+    for filename, text in programs:
+      if outcome(*parallel_parser.parse(filename, text, workers)) != outcome(*ast_cache.parse(filename, text)):
+        print(f'{filename}: the parallel parse differs')
+        mismatches += 1
+  finally:
+    parallel_parser.MINIMUM_CHUNK_SIZE = minimum_chunk_size
+  return mismatches
+
+def pool_start_time(workers, filename, text):
+  start = time.perf_counter()
+  with multiprocessing.Pool(workers, parallel_parser.start_worker, (filename, text)) as pool:
+    pool.map(abs, range(workers))
+  return time.perf_counter() - start
+
+def chunk_times(filename, text, workers):
+  """Seconds to parse and pickle each chunk, and to load them all, in this process."""
+  boundaries = parallel_parser.chunk_boundaries(text, workers * 4)
+  parallel_parser.start_worker(filename, text)
+  chunk_seconds, results = [], []
+  for start, end in zip(boundaries, boundaries[1:] + [None]):
+    began = time.perf_counter()
+    results.append(parallel_parser.parse_chunk(start, end))
+    chunk_seconds.append(time.perf_counter() - began)
+
+  gc.disable()
+  began = time.perf_counter()
+  for data in results:
+    parallel_parser.load_chunk(data, text)
+  load_seconds = time.perf_counter() - began
+  gc.enable()
+  return chunk_seconds, load_seconds
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--lines', type=int, nargs='+', default=[20000, 100000])
+  argument_parser.add_argument('--workers', type=int, nargs='+', default=[4, 8, 16])
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  mismatches = check_programs(max(arguments.workers))
+
+  rows = []
+  for lines in arguments.lines:
+    filename = f'<generated {lines}>'
+    text = generated_program(lines)
+    serial_tree = dump_tree(ast_cache.parse(filename, text)[0])
+    serial_seconds = best_time(lambda: ast_cache.parse(filename, text), arguments.repeat)
+    rows.append([f'{lines:,}', 1, f'{serial_seconds * 1000:.0f} ms', '1.0x', '', ''])
+
+    for workers in arguments.workers:
+      node, error = parallel_parser.parse(filename, text, workers)
+      if error or dump_tree(node) != serial_tree:
+        print(f'{filename}: the parallel parse with {workers} workers differs')
+        mismatches += 1
+
+      seconds = best_time(lambda: parallel_parser.parse(filename, text, workers), arguments.repeat)
+
+      # With `workers` free cores the chunks run side by side, but the
+      # parent still starts the pool and loads every chunk's tree itself
+      chunk_seconds, load_seconds = chunk_times(filename, text, workers)
+      start_seconds = min(pool_start_time(workers, filename, text) for _ in range(arguments.repeat))
+      projected_seconds = start_seconds + max(sum(chunk_seconds) / workers, max(chunk_seconds)) + load_seconds
+
+      rows.append([
+        f'{lines:,}', workers, f'{seconds * 1000:.0f} ms', f'{serial_seconds / seconds:.1f}x',
+        f'{projected_seconds * 1000:.0f} ms', f'{serial_seconds / projected_seconds:.1f}x',
+      ])
+
+  print(f'{os.cpu_count()} cores')
+  print_table(['lines', 'workers', 'time', 'speedup', 'projected', 'projected speedup'], rows)
+  if mismatches: raise SystemExit(f'{mismatches} parallel parses differ from a single parse')
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,61 @@
+#######################################
+# EXPRESSION PARSE BENCHMARK
+#######################################
+# Parses expression-dense programs and reports tokens parsed per second:
+# long arithmetic chains mixing every precedence level, nested calls, and
+# list literals where each element is a lone number. Tokens are lexed up
+# front so only the parser is timed.
+#
+#   python benchmarks/bench_parse_expressions.py [--lines N] [--repeat N]
+
+import argparse
+
+from bench_utils import best_time, print_table
+
+from lexer import Lexer
+from parser import Parser
+
+OPERATORS = ['+', '-', '*', '/', '^', '<', '==', '>=']
+
+def arithmetic_chains(lines):
+  chain = 'x0' + ''.join(f' {OPERATORS[n % len(OPERATORS)]} x{n} * -{n}' for n in range(1, 40))
+  return ''.join(f'var y{n}: {chain}\n' for n in range(lines))
+
+def nested_calls(lines):
+  call = 'x'
+  for n in range(12):
+    call = f'f{n}({call}, {n}, g(a, b))'
+  return ''.join(f'print({call})\n' for n in range(lines))
+
+def literal_lists(lines):
+  elements = ', '.join(str(n) for n in range(100))
+  return ''.join(f'var xs{n}: [{elements}]\n' for n in range(lines))
+
+WORKLOADS = [
+  ('arithmetic chains', arithmetic_chains),
+  ('nested calls', nested_calls),
+  ('literal lists', literal_lists),
+]
+
+def parse_tokens(tokens):
+  result = Parser(tokens).parse()
+  if result.error: raise SystemExit(result.error.as_string())
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--lines', type=int, default=2000)
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  for name, make_text in WORKLOADS:
+    tokens, error = Lexer(f'<{name}>', make_text(arguments.lines)).Tokenize()
+    if error: raise SystemExit(error.as_string())
+
+    seconds = best_time(lambda: parse_tokens(tokens), arguments.repeat)
+    rows.append([name, f'{len(tokens):,}', f'{seconds * 1000:.0f} ms', f'{len(tokens) / seconds:,.0f}'])
+
+  print_table(['workload', 'tokens', 'time', 'tokens/s'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
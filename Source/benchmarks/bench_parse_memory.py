@@ -0,0 +1,87 @@
+#######################################
+# PARSE MEMORY BENCHMARK
+#######################################
+# Lexes and parses a generated 50k-line jcode file and reports the memory
+# the token list and the AST keep alive, next to the size of the source.
+#
+#   tokens    traced memory held by the token list after lexing
+#   AST       traced memory held by the parsed tree (tokens it references
+#             included) once the token list has been dropped
+#   peak      highest traced memory while lexing and parsing
+#   streamed  highest traced memory when the parser pulls tokens from a
+#             TokenStream instead of a token list
+#
+#   python benchmarks/bench_parse_memory.py [--lines N]
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from bench_utils import generated_program, print_table
+
+from lexer import Lexer
+from parser import Parser
+from token_stream import TokenStream
+
+def megabytes(size):
+  return f'{size / (1024 * 1024):.1f} MB'
+
+def streamed_peak(text):
+  gc.collect()
+  tracemalloc.start()
+  baseline, _ = tracemalloc.get_traced_memory()
+
+  start = time.perf_counter()
+  lexer = Lexer('<generated>', text)
+  ast = Parser(TokenStream(lexer.generate_tokens())).parse()
+  seconds = time.perf_counter() - start
+  if lexer.error: raise SystemExit(lexer.error.as_string())
+  if ast.error: raise SystemExit(ast.error.as_string())
+
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return peak - baseline, seconds
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--lines', type=int, default=50_000)
+  arguments = argument_parser.parse_args()
+
+  text = generated_program(arguments.lines)
+  source_size = len(text.encode('utf-8'))
+
+  gc.collect()
+  tracemalloc.start()
+  baseline, _ = tracemalloc.get_traced_memory()
+
+  start = time.perf_counter()
+  tokens, error = Lexer('<generated>', text).Tokenize()
+  lex_seconds = time.perf_counter() - start
+  if error: raise SystemExit(error.as_string())
+  token_memory = tracemalloc.get_traced_memory()[0] - baseline
+
+  start = time.perf_counter()
+  ast = Parser(tokens).parse()
+  parse_seconds = time.perf_counter() - start
+  if ast.error: raise SystemExit(ast.error.as_string())
+
+  del tokens
+  gc.collect()
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  ast_memory = current - baseline
+
+  del ast
+  stream_peak, stream_seconds = streamed_peak(text)
+
+  print(f'{text.count(chr(10)):,} lines, source {megabytes(source_size)}')
+  print_table(['', 'memory', 'x source', 'time'], [
+    ['tokens', megabytes(token_memory), f'{token_memory / source_size:.1f}x', f'{lex_seconds:.2f} s'],
+    ['AST', megabytes(ast_memory), f'{ast_memory / source_size:.1f}x', f'{parse_seconds:.2f} s'],
+    ['peak', megabytes(peak - baseline), f'{(peak - baseline) / source_size:.1f}x', ''],
+    ['streamed', megabytes(stream_peak), f'{stream_peak / source_size:.1f}x', f'{stream_seconds:.2f} s'],
+  ])
+
+if __name__ == '__main__':
+  main_benchmark()
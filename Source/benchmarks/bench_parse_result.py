@@ -0,0 +1,72 @@
+#######################################
+# PARSE RESULT BENCHMARK
+#######################################
+# Times parsing every program in Source/code --scale times over (tokens
+# are lexed once beforehand), and counts the ParseResult calls each
+# token costs: every consumed token goes through register_advancement
+# and every parsing method's result through register, so their cost on
+# the error-free path sets the floor for the whole parser.
+#
+#   python benchmarks/bench_parse_result.py [--scale N] [--repeat N]
+
+import argparse
+
+from bench_utils import sample_programs, best_time, print_table
+
+from lexer import Lexer
+from parser import Parser
+from parse_result import ParseResult
+
+def count_calls(tokens):
+  counts = {'ParseResult()': 0, 'register_advancement': 0, 'register': 0}
+  originals = {name: getattr(ParseResult, name) for name in ('__init__', 'register_advancement', 'register')}
+
+  def counted(name, label):
+    def call(*arguments):
+      counts[label] += 1
+      return originals[name](*arguments)
+    return call
+
+  ParseResult.__init__ = counted('__init__', 'ParseResult()')
+  ParseResult.register_advancement = counted('register_advancement', 'register_advancement')
+  ParseResult.register = counted('register', 'register')
+  try:
+    Parser(tokens).parse()
+  finally:
+    for name, original in originals.items():
+      setattr(ParseResult, name, original)
+  return counts
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--scale', type=int, default=1000)
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  total_tokens = total_seconds = 0
+  for filename, text in sample_programs():
+    tokens, error = Lexer(filename, text).Tokenize()
+    if error: raise SystemExit(error.as_string())
+    result = Parser(tokens).parse()
+    if result.error: raise SystemExit(result.error.as_string())
+
+    def parse_scaled():
+      for _ in range(arguments.scale):
+        Parser(tokens).parse()
+
+    seconds = best_time(parse_scaled, arguments.repeat)
+    counts = count_calls(tokens)
+    total_tokens += len(tokens) * arguments.scale
+    total_seconds += seconds
+    rows.append([
+      filename.rsplit('/', 1)[-1], f'{len(tokens) * arguments.scale:,}', f'{seconds * 1000:.0f} ms',
+      f'{seconds / (len(tokens) * arguments.scale) * 1e9:.0f} ns',
+      *(f'{count / len(tokens):.1f}' for count in counts.values()),
+    ])
+
+  rows.append(['total', f'{total_tokens:,}', f'{total_seconds * 1000:.0f} ms', f'{total_seconds / total_tokens * 1e9:.0f} ns', '', '', ''])
+  print_table(['program', 'tokens', 'parse', 'per token', 'results/token', 'advancements/token', 'registers/token'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,67 @@
+#######################################
+# PARSE SCALING BENCHMARK
+#######################################
+# Parses inputs of doubling size and reports the time per token, which
+# stays flat when parsing is linear: deeply nested parentheses, deeply
+# nested blocks and a long list of statements. Tokens are lexed up front
+# so only the parser is timed.
+#
+#   python benchmarks/bench_parse_scaling.py [--depth N] [--statements N] [--steps N]
+
+import argparse
+import sys
+
+from bench_utils import best_time, print_table
+
+from lexer import Lexer
+from parser import Parser
+
+def nested_expression(depth):
+  return 'print(' + '(' * depth + '1' + ' + 1)' * depth + ')\n'
+
+def nested_blocks(depth):
+  opening = ''.join('    ' * level + f'while x{level} > 0 {{\n' for level in range(depth))
+  closing = ''.join('    ' * level + '}\n' for level in reversed(range(depth)))
+  return opening + '    ' * depth + 'print(x)\n' + closing
+
+def statement_list(count):
+  return ''.join(f'var x_{n}: x_{n} * 2 + {n}\n' for n in range(count))
+
+WORKLOADS = [
+  ('nested expression', nested_expression, 'depth'),
+  ('nested blocks', nested_blocks, 'depth'),
+  ('statement list', statement_list, 'statements'),
+]
+
+def parse_tokens(tokens):
+  result = Parser(tokens).parse()
+  if result.error: raise SystemExit(result.error.as_string())
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--depth', type=int, default=500)
+  argument_parser.add_argument('--statements', type=int, default=10_000)
+  argument_parser.add_argument('--steps', type=int, default=4)
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  # Every level of nesting is a dozen Python frames deep in the parser
+  sys.setrecursionlimit(max(sys.getrecursionlimit(), 1_000_000))
+
+  rows = []
+  for name, make_text, size_argument in WORKLOADS:
+    for step in range(arguments.steps):
+      size = getattr(arguments, size_argument) * 2 ** step
+      tokens, error = Lexer(f'<{name}>', make_text(size)).Tokenize()
+      if error: raise SystemExit(error.as_string())
+
+      seconds = best_time(lambda: parse_tokens(tokens), arguments.repeat)
+      rows.append([
+        name, f'{size:,}', f'{len(tokens):,}',
+        f'{seconds * 1000:.1f} ms', f'{seconds * 1e6 / len(tokens):.2f}',
+      ])
+
+  print_table(['workload', 'size', 'tokens', 'time', 'us/token'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,90 @@
+#######################################
+# STRING BUILDING BENCHMARK
+#######################################
+# Times jcode programs that concatenate --sizes short strings, under
+# --engine: a loop of '+' (var result: result + parts / i), which copies
+# the whole string so far on every step, a loop that appends to a
+# string_builder() and builds it once, and the join builtin. The strings
+# are set as the global list parts beforehand, and every way has to give
+# the same string.
+#
+# Each append is a builtin call, which costs about as much as a '+' on a
+# short string, so the builder only pulls ahead once copying the string
+# so far outweighs the call: its time per string stays flat as the
+# string grows, where the '+' loop's grows with it.
+#
+#   python benchmarks/bench_string_building.py [--sizes N ...] [--engine NAME] [--repeat N]
+
+import argparse
+
+from bench_utils import best_time, print_table, parse_program
+
+import main
+from context import Context
+from values import List, String
+
+PROGRAMS = {
+  "'+' loop": '''
+var result: ""
+for i = 0 to len(parts) {
+    var result: result + parts / i
+}
+''',
+  'string builder': '''
+var builder: string_builder()
+for i = 0 to len(parts) {
+    append(builder, parts / i)
+}
+var result: build(builder)
+''',
+  'join': '''
+var result: join(parts, "")
+''',
+}
+
+def run_time(program, engine, repeat):
+  """Seconds the fastest run of `program` took, and the string it left in `result`."""
+  prepared = main.prepare(parse_program('<string building>', program), engine)
+
+  def run():
+    context = Context('<program>')
+    context.symbol_table = main.global_symbol_table
+    result = prepared(context)
+    if result.error: raise SystemExit(result.error.as_string())
+
+  seconds = best_time(run, repeat)
+  return seconds, main.global_symbol_table.get('result').value
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 300_000])
+  argument_parser.add_argument('--engine', choices=main.ENGINES, default='closure')
+  argument_parser.add_argument('--repeat', type=int, default=3)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  mismatches = 0
+  for size in arguments.sizes:
+    main.global_symbol_table.set('parts', List([String(f'w{n % 100}.') for n in range(size)]))
+
+    times = {}
+    expected = None
+    for label, program in PROGRAMS.items():
+      times[label], result = run_time(program, arguments.engine, arguments.repeat)
+      if expected is None: expected = result
+      elif result != expected:
+        print(f'{label}: {size:,} strings give a different string from the \'+\' loop')
+        mismatches += 1
+
+    plus_seconds = times["'+' loop"]
+    rows.append([
+      f'{size:,}', f'{len(expected):,}',
+      *(f'{seconds * 1000:.1f} ms' for seconds in times.values()),
+      f'{plus_seconds / times["string builder"]:.1f}x', f'{plus_seconds / times["join"]:,.0f}x',
+    ])
+
+  print_table(['strings', 'characters', *PROGRAMS, 'builder speedup', 'join speedup'], rows)
+  if mismatches: raise SystemExit(f'{mismatches} ways of building differ from the \'+\' loop')
+
+if __name__ == '__main__':
+  main_benchmark()
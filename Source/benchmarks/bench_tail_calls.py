@@ -0,0 +1,127 @@
+#######################################
+# TAIL CALL BENCHMARK
+#######################################
+# Runs 100k-deep tail recursion under each engine: a self-recursive
+# function, a pair of mutually recursive functions and a method calling
+# itself on `self`. Each workload runs under a Python recursion limit of
+# --stack-limit frames, far below one frame per jcode call, so it only
+# completes if tail calls really run in constant Python stack. Each
+# run's result has to match the workload's expected value, and the
+# benchmark exits non-zero if any engine fails or gives a wrong one.
+#
+#   python benchmarks/bench_tail_calls.py [--depth N] [--stack-limit N] [--engines ...]
+
+import argparse
+import sys
+import time
+
+from bench_utils import parse_program, silenced, print_table
+
+import main
+from context import Context
+from values import Number
+
+SELF_PROGRAM = '''
+func count_down(int n, int total) {{
+    if n == 0: return total
+    return count_down(n - 1, total + 1)
+}}
+
+var result: count_down({depth}, 0)
+'''
+
+MUTUAL_PROGRAM = '''
+func is_even(int n) {{
+    if n == 0: return true
+    return is_odd(n - 1)
+}}
+
+func is_odd(int n) {{
+    if n == 0: return false
+    return is_even(n - 1)
+}}
+
+var result: is_even({depth})
+'''
+
+METHOD_PROGRAM = '''
+class Counter {{
+    func __init__(int start) {{
+        setattr(self, "start", start)
+    }}
+
+    func count(int n, int total) {{
+        if n == 0: return total
+        return self.count(n - 1, total + 1)
+    }}
+}}
+
+var counter: new Counter(0)
+var result: counter.count({depth}, 0)
+'''
+
+# Each workload with the value it leaves in `result` for a depth
+WORKLOADS = [
+  ('self', SELF_PROGRAM, lambda depth: depth),
+  ('mutual', MUTUAL_PROGRAM, lambda depth: int(depth % 2 == 0)),
+  ('method', METHOD_PROGRAM, lambda depth: depth),
+]
+
+def new_context():
+  context = Context('<program>')
+  context.symbol_table = main.global_symbol_table
+  return context
+
+def run_once(node, engine, stack_limit):
+  """Seconds the run took and the value it left in `result`, or None on a RecursionError."""
+  runner = main.prepare(node, engine)
+  main.global_symbol_table.set('result', Number.null)
+  recursion_limit = sys.getrecursionlimit()
+  sys.setrecursionlimit(stack_limit)
+  try:
+    with silenced():
+      start = time.perf_counter()
+      result = runner(new_context())
+      seconds = time.perf_counter() - start
+  except RecursionError:
+    return None
+  finally:
+    sys.setrecursionlimit(recursion_limit)
+  if result.error: raise SystemExit(result.error.as_string())
+  return seconds, main.global_symbol_table.get('result').value
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--depth', type=int, default=100_000)
+  argument_parser.add_argument('--stack-limit', type=int, default=200)
+  argument_parser.add_argument('--engines', nargs='+', choices=main.ENGINES, default=list(main.ENGINES))
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  failures = 0
+  for name, text, expected in WORKLOADS:
+    node = parse_program(f'<{name}>', text.format(depth=arguments.depth))
+    row = [name]
+    for engine in arguments.engines:
+      outcome = run_once(node, engine, arguments.stack_limit)
+      if outcome is None:
+        row += ['RecursionError', '']
+        failures += 1
+        continue
+
+      seconds, value = outcome
+      if value != expected(arguments.depth):
+        print(f'{name} under {engine}: got {value}, expected {expected(arguments.depth)}')
+        failures += 1
+      row += [f'{seconds * 1000:.0f} ms', f'{seconds * 1e9 / arguments.depth:,.0f}']
+    rows.append(row)
+
+  headers = ['workload']
+  for engine in arguments.engines:
+    headers += [engine, 'ns/call']
+  print(f'{arguments.depth:,} nested calls, Python recursion limit {arguments.stack_limit}')
+  print_table(headers, rows)
+  if failures: raise SystemExit(f'{failures} runs failed or gave a wrong result')
+
+if __name__ == '__main__':
+  main_benchmark()
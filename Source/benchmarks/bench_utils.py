@@ -0,0 +1,131 @@
+#######################################
+# BENCHMARK UTILITIES
+#######################################
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+SOURCE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CODE_DIR = os.path.join(SOURCE_DIR, 'code')
+
+if SOURCE_DIR not in sys.path:
+  sys.path.insert(0, SOURCE_DIR)
+
+def sample_programs():
+  """Returns (filename, text) pairs for every program in Source/code."""
+  programs = []
+  for path in sorted(glob.glob(os.path.join(CODE_DIR, '*.jcode'))):
+    with open(path, 'r', encoding='utf-8') as file:
+      programs.append((path, file.read()))
+  return programs
+
+@contextlib.contextmanager
+def silenced():
+  """Swallows anything the benchmarked jcode program prints."""
+  with contextlib.redirect_stdout(io.StringIO()):
+    yield
+
+def best_time(function, repeat=5):
+  """Returns the fastest of `repeat` timed calls, in seconds."""
+  best = float('inf')
+  for _ in range(repeat):
+    start = time.perf_counter()
+    function()
+    best = min(best, time.perf_counter() - start)
+  return best
+
+def print_table(headers, rows):
+  widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+  print('  '.join(str(cell).ljust(width) for cell, width in zip(headers, widths)))
+  print('  '.join('-' * width for width in widths))
+  for row in rows:
+    print('  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)))
+
+def parse_program(filename, text):
+  """Lexes, parses, resolves and optimizes `text`, raising if the program has an error."""
+  from lexer import Lexer
+  from parser import Parser
+  from resolver import Resolver
+  from optimizer import Optimizer
+  import main
+
+  tokens, error = Lexer(filename, text).Tokenize()
+  if error: raise SystemExit(error.as_string())
+  ast = Parser(tokens).parse()
+  if ast.error: raise SystemExit(ast.error.as_string())
+  error = Resolver(main.global_symbol_table, main.builtins).resolve(ast.node)
+  if error: raise SystemExit(error.as_string())
+  return Optimizer(main.global_symbol_table).optimize(ast.node)
+
+def dump_tree(value):
+  """A comparable copy of a parsed tree: node classes, tokens and positions."""
+  from position import Position
+  from tokens import Token
+
+  value_type = type(value)
+  if value_type is Position:
+    return ('position', value.index, value.line_and_column())
+  if value_type is Token:
+    return ('token', value.type, value.value, dump_tree(value.position_start), dump_tree(value.position_end))
+  if value_type is list or value_type is tuple:
+    return [dump_tree(item) for item in value]
+  if hasattr(value_type, '__slots__'):
+    return (value_type.__name__, [dump_tree(getattr(value, slot, None)) for slot in value_type.__slots__])
+  return value
+
+LOOP_PROGRAM = '''
+func work(int n) {
+    var total: 0
+    for i = 0 to n {
+        var total: total + i * 2 - 1
+        if total > 1000000: var total: 0
+    }
+    return total
+}
+
+print(work(20000))
+'''
+
+LIST_PROGRAM = '''
+func total(list values) {
+    var sum: 0
+    for i = 0 to len(values) {
+        var sum: sum + values / i
+    }
+    return sum
+}
+
+var values: []
+for i = 0 to 3000 {
+    append(values, i)
+}
+
+var grand: 0
+for round = 0 to 10 {
+    var grand: grand + total(values)
+}
+print(grand)
+'''
+
+GENERATED_BLOCK = '''/// <summary>Helper number {n}</summary>
+func helper_{n}(int a, int b) {{
+    var total: a + b * 2
+    for i = 0 to 10 {{
+        var total: total + i
+    }}
+    return total
+}}
+
+var value_{n}: helper_{n}(1, 2) - 3 / 4
+var items_{n}: [1, 2.5, "three {n}", value_{n}]
+# comment {n}
+'''
+
+def generated_program(line_count):
+  """Returns a syntactically valid jcode program of about `line_count` lines."""
+  block_lines = GENERATED_BLOCK.count('\n')
+  return ''.join(GENERATED_BLOCK.format(n=n) for n in range(max(1, line_count // block_lines)))
@@ -0,0 +1,70 @@
+#######################################
+# VALUE COPY BENCHMARK
+#######################################
+# Runs a list-processing workload under each engine and reports how many
+# Value.copy() calls it makes alongside the run time. Variable reads hand
+# out the stored value, so copies should only remain where a call site
+# needs its own positioned callee.
+#
+#   python benchmarks/bench_value_copies.py [--repeat N]
+
+import argparse
+import contextlib
+
+from bench_utils import parse_program, silenced, best_time, print_table, LIST_PROGRAM
+
+import main
+from context import Context
+from values import Number, String, List, Function, BuiltInFunction
+
+COPYING_CLASSES = (Number, String, List, Function, BuiltInFunction)
+
+def new_context():
+  context = Context('<program>')
+  context.symbol_table = main.global_symbol_table
+  return context
+
+@contextlib.contextmanager
+def counting_copies(counts):
+  originals = {cls: cls.copy for cls in COPYING_CLASSES}
+
+  def counted(original, name):
+    def copy(self):
+      counts[name] = counts.get(name, 0) + 1
+      return original(self)
+    return copy
+
+  for cls, original in originals.items():
+    cls.copy = counted(original, cls.__name__)
+  try:
+    yield
+  finally:
+    for cls, original in originals.items():
+      cls.copy = original
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  node = parse_program('<list workload>', LIST_PROGRAM)
+  rows = []
+
+  for engine in main.ENGINES:
+    runner = main.prepare(node, engine)
+
+    counts = {}
+    with counting_copies(counts), silenced():
+      runner(new_context())
+
+    with silenced():
+      seconds = best_time(lambda: runner(new_context()), arguments.repeat)
+
+    rows.append([engine, f'{seconds * 1000:.1f} ms', sum(counts.values())] + [
+      counts.get(cls.__name__, 0) for cls in COPYING_CLASSES
+    ])
+
+  print_table(['engine', 'time', 'copies'] + [cls.__name__ for cls in COPYING_CLASSES], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
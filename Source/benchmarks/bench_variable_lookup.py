@@ -0,0 +1,87 @@
+#######################################
+# VARIABLE LOOKUP BENCHMARK
+#######################################
+# Measures what resolving variables ahead of time buys. Each workload is run
+# twice per engine: once on a resolved tree (locals in frame slots, globals
+# and builtins addressed directly) and once on the same program parsed
+# without the resolver, where every read walks the chain of symbol tables
+# by name. The tree-walking interpreter always looks names up, so only the
+# compiled engines are compared.
+#
+#   python benchmarks/bench_variable_lookup.py [--repeat N]
+
+import argparse
+
+from bench_utils import parse_program, silenced, best_time, print_table, LOOP_PROGRAM
+
+import main
+from context import Context
+from lexer import Lexer
+from parser import Parser
+
+# Globals and builtins read from the bottom of a deep call chain
+DEEP_PROGRAM = '''
+var scale: 3
+
+func descend(int depth) {
+    if depth > 0: return descend(depth - 1)
+    var total: 0
+    for i = 0 to 2000 {
+        var total: total + scale * is_num(i)
+    }
+    return total
+}
+
+var result: 0
+for round = 0 to 20 {
+    var result: result + descend(60)
+}
+print(result)
+'''
+
+WORKLOADS = [
+  ('locals', LOOP_PROGRAM),
+  ('globals at depth 60', DEEP_PROGRAM),
+]
+
+def parse_unresolved(text):
+  tokens, error = Lexer('<benchmark>', text).Tokenize()
+  if error: raise SystemExit(error.as_string())
+  ast = Parser(tokens).parse()
+  if ast.error: raise SystemExit(ast.error.as_string())
+  return ast.node
+
+def timed(node, engine, repeat):
+  runner = main.prepare(node, engine)
+
+  def run():
+    context = Context('<program>')
+    context.symbol_table = main.global_symbol_table
+    result = runner(context)
+    if result.error: raise SystemExit(result.error.as_string())
+
+  with silenced():
+    return best_time(run, repeat)
+
+def main_benchmark():
+  argument_parser = argparse.ArgumentParser()
+  argument_parser.add_argument('--repeat', type=int, default=5)
+  arguments = argument_parser.parse_args()
+
+  rows = []
+  for name, text in WORKLOADS:
+    resolved = parse_program(f'<{name}>', text)
+    unresolved = parse_unresolved(text)
+
+    for engine in ('closure', 'vm'):
+      by_name = timed(unresolved, engine, arguments.repeat)
+      addressed = timed(resolved, engine, arguments.repeat)
+      rows.append([
+        name, engine,
+        f'{by_name * 1000:.2f} ms', f'{addressed * 1000:.2f} ms', f'{by_name / addressed:.2f}x'
+      ])
+
+  print_table(['workload', 'engine', 'by name', 'resolved', 'speedup'], rows)
+
+if __name__ == '__main__':
+  main_benchmark()
@@ -0,0 +1,420 @@
+#######################################
+# BYTECODE
+#######################################
+
+from tokens import *
+from nodes import *
+from values import Number
+from resolver import *
+
+###################################
+# OPCODES
+###################################
+
+OPCODE_NAMES = [
+  'LOAD_CONST',
+  'LOAD_STRING',
+  'LOAD_NULL',
+  'LOAD_FAST',
+  'LOAD_NAME',
+  'LOAD_GLOBAL',
+  'STORE_FAST',
+  'STORE_NAME',
+  'STORE_GLOBAL',
+  'CHECK_TYPE',
+  'BINARY_OP',
+  'UNARY_NEGATE',
+  'UNARY_NOT',
+  'BUILD_LIST',
+  'POP',
+  'JUMP',
+  'POP_JUMP_IF_FALSE',
+  'FOR_PREPARE',
+  'FOR_ITER',
+  'WHILE_PREPARE',
+  'SETUP_LOOP',
+  'POP_BLOCK',
+  'LOOP_APPEND',
+  'LOOP_END',
+  'BREAK',
+  'CONTINUE',
+  'RETURN_VALUE',
+  'MAKE_FUNCTION',
+  'CALL',
+  'INDEX',
+  'MAKE_CLASS',
+  'LOAD_CLASS',
+  'NEW_INSTANCE',
+  'GET_ATTRIBUTE',
+  'LOAD_METHOD',
+  'CALL_METHOD',
+  'TAIL_CALL',
+  'TAIL_CALL_METHOD',
+]
+
+(
+  LOAD_CONST, LOAD_STRING, LOAD_NULL, LOAD_FAST, LOAD_NAME,
+  LOAD_GLOBAL, STORE_FAST, STORE_NAME, STORE_GLOBAL, CHECK_TYPE, BINARY_OP, UNARY_NEGATE, UNARY_NOT,
+  BUILD_LIST, POP, JUMP, POP_JUMP_IF_FALSE, FOR_PREPARE, FOR_ITER,
+  WHILE_PREPARE, SETUP_LOOP, POP_BLOCK, LOOP_APPEND, LOOP_END, BREAK, CONTINUE,
+  RETURN_VALUE, MAKE_FUNCTION, CALL, INDEX, MAKE_CLASS, LOAD_CLASS,
+  NEW_INSTANCE, GET_ATTRIBUTE, LOAD_METHOD, CALL_METHOD, TAIL_CALL, TAIL_CALL_METHOD,
+) = range(len(OPCODE_NAMES))
+
+BINARY_OPERATION_METHODS = (
+  'added_to',
+  'subtracted_by',
+  'multiplied_by',
+  'divided_by',
+  'powered_by',
+  'equals',
+  'not_equals',
+  'less_than',
+  'greater_than',
+  'less_than_or_equal_to',
+  'greater_than_or_equal_to',
+  'anded_by',
+  'ored_by',
+)
+
+BINARY_OPERATION_INDICES = {
+  TT_PLUS:               0,
+  TT_MINUS:              1,
+  TT_MULTIPLY:           2,
+  TT_DIVIDE:             3,
+  TT_POWER:              4,
+  TT_EQUAL_EQUAL:        5,
+  TT_NOT_EQUAL:          6,
+  TT_LESS_THAN:          7,
+  TT_GREATER_THAN:       8,
+  TT_LESS_THAN_EQUAL:    9,
+  TT_GREATER_THAN_EQUAL: 10,
+  (TT_KEYWORD, 'and'):   11,
+  (TT_KEYWORD, 'or'):    12,
+}
+
+###################################
+# CODE OBJECTS
+###################################
+
+class CodeObject:
+  """
+  A compiled program or function body.
+
+  `instructions` is a flat [opcode, argument, opcode, argument, ...] list and
+  `nodes` holds the AST node each instruction came from, so the VM can report
+  errors at exactly the positions the tree-walking interpreter would.
+  Function bodies keep their locals in slots numbered by `slot_indices`.
+  """
+
+  def __init__(self, name, local_names=()):
+    self.name = name
+    self.instructions = []
+    self.nodes = []
+    self.constants = []
+    self.names = []
+    self.local_names = list(local_names)
+    self.slot_indices = {name: index for index, name in enumerate(self.local_names)}
+
+  def add_constant(self, value):
+    self.constants.append(value)
+    return len(self.constants) - 1
+
+  def add_name(self, name):
+    if name in self.names: return self.names.index(name)
+    self.names.append(name)
+    return len(self.names) - 1
+
+  def emit(self, opcode, argument=0, node=None):
+    self.instructions.append(opcode)
+    self.instructions.append(argument)
+    self.nodes.append(node)
+    return len(self.instructions) - 2
+
+  def patch(self, instruction_index, argument):
+    self.instructions[instruction_index + 1] = argument
+
+  def here(self):
+    return len(self.instructions)
+
+  def disassemble(self):
+    lines = []
+    for index in range(0, len(self.instructions), 2):
+      opcode, argument = self.instructions[index], self.instructions[index + 1]
+      lines.append(f'{index:5} {OPCODE_NAMES[opcode]:<18} {argument}')
+    return '\n'.join(lines)
+
+class LazyCode:
+  """
+  The code of a function whose body is parsed on its first call (see
+  LazyBodyNode): load() compiles it then.
+  """
+
+  def __init__(self, compile_code):
+    self.compile_code = compile_code
+    self.code = None
+
+  def load(self):
+    if self.code is None: self.code = self.compile_code()
+    return self.code
+
+class FunctionTemplate:
+  def __init__(self, node, name, argument_names, code):
+    self.node = node
+    self.name = name
+    self.argument_names = argument_names
+    self.code = code
+
+class ClassTemplate:
+  def __init__(self, node, methods):
+    self.node = node
+    self.methods = methods  # List of (MethodDefNode, argument names, CodeObject)
+
+###################################
+# COMPILER
+###################################
+
+class BytecodeCompiler:
+  def __init__(self, global_symbol_table=None):
+    # Resolved globals and builtins are addressed in this table directly
+    self.global_symbol_table = global_symbol_table
+
+  def compile_program(self, node):
+    code = CodeObject('<program>')
+    self.compile(node, code)
+    return code
+
+  def compile_function(self, name, argument_names, definition_node):
+    body_node = definition_node.body_node
+    if type(body_node) is LazyBodyNode:
+      return LazyCode(lambda: self.compile_function(name, argument_names, definition_node))
+    local_names = definition_node.local_names
+
+    # Trees that skipped the resolver get the same layout, minus the addressing
+    if local_names is None:
+      local_names = list(argument_names)
+      for binding in scope_bindings(body_node):
+        if binding_name(binding) not in local_names: local_names.append(binding_name(binding))
+
+    code = CodeObject(name, local_names)
+    self.compile(body_node, code)
+    return code
+
+  def compile(self, node, code):
+    method_name = f'compile_{type(node).__name__}'
+    method = getattr(self, method_name, self.no_compile_method)
+    method(node, code)
+
+  def no_compile_method(self, node, code):
+    _ = code
+    raise Exception(f'No compile_{type(node).__name__} method defined')
+
+  def emit_load(self, name, code, node):
+    if node.scope == SCOPE_BUILTIN and self.global_symbol_table:
+      code.emit(LOAD_CONST, code.add_constant(self.global_symbol_table.get(name)), node)
+    elif node.scope == SCOPE_GLOBAL and self.global_symbol_table:
+      code.emit(LOAD_GLOBAL, code.add_name(name), node)
+    elif node.scope == SCOPE_LOCAL or (node.scope is None and name in code.slot_indices):
+      code.emit(LOAD_FAST, code.slot_indices[name], node)
+    else:
+      code.emit(LOAD_NAME, code.add_name(name), node)
+
+  def emit_store(self, name, code, node):
+    if node.scope == SCOPE_GLOBAL and self.global_symbol_table:
+      code.emit(STORE_GLOBAL, code.add_name(name), node)
+    elif node.scope == SCOPE_LOCAL or (node.scope is None and name in code.slot_indices):
+      code.emit(STORE_FAST, code.slot_indices[name], node)
+    else:
+      code.emit(STORE_NAME, code.add_name(name), node)
+
+  ###################################
+
+  def compile_NumberNode(self, node, code):
+    code.emit(LOAD_CONST, code.add_constant(Number.of(node.token.value)), node)
+
+  def compile_StringNode(self, node, code):
+    code.emit(LOAD_STRING, code.add_constant(node.token.value), node)
+
+  def compile_ListNode(self, node, code):
+    for element_node in node.element_nodes:
+      self.compile(element_node, code)
+    code.emit(BUILD_LIST, len(node.element_nodes), node)
+
+  def compile_VarAccessNode(self, node, code):
+    self.emit_load(node.variable_name_token.value, code, node)
+
+  def compile_VarAssignNode(self, node, code):
+    self.compile(node.value_node, code)
+    if node.type_token:
+      code.emit(CHECK_TYPE, 0, node)
+    self.emit_store(node.variable_name_token.value, code, node)
+
+  def compile_BinaryOperationNode(self, node, code):
+    self.compile(node.left_node, code)
+    self.compile(node.right_node, code)
+
+    operation_token = node.operation_token
+    operation = BINARY_OPERATION_INDICES.get(operation_token.type)
+    if operation is None:
+      operation = BINARY_OPERATION_INDICES[(operation_token.type, operation_token.value)]
+    code.emit(BINARY_OP, operation, node)
+
+  def compile_UnaryOpNode(self, node, code):
+    self.compile(node.node, code)
+
+    if node.operation_token.type == TT_MINUS:
+      code.emit(UNARY_NEGATE, 0, node)
+    elif node.operation_token.matches(TT_KEYWORD, 'not'):
+      code.emit(UNARY_NOT, 0, node)
+
+  def compile_IfNode(self, node, code):
+    end_jumps = []
+
+    for condition, expression, should_return_null in node.cases:
+      self.compile(condition, code)
+      next_case_jump = code.emit(POP_JUMP_IF_FALSE, 0, node)
+      self.compile_branch(expression, should_return_null, code)
+      end_jumps.append(code.emit(JUMP, 0, node))
+      code.patch(next_case_jump, code.here())
+
+    if node.else_case:
+      expression, should_return_null = node.else_case
+      self.compile_branch(expression, should_return_null, code)
+    else:
+      code.emit(LOAD_NULL, 0, node)
+
+    for end_jump in end_jumps:
+      code.patch(end_jump, code.here())
+
+  def compile_branch(self, expression, should_return_null, code):
+    self.compile(expression, code)
+    if should_return_null:
+      code.emit(POP, 0, expression)
+      code.emit(LOAD_NULL, 0, expression)
+
+  def compile_ForNode(self, node, code):
+    self.compile(node.start_value_node, code)
+    self.compile(node.end_value_node, code)
+    if node.step_value_node:
+      self.compile(node.step_value_node, code)
+    else:
+      code.emit(LOAD_CONST, code.add_constant(Number.of(1)), node)
+
+    code.emit(FOR_PREPARE, int(node.should_return_null), node)
+
+    variable_name = node.variable_name_token.value
+    if node.scope == SCOPE_LOCAL or (node.scope is None and variable_name in code.slot_indices):
+      target = code.slot_indices[variable_name]
+    else:
+      target = -1 - code.add_name(variable_name)
+
+    # [break target, first body instruction] and [loop variable, exit target]
+    loop_targets = code.add_constant([0, 0])
+    iteration_targets = code.add_constant([target, 0])
+
+    code.emit(SETUP_LOOP, loop_targets, node)
+    loop_start = code.here()
+    code.emit(FOR_ITER, iteration_targets, node)
+    code.constants[loop_targets][1] = code.here()
+
+    self.compile_loop_body(node, code, loop_start)
+
+    code.constants[iteration_targets][1] = code.here()
+    code.emit(POP_BLOCK, 0, node)
+    code.constants[loop_targets][0] = code.here()
+    code.emit(LOOP_END, 0, node)
+
+  def compile_WhileNode(self, node, code):
+    code.emit(WHILE_PREPARE, int(node.should_return_null), node)
+
+    loop_targets = code.add_constant([0, 0])
+    code.emit(SETUP_LOOP, loop_targets, node)
+    loop_start = code.here()
+
+    self.compile(node.condition_node, code)
+    exit_jump = code.emit(POP_JUMP_IF_FALSE, 0, node)
+    code.constants[loop_targets][1] = code.here()
+
+    self.compile_loop_body(node, code, loop_start)
+
+    code.patch(exit_jump, code.here())
+    code.emit(POP_BLOCK, 0, node)
+    code.constants[loop_targets][0] = code.here()
+    code.emit(LOOP_END, 0, node)
+
+  def compile_loop_body(self, node, code, loop_start):
+    self.compile(node.body_node, code)
+    if node.should_return_null:
+      code.emit(POP, 0, node)
+    else:
+      code.emit(LOOP_APPEND, 0, node)
+    code.emit(JUMP, loop_start, node)
+
+  def compile_FuncDefNode(self, node, code):
+    function_name = node.variable_name_token.value if node.variable_name_token else None
+    argument_names = [argument_name.value for argument_name in node.argument_name_tokens]
+    function_code = self.compile_function(function_name or '<anonymous>', argument_names, node)
+
+    template = FunctionTemplate(node, function_name, argument_names, function_code)
+    code.emit(MAKE_FUNCTION, code.add_constant(template), node)
+    if function_name:
+      self.emit_store(function_name, code, node)
+
+  def compile_CallNode(self, node, code, is_tail_call=False):
+    self.compile(node.node_to_call, code)
+    for argument_node in node.argument_nodes:
+      self.compile(argument_node, code)
+    code.emit(TAIL_CALL if is_tail_call else CALL, len(node.argument_nodes), node)
+
+  def compile_ReturnNode(self, node, code):
+    if node.is_tail_call:
+      # The tail call opcodes return the call for the returning function to make
+      compile_call = self.compile_CallNode if type(node.node_to_return) is CallNode else self.compile_MethodCallNode
+      compile_call(node.node_to_return, code, is_tail_call=True)
+    elif node.node_to_return:
+      self.compile(node.node_to_return, code)
+    else:
+      code.emit(LOAD_NULL, 0, node)
+    code.emit(RETURN_VALUE, 0, node)
+
+  def compile_ContinueNode(self, node, code):
+    code.emit(CONTINUE, 0, node)
+
+  def compile_BreakNode(self, node, code):
+    code.emit(BREAK, 0, node)
+
+  def compile_IndexNode(self, node, code):
+    self.compile(node.list_or_string_node, code)
+    self.compile(node.index_node, code)
+    code.emit(INDEX, 0, node)
+
+  def compile_ClassDefNode(self, node, code):
+    methods = []
+    for method_node in node.method_nodes:
+      argument_names = [arg.value for arg in method_node.argument_name_tokens]
+      method_code = self.compile_function(
+        method_node.method_name_token.value, ['self'] + argument_names, method_node
+      )
+      methods.append((method_node, argument_names, method_code))
+
+    code.emit(MAKE_CLASS, code.add_constant(ClassTemplate(node, methods)), node)
+    self.emit_store(node.class_name_token.value, code, node)
+
+  def compile_InstanceCreationNode(self, node, code):
+    # The class is looked up before any constructor argument is evaluated
+    code.emit(LOAD_CLASS, code.add_name(node.class_name_token.value), node)
+    for argument_node in node.argument_nodes:
+      self.compile(argument_node, code)
+    code.emit(NEW_INSTANCE, len(node.argument_nodes), node)
+
+  def compile_AttributeAccessNode(self, node, code):
+    self.compile(node.object_node, code)
+    code.emit(GET_ATTRIBUTE, 0, node)
+
+  def compile_MethodCallNode(self, node, code, is_tail_call=False):
+    # Arguments are only evaluated once the method has been looked up
+    self.compile(node.object_node, code)
+    code.emit(LOAD_METHOD, 0, node)
+    for argument_node in node.argument_nodes:
+      self.compile(argument_node, code)
+    code.emit(TAIL_CALL_METHOD if is_tail_call else CALL_METHOD, len(node.argument_nodes), node)
@@ -0,0 +1,554 @@
+#######################################
+# CLOSURE COMPILER
+#######################################
+
+from runtime_result import *
+from interpreter import check_declared_type, index_into, positioned, operation_error, index_error, binary_operation
+from values import *
+from errors import *
+from tokens import *
+from nodes import *
+from resolver import SCOPE_LOCAL, SCOPE_GLOBAL, SCOPE_BUILTIN
+
+class ClosureBody:
+  """
+  A compiled function body or program.
+
+  `run` returns plain values and raises signals; calling the body itself
+  reports the outcome as a RuntimeResult, like Interpreter.visit would.
+  Function bodies keep their locals in slots numbered by `slot_indices`.
+  """
+
+  def __init__(self, run, slot_indices=None):
+    self.run = run
+    self.slot_indices = slot_indices
+
+  def __call__(self, context):
+    return RuntimeResult.capture(self.run, context)
+
+def call_function(function, arguments, position_start):
+  # BaseFunction.call for closure-compiled bodies, minus the RuntimeResult wrapping
+  while True:
+    execution_context = function.generate_new_context(position_start)
+    argument_names = function.argument_names
+
+    if len(arguments) != len(argument_names):
+      function.check_arguments(argument_names, arguments, execution_context).unwrap()
+    function.populate_args(argument_names, arguments, execution_context)
+
+    try:
+      value = function.body_runner.run(execution_context)
+    except ReturnSignal as signal:
+      if function.should_auto_return: return None
+      if type(signal.value) is not TailCall: return signal.value
+
+      tail_call = signal.value
+      function, arguments, position_start = tail_call.function, tail_call.arguments, tail_call.position_start
+      if type(function.body_runner) is not ClosureBody:
+        return function.call(arguments, position_start).unwrap()
+      continue
+
+    return value if function.should_auto_return else Number.null
+
+def call_value(value_to_call, node, arguments, position_start):
+  if type(getattr(value_to_call, 'body_runner', None)) is ClosureBody:
+    return call_function(value_to_call, arguments, position_start)
+  return value_to_call.execute(node, arguments, position_start).unwrap()
+
+class ClosureCompiler:
+  """
+  Turns a parsed node tree into a tree of pre-bound Python closures.
+
+  Every node is dispatched exactly once, at compile time. The closures return
+  values directly and raise signals for errors, return, break and continue,
+  so the success path never builds a RuntimeResult.
+
+  Variables the resolver has addressed are read and written in place: locals
+  in their frame slot, globals in `global_symbol_table`, builtins as the
+  value itself. Anything else goes through the caller chain by name.
+  """
+
+  def __init__(self, global_symbol_table=None):
+    self.global_symbol_table = global_symbol_table
+
+  def compile_body(self, node, local_names=None):
+    if local_names is None:
+      return ClosureBody(self.compile(node))
+    return ClosureBody(self.compile(node), {name: index for index, name in enumerate(local_names)})
+
+  def compile(self, node):
+    method_name = f'compile_{type(node).__name__}'
+    method = getattr(self, method_name, self.no_compile_method)
+    return method(node)
+
+  def no_compile_method(self, node):
+    raise Exception(f'No compile_{type(node).__name__} method defined')
+
+  ###################################
+
+  def compile_NumberNode(self, node):
+    # Numbers are immutable, so every evaluation can hand out the same one
+    value = Number.of(node.token.value)
+
+    def run(context):
+      return value
+    return run
+
+  def compile_StringNode(self, node):
+    value = node.token.value
+
+    def run(context):
+      return String(value)
+    return run
+
+  def compile_ListNode(self, node):
+    element_runners = [self.compile(element_node) for element_node in node.element_nodes]
+
+    def run(context):
+      return List([element_runner(context) for element_runner in element_runners])
+    return run
+
+  def compile_VarAccessNode(self, node):
+    variable_name = node.variable_name_token.value
+    position_start, position_end = node.position_start, node.position_end
+
+    def not_defined(context):
+      return ErrorSignal(RuntimeError(
+        position_start, position_end,
+        f"'{variable_name}' is not defined",
+        context
+      ))
+
+    if node.scope == SCOPE_BUILTIN and self.global_symbol_table:
+      value = self.global_symbol_table.get(variable_name)
+
+      def run(context):
+        return value
+      return run
+
+    if node.scope == SCOPE_GLOBAL and self.global_symbol_table:
+      global_symbols = self.global_symbol_table.symbols
+      frame_names = self.global_symbol_table.frame_names
+
+      def run(context):
+        if variable_name in frame_names: value = context.symbol_table.get(variable_name)
+        else: value = global_symbols.get(variable_name)
+        if value is None: raise not_defined(context)
+        return value
+      return run
+
+    if node.scope == SCOPE_LOCAL:
+      slot = node.slot
+
+      def run(context):
+        symbol_table = context.symbol_table
+        value = symbol_table.slots[slot]
+
+        # Not assigned in this frame yet, so the name still resolves through the caller
+        if value is None:
+          value = symbol_table.get(variable_name)
+          if value is None: raise not_defined(context)
+        return value
+      return run
+
+    def run(context):
+      value = context.symbol_table.get(variable_name)
+      if value is None: raise not_defined(context)
+      return value
+    return run
+
+  def compile_store(self, node, variable_name):
+    """Returns store(context, value) for a binding the resolver addressed."""
+    if node.scope == SCOPE_LOCAL:
+      slot = node.slot
+
+      def store(context, value):
+        context.symbol_table.slots[slot] = value
+      return store
+
+    if node.scope == SCOPE_GLOBAL and self.global_symbol_table:
+      global_symbols = self.global_symbol_table.symbols
+
+      def store(context, value):
+        global_symbols[variable_name] = value
+      return store
+
+    def store(context, value):
+      context.symbol_table.set(variable_name, value)
+    return store
+
+  def compile_VarAssignNode(self, node):
+    variable_name = node.variable_name_token.value
+    value_runner = self.compile(node.value_node)
+    is_typed = node.type_token is not None
+
+    if node.scope == SCOPE_LOCAL and not is_typed:
+      slot = node.slot
+
+      def run(context):
+        variable_value = context.symbol_table.slots[slot] = value_runner(context)
+        return variable_value
+      return run
+
+    store = self.compile_store(node, variable_name)
+
+    def run(context):
+      variable_value = value_runner(context)
+
+      if is_typed:
+        error = check_declared_type(node, variable_value, context)
+        if error: raise ErrorSignal(error)
+
+      store(context, variable_value)
+      return variable_value
+    return run
+
+  def compile_BinaryOperationNode(self, node):
+    left_runner = self.compile(node.left_node)
+    right_runner = self.compile(node.right_node)
+    method_name, handler = binary_operation(node.operation_token)
+
+    def run(context):
+      left = left_runner(context)
+      right = right_runner(context)
+
+      result = handler(left, right)
+      if result is None: raise ErrorSignal(operation_error(method_name, node, left, right, context))
+      return result
+    return run
+
+  def compile_UnaryOpNode(self, node):
+    operand_runner = self.compile(node.node)
+    is_negation = node.operation_token.type == TT_MINUS
+    is_not = node.operation_token.matches(TT_KEYWORD, 'not')
+    operand_node = node.node
+
+    def run(context):
+      number = operand_runner(context)
+
+      if is_negation:
+        result, error = number.multiplied_by(Number.of(-1))
+        if error:
+          _, error = positioned(number, operand_node, context).multiplied_by(Number.of(-1))
+          raise ErrorSignal(error)
+        return result
+      if is_not:
+        result, error = number.notted()
+        if error:
+          _, error = positioned(number, operand_node, context).notted()
+          raise ErrorSignal(error)
+        return result
+      return number
+    return run
+
+  def compile_IfNode(self, node):
+    cases = [
+      (self.compile(condition), self.compile(expression), should_return_null)
+      for condition, expression, should_return_null in node.cases
+    ]
+    else_case = None
+    if node.else_case:
+      expression, should_return_null = node.else_case
+      else_case = (self.compile(expression), should_return_null)
+
+    def run(context):
+      for condition_runner, expression_runner, should_return_null in cases:
+        if condition_runner(context).is_true():
+          expression_value = expression_runner(context)
+          return Number.null if should_return_null else expression_value
+
+      if else_case:
+        expression_runner, should_return_null = else_case
+        expression_value = expression_runner(context)
+        return Number.null if should_return_null else expression_value
+
+      return Number.null
+    return run
+
+  def compile_ForNode(self, node):
+    variable_name = node.variable_name_token.value
+    start_runner = self.compile(node.start_value_node)
+    end_runner = self.compile(node.end_value_node)
+    step_runner = self.compile(node.step_value_node) if node.step_value_node else None
+    body_runner = self.compile(node.body_node)
+    store = self.compile_store(node, variable_name)
+    should_return_null = node.should_return_null
+
+    def run(context):
+      elements = []
+
+      start_value = start_runner(context)
+      end_value = end_runner(context)
+      step_value = step_runner(context) if step_runner else Number.of(1)
+
+      index = start_value.value
+      end = end_value.value
+      step = step_value.value
+      counting_up = step >= 0
+
+      while index < end if counting_up else index > end:
+        store(context, Number.of(index))
+        index += step
+
+        try:
+          value = body_runner(context)
+        except ContinueSignal: continue
+        except BreakSignal: break
+
+        if not should_return_null: elements.append(value)
+
+      return Number.null if should_return_null else List(elements)
+    return run
+
+  def compile_WhileNode(self, node):
+    condition_runner = self.compile(node.condition_node)
+    body_runner = self.compile(node.body_node)
+    should_return_null = node.should_return_null
+
+    def run(context):
+      elements = []
+
+      # A break/continue raised by the condition belongs to an outer loop
+      while condition_runner(context).is_true():
+        try:
+          value = body_runner(context)
+        except ContinueSignal: continue
+        except BreakSignal: break
+
+        if not should_return_null: elements.append(value)
+
+      return Number.null if should_return_null else List(elements)
+    return run
+
+  def compile_definition_body(self, definition_node):
+    if type(definition_node.body_node) is LazyBodyNode:
+      # Compiled once the body is parsed, on the first call
+      return LazyBodyRunner(lambda: self.compile_body(definition_node.body_node, definition_node.local_names))
+    return self.compile_body(definition_node.body_node, definition_node.local_names)
+
+  def compile_FuncDefNode(self, node):
+    function_name = node.variable_name_token.value if node.variable_name_token else None
+    body_node = node.body_node
+    body_runner = self.compile_definition_body(node)
+    store = self.compile_store(node, function_name) if function_name else None
+    argument_names = [argument_name.value for argument_name in node.argument_name_tokens]
+    should_auto_return = node.should_auto_return
+    position_start, position_end = node.position_start, node.position_end
+
+    def run(context):
+      function_value = Function(
+        function_name, body_node, argument_names, should_auto_return, body_runner
+      ).set_context(context).set_position(position_start, position_end)
+
+      if store:
+        store(context, function_value)
+
+      return function_value
+    return run
+
+  def compile_CallNode(self, node, is_tail_call=False):
+    callee_runner = self.compile(node.node_to_call)
+    argument_runners = [self.compile(argument_node) for argument_node in node.argument_nodes]
+    position_start, position_end = node.position_start, node.position_end
+
+    def run(context):
+      # The called copy carries the call site: its position for argument errors
+      # and the calling context, which becomes the parent scope of the call
+      value_to_call = callee_runner(context).copy().set_position(position_start, position_end).set_context(context)
+      arguments = [argument_runner(context) for argument_runner in argument_runners]
+
+      if is_tail_call:
+        tail_call = TailCall.of(value_to_call, arguments, position_start)
+        if tail_call: return tail_call
+
+      # Distinguish between user-defined and built-in functions
+      if isinstance(value_to_call, BuiltInFunction):
+        return value_to_call.execute(node, arguments, position_start).unwrap()
+      return call_value(value_to_call, None, arguments, position_start)
+    return run
+
+  def compile_ReturnNode(self, node):
+    if node.is_tail_call:
+      # The returning function makes the call; see call_function
+      compile_call = self.compile_CallNode if type(node.node_to_return) is CallNode else self.compile_MethodCallNode
+      value_runner = compile_call(node.node_to_return, is_tail_call=True)
+    else:
+      value_runner = self.compile(node.node_to_return) if node.node_to_return else None
+
+    def run(context):
+      raise ReturnSignal(value_runner(context) if value_runner else Number.null)
+    return run
+
+  def compile_ContinueNode(self, node):
+    _ = node
+
+    def run(context):
+      raise ContinueSignal()
+    return run
+
+  def compile_BreakNode(self, node):
+    _ = node
+
+    def run(context):
+      raise BreakSignal()
+    return run
+
+  def compile_IndexNode(self, node):
+    collection_runner = self.compile(node.list_or_string_node)
+    index_runner = self.compile(node.index_node)
+
+    def run(context):
+      list_or_string = collection_runner(context)
+      index = index_runner(context)
+
+      result, error = index_into(node, list_or_string, index, context)
+      if error: raise ErrorSignal(index_error(node, list_or_string, index, context))
+      return result
+    return run
+
+  def compile_ClassDefNode(self, node):
+    class_name = node.class_name_token.value
+    parent_class_token = node.parent_class_token
+    position_start, position_end = node.position_start, node.position_end
+
+    method_definitions = []
+    for method_node in node.method_nodes:
+      method_definitions.append((
+        method_node,
+        [arg.value for arg in method_node.argument_name_tokens],
+        self.compile_definition_body(method_node)
+      ))
+    store = self.compile_store(node, class_name)
+
+    def run(context):
+      # Get parent class if specified
+      parent_class = None
+      if parent_class_token:
+        parent_class_name = parent_class_token.value
+        parent_class = context.symbol_table.get(parent_class_name)
+        if parent_class is None:
+          raise ErrorSignal(RuntimeError(
+            parent_class_token.position_start, parent_class_token.position_end,
+            f"Parent class '{parent_class_name}' is not defined",
+            context
+          ))
+        if not isinstance(parent_class, Class):
+          raise ErrorSignal(RuntimeError(
+            parent_class_token.position_start, parent_class_token.position_end,
+            f"'{parent_class_name}' is not a class",
+            context
+          ))
+
+      methods = {}
+      for method_node, argument_names, body_runner in method_definitions:
+        method_name = method_node.method_name_token.value
+        methods[method_name] = Method(
+          method_name,
+          method_node.body_node,
+          argument_names,
+          method_node.should_auto_return,
+          method_node.is_constructor,
+          body_runner
+        ).set_context(context).set_position(method_node.position_start, method_node.position_end)
+
+      class_value = Class(class_name, methods, parent_class).set_context(context).set_position(position_start, position_end)
+      store(context, class_value)
+
+      return class_value
+    return run
+
+  def compile_InstanceCreationNode(self, node):
+    class_name_token = node.class_name_token
+    class_name = class_name_token.value
+    argument_runners = [self.compile(arg_node) for arg_node in node.argument_nodes]
+    position_start = node.position_start
+
+    def run(context):
+      class_def = context.symbol_table.get(class_name)
+
+      if class_def is None:
+        raise ErrorSignal(RuntimeError(
+          class_name_token.position_start, class_name_token.position_end,
+          f"Class '{class_name}' is not defined",
+          context
+        ))
+
+      if not isinstance(class_def, Class):
+        raise ErrorSignal(RuntimeError(
+          class_name_token.position_start, class_name_token.position_end,
+          f"'{class_name}' is not a class",
+          context
+        ))
+
+      arguments = [argument_runner(context) for argument_runner in argument_runners]
+
+      return class_def.create_instance(arguments, position_start).unwrap()
+    return run
+
+  def compile_AttributeAccessNode(self, node):
+    object_runner = self.compile(node.object_node)
+    attribute_name_token = node.attribute_name_token
+    attribute_name = attribute_name_token.value
+    object_node = node.object_node
+
+    def run(context):
+      obj = object_runner(context)
+
+      if not isinstance(obj, Instance):
+        raise ErrorSignal(RuntimeError(
+          object_node.position_start, object_node.position_end,
+          f"Cannot access attribute of non-object",
+          context
+        ))
+
+      attribute = obj.get_attribute(attribute_name)
+      if attribute is None:
+        raise ErrorSignal(RuntimeError(
+          attribute_name_token.position_start, attribute_name_token.position_end,
+          f"'{obj.class_def.name}' object has no attribute '{attribute_name}'",
+          context
+        ))
+      return attribute
+    return run
+
+  def compile_MethodCallNode(self, node, is_tail_call=False):
+    object_runner = self.compile(node.object_node)
+    method_name_token = node.method_name_token
+    method_name = method_name_token.value
+    argument_runners = [self.compile(arg_node) for arg_node in node.argument_nodes]
+    object_node = node.object_node
+    position_start = node.position_start
+
+    def run(context):
+      obj = object_runner(context)
+
+      if not isinstance(obj, Instance):
+        raise ErrorSignal(RuntimeError(
+          object_node.position_start, object_node.position_end,
+          f"Cannot call method on non-object",
+          context
+        ))
+
+      method = obj.get_attribute(method_name)
+      if method is None:
+        raise ErrorSignal(RuntimeError(
+          method_name_token.position_start, method_name_token.position_end,
+          f"'{obj.class_def.name}' object has no method '{method_name}'",
+          context
+        ))
+
+      if not isinstance(method, BoundMethod):
+        raise ErrorSignal(RuntimeError(
+          method_name_token.position_start, method_name_token.position_end,
+          f"'{method_name}' is not a method",
+          context
+        ))
+
+      arguments = [argument_runner(context) for argument_runner in argument_runners]
+      if is_tail_call: return TailCall.of(method, arguments, position_start)
+
+      # BoundMethod.execute passes the instance as 'self'
+      if type(method.method.body_runner) is ClosureBody:
+        return call_function(method.method, [method.instance] + arguments, position_start)
+      return method.execute(node, arguments, position_start).unwrap()
+    return run
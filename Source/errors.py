@@ -41,16 +41,17 @@ class RuntimeError(Error):
     return result
 
   def generate_traceback(self):
-    result = ''
+    lines = []
     position = self.position_start
     context = self.context
 
+    # Innermost frame first; a tail-recursive error can sit under 100k of them
     while context:
-      result = f'  File {position.function_name}, line {str(position.line_number + 1)}, in {context.display_name}\n' + result
+      lines.append(f'  File {position.function_name}, line {str(position.line_number + 1)}, in {context.display_name}\n')
       position = context.parent_entry_position
       context = context.parent
 
-    return 'Traceback (most recent call last):\n' + result
+    return 'Traceback (most recent call last):\n' + ''.join(reversed(lines))
 
 class ConstantReassignmentError(Error):
   def __init__(self, position_start, position_end, variable_name):
@@ -0,0 +1,276 @@
+#######################################
+# INCREMENTAL PARSER
+#######################################
+
+from bisect import bisect_left
+
+from position import *
+from tokens import *
+from lexer import Lexer, LEXER_START_STATE, next_lexer_state
+from parser import Parser
+from parse_result import ParseResult
+from nodes import FuncDefNode, ListNode
+
+def offset_of(start_or_end):
+  # Tokens from the lexer hold offsets, apart from the end of a '\n'
+  return start_or_end if type(start_or_end) is int else start_or_end.index
+
+def shift_tokens(tokens, delta, shifted):
+  for token in tokens:
+    if type(token.start) is int: token.start += delta
+    elif id(token.start) not in shifted:
+      shifted.add(id(token.start))
+      token.start.index += delta
+
+    if type(token.end) is int: token.end += delta
+    elif id(token.end) not in shifted:
+      shifted.add(id(token.end))
+      token.end.index += delta
+
+def statement_positions(node, token_positions):
+  """Every Position in the tree of `node`, apart from the ones its tokens hold."""
+  positions = []
+  seen = set(token_positions)
+  slots_of = {}
+  stack = [node]
+  while stack:
+    value = stack.pop()
+    value_type = type(value)
+    if value_type is Position:
+      if id(value) not in seen:
+        seen.add(id(value))
+        positions.append(value)
+      continue
+    if value_type is list or value_type is tuple:
+      stack.extend(value)
+      continue
+
+    slots = slots_of.get(value_type)
+    if slots is None:
+      slots = slots_of[value_type] = () if value_type is Token else getattr(value_type, '__slots__', ())
+    for slot in slots:
+      stack.append(getattr(value, slot, None))
+  return positions
+
+def record_lexer_states(tokens, spans, token_index, lexer_state):
+  """Fills in the lexer states of `spans`, from `lexer_state` before tokens[token_index]."""
+  for span in spans:
+    while token_index < span.start:
+      lexer_state = next_lexer_state(lexer_state, tokens[token_index])
+      token_index += 1
+    span.lexer_state = lexer_state
+    while token_index < span.end:
+      lexer_state = next_lexer_state(lexer_state, tokens[token_index])
+      token_index += 1
+    span.end_lexer_state = lexer_state
+
+class StatementSpan:
+  """
+  The tokens of one top-level statement, [start, end), with the state the
+  lexer was in before `start` and before `end`, and the state of the
+  parser's statement list before it (see Parser.more_statements).
+
+  `positions` are the statement's own positions, gathered the first time
+  it is moved so later edits don't walk its tree again.
+  """
+
+  __slots__ = ('start', 'end', 'lexer_state', 'end_lexer_state', 'follows_function', 'had_blank_line', 'positions')
+
+  def __init__(self, start, end, follows_function, had_blank_line):
+    self.start = start
+    self.end = end
+    self.lexer_state = None
+    self.end_lexer_state = None
+    self.follows_function = follows_function
+    self.had_blank_line = had_blank_line
+    self.positions = None
+
+class TopLevel:
+  """Follows the program's statement list for Parser.more_statements."""
+
+  def __init__(self, reusable_spans=(), reusable_from=None, index_shift=0):
+    self.spans = []
+    self.reusable_spans = reusable_spans
+    self.reusable_starts = [span.start for span in reusable_spans]
+    self.reusable_from = reusable_from
+    self.index_shift = index_shift
+    self.reused_from = None
+
+  def parsed(self, start, end, last_func_end_position, had_blank_line_after_func):
+    self.spans.append(StatementSpan(start, end, last_func_end_position is not None, had_blank_line_after_func))
+
+  def reuse(self, token_index, last_func_end_position, had_blank_line_after_func):
+    # Only statements after the re-lexed tokens are the same as before, and
+    # only if the statement list reaches them in the same state
+    if self.reusable_from is None or token_index < self.reusable_from: return False
+
+    old_index = token_index - self.index_shift
+    position = bisect_left(self.reusable_starts, old_index)
+    if position == len(self.reusable_starts) or self.reusable_starts[position] != old_index: return False
+
+    span = self.reusable_spans[position]
+    if span.follows_function != (last_func_end_position is not None): return False
+    if span.had_blank_line != had_blank_line_after_func: return False
+
+    self.reused_from = position
+    return True
+
+class IncrementalParser:
+  """
+  Parses a document, then re-parses it after each edit reusing what the
+  edit did not touch.
+
+  An edit is re-lexed from the end of the last top-level statement before
+  it, until the new tokens line up with an old statement in the same lexer
+  state; the tokens after that are reused. The statement list is then
+  re-parsed from the same place until it reaches an old statement in the
+  same state, and the statements from there on are reused. The result is
+  the tree a full parse would build.
+
+  Reused tokens and nodes are moved in place, so the tree from before an
+  edit is no longer valid after it. A document with an error is parsed in
+  full on its next edit.
+  """
+
+  def __init__(self, filename, text):
+    self.filename = filename
+    self.source = SourceText(filename, text)
+    self.parse_all(text)
+
+  @property
+  def text(self):
+    return self.source.text
+
+  def parse_all(self, text):
+    self.set_text(text)
+    lexer = Lexer(self.filename, text, self.source)
+    tokens = list(lexer.generate_tokens())
+    if lexer.error: return self.fail(lexer.error)
+
+    top_level = TopLevel()
+    result = Parser(tokens).parse(top_level)
+    if result.error: return self.fail(result.error)
+
+    record_lexer_states(tokens, top_level.spans, 0, LEXER_START_STATE)
+    self.tokens = tokens
+    self.spans = top_level.spans
+    return self.succeed(result.node)
+
+  def edit(self, start, end, replacement):
+    """
+    Replaces text[start:end] with `replacement` and returns (node, error)
+    for the new text.
+    """
+    text = self.text
+    new_text = text[:start] + replacement + text[end:]
+    if self.error: return self.parse_all(new_text)
+
+    tokens, spans = self.tokens, self.spans
+    delta = len(replacement) - (end - start)
+
+    # Re-lex from the end of the last statement that ends before the edit.
+    # A statement can hold the position of the token after it (an empty
+    # block ends where the next token starts), so that one must end before
+    # the edit as well
+    lookahead_ends = [offset_of(tokens[span.end].end) for span in spans]
+    kept = bisect_left(lookahead_ends, start)
+    if kept:
+      restart = spans[kept - 1].end
+      restart_offset = offset_of(tokens[restart - 1].end)
+      restart_lexer_state = spans[kept - 1].end_lexer_state
+    else:
+      restart, restart_offset, restart_lexer_state = 0, 0, LEXER_START_STATE
+
+    self.set_text(new_text)
+    lexer = Lexer(self.filename, new_text, self.source)
+
+    # ... until a token starts an old statement after the edit, in the state
+    # the lexer was in there: every token after that is the same as before
+    candidate = bisect_left([offset_of(tokens[span.start].start) for span in spans], end)
+    relexed = []
+    resynced = None
+    lexer_state = restart_lexer_state
+    for token in lexer.generate_tokens(restart_offset, lexer_state):
+      token_offset = offset_of(token.start)
+      while candidate < len(spans) and offset_of(tokens[spans[candidate].start].start) + delta < token_offset:
+        candidate += 1
+      if (candidate < len(spans) and offset_of(tokens[spans[candidate].start].start) + delta == token_offset
+          and spans[candidate].lexer_state == lexer_state):
+        resynced = candidate
+        break
+      relexed.append(token)
+      lexer_state = next_lexer_state(lexer_state, token)
+
+    if lexer.error: return self.fail(lexer.error)
+
+    if resynced is None:
+      new_tokens = tokens[:restart] + relexed
+      reusable_spans, reusable_from, index_shift = (), None, 0
+    else:
+      reused_tokens = tokens[spans[resynced].start:]
+      shifted = set()
+      if delta: shift_tokens(reused_tokens, delta, shifted)
+      new_tokens = tokens[:restart] + relexed + reused_tokens
+      reusable_spans = spans[resynced:]
+      reusable_from = restart + len(relexed)
+      index_shift = reusable_from - spans[resynced].start
+
+    # Re-parse the statement list from the same place
+    top_level = TopLevel(reusable_spans, reusable_from, index_shift)
+    old_statements = self.node.element_nodes
+    if kept:
+      statements = old_statements[:kept]
+      last_func_end_position = None
+      for statement in reversed(statements):
+        if isinstance(statement, FuncDefNode):
+          last_func_end_position = statement.position_end
+          break
+      last_span = spans[kept - 1]
+      had_blank_line = last_span.had_blank_line and not isinstance(statements[-1], FuncDefNode)
+
+      parser = Parser(new_tokens, restart)
+      result = parser.more_statements(ParseResult(), statements, self.node.position_start, last_func_end_position, had_blank_line, top_level)
+    else:
+      parser = Parser(new_tokens)
+      result = parser.statements(top_level)
+
+    if result.error: return self.fail(result.error)
+
+    if top_level.reused_from is None:
+      result = parser.end_of_program(result)
+      if result.error: return self.fail(result.error)
+      node = result.node
+      new_spans = spans[:kept] + top_level.spans
+    else:
+      reused_spans = reusable_spans[top_level.reused_from:]
+      reused_statements = old_statements[len(spans) - len(reused_spans):]
+      if delta:
+        for span, statement in zip(reused_spans, reused_statements):
+          if span.positions is None: span.positions = statement_positions(statement, shifted)
+          for position in span.positions:
+            position.index += delta
+        if id(self.node.position_end) not in shifted: self.node.position_end.index += delta
+      for span in reused_spans:
+        span.start += index_shift
+        span.end += index_shift
+
+      node = ListNode(result.node.element_nodes + reused_statements, result.node.position_start, self.node.position_end)
+      new_spans = spans[:kept] + top_level.spans + list(reused_spans)
+
+    record_lexer_states(new_tokens, top_level.spans, restart, restart_lexer_state)
+    self.tokens = new_tokens
+    self.spans = new_spans
+    return self.succeed(node)
+
+  def set_text(self, text):
+    self.source.text = text
+    self.source.line_starts = None
+
+  def succeed(self, node):
+    self.node, self.error = node, None
+    return node, None
+
+  def fail(self, error):
+    self.node, self.error = None, error
+    self.tokens, self.spans = None, None
+    return None, error
@@ -7,6 +7,187 @@ from values import *
 from errors import *
 from tokens import *
 from nodes import *
+from resolver import SCOPE_GLOBAL, SCOPE_BUILTIN
+
+BINARY_OPERATION_METHODS = {
+  TT_PLUS:               'added_to',
+  TT_MINUS:              'subtracted_by',
+  TT_MULTIPLY:           'multiplied_by',
+  TT_DIVIDE:             'divided_by',
+  TT_POWER:              'powered_by',
+  TT_EQUAL_EQUAL:        'equals',
+  TT_NOT_EQUAL:          'not_equals',
+  TT_LESS_THAN:          'less_than',
+  TT_GREATER_THAN:       'greater_than',
+  TT_LESS_THAN_EQUAL:    'less_than_or_equal_to',
+  TT_GREATER_THAN_EQUAL: 'greater_than_or_equal_to',
+  (TT_KEYWORD, 'and'):   'anded_by',
+  (TT_KEYWORD, 'or'):    'ored_by',
+}
+
+# Binary operation handlers return the result, or None when the operation
+# fails; the caller then re-runs it through operation_error for the message.
+# Two Numbers skip the Value method and its (result, error) tuple.
+
+def binary_add(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.of(left.value + right.value)
+  return left.added_to(right)[0]
+
+def binary_subtract(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.of(left.value - right.value)
+  return left.subtracted_by(right)[0]
+
+def binary_multiply(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.of(left.value * right.value)
+  return left.multiplied_by(right)[0]
+
+def binary_divide(left, right):
+  if type(left) is Number and type(right) is Number and right.value != 0:
+    return Number(left.value / right.value)
+  return left.divided_by(right)[0]
+
+def binary_power(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.of(left.value ** right.value)
+  return left.powered_by(right)[0]
+
+def binary_equal(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.true if left.value == right.value else Number.false
+  return left.equals(right)[0]
+
+def binary_not_equal(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.true if left.value != right.value else Number.false
+  return left.not_equals(right)[0]
+
+def binary_less(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.true if left.value < right.value else Number.false
+  return left.less_than(right)[0]
+
+def binary_greater(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.true if left.value > right.value else Number.false
+  return left.greater_than(right)[0]
+
+def binary_less_or_equal(left, right):
+  # Number only defines less_than_or_equal_t, so this always takes the Value path
+  return left.less_than_or_equal_to(right)[0]
+
+def binary_greater_or_equal(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.true if left.value >= right.value else Number.false
+  return left.greater_than_or_equal_to(right)[0]
+
+def binary_and(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.of(int(left.value and right.value))
+  return left.anded_by(right)[0]
+
+def binary_or(left, right):
+  if type(left) is Number and type(right) is Number:
+    return Number.of(int(left.value or right.value))
+  return left.ored_by(right)[0]
+
+BINARY_OPERATION_HANDLERS = {
+  'added_to':                 binary_add,
+  'subtracted_by':            binary_subtract,
+  'multiplied_by':            binary_multiply,
+  'divided_by':               binary_divide,
+  'powered_by':               binary_power,
+  'equals':                   binary_equal,
+  'not_equals':               binary_not_equal,
+  'less_than':                binary_less,
+  'greater_than':             binary_greater,
+  'less_than_or_equal_to':    binary_less_or_equal,
+  'greater_than_or_equal_to': binary_greater_or_equal,
+  'anded_by':                 binary_and,
+  'ored_by':                  binary_or,
+}
+
+def binary_operation(operation_token):
+  """Returns (Value method name, handler) for a binary operator token."""
+  method_name = BINARY_OPERATION_METHODS.get(operation_token.type)
+  if method_name is None:
+    method_name = BINARY_OPERATION_METHODS[(operation_token.type, operation_token.value)]
+  return method_name, BINARY_OPERATION_HANDLERS[method_name]
+
+def check_declared_type(node, value, context):
+  type_name = node.type_token.value
+
+  # Check if the value matches the declared type
+  if type_name == 'int' and not isinstance(value, Number) or (isinstance(value, Number) and not isinstance(value.value, int)):
+    expected = 'int'
+  elif type_name == 'float' and not isinstance(value, Number):
+    expected = 'float'
+  elif type_name == 'string' and not isinstance(value, String):
+    expected = 'string'
+  elif type_name == 'list' and not isinstance(value, List):
+    expected = 'list'
+  elif type_name == 'function' and not isinstance(value, BaseFunction):
+    expected = 'function'
+  else:
+    return None
+
+  return RuntimeError(
+    node.position_start, node.position_end,
+    f"Type mismatch: Expected '{expected}', got '{type(value).__name__}'",
+    context
+  )
+
+def index_into(node, list_or_string, index, context):
+  if isinstance(list_or_string, (List, Map)):
+    # For lists and maps, use the divided_by method which already handles indexing
+    return list_or_string.divided_by(index)
+  elif isinstance(list_or_string, String):
+    # For strings, implement indexing
+    try:
+      idx = int(index.value)
+      if idx < 0 or idx >= len(list_or_string.value):
+        return None, RuntimeError(
+          node.position_start, node.position_end,
+          f"Index {idx} out of range for string of length {len(list_or_string.value)}",
+          context
+        )
+      return String(list_or_string.value[idx]), None
+    except ValueError:
+      return None, RuntimeError(
+        node.position_start, node.position_end,
+        f"Index must be an integer",
+        context
+      )
+  else:
+    return None, RuntimeError(
+      node.position_start, node.position_end,
+      f"Cannot index into {type(list_or_string).__name__}",
+      context
+    )
+
+def positioned(value, node, context):
+  # Values are handed out without copying, so they carry no position of
+  # their own; an error that reports an operand gets a copy placed at the
+  # node that produced it
+  while isinstance(node, VarAssignNode): node = node.value_node
+  return value.copy().set_position(node.position_start, node.position_end).set_context(context)
+
+def operation_error(method_name, node, left, right, context):
+  _, error = getattr(positioned(left, node.left_node, context), method_name)(
+    positioned(right, node.right_node, context)
+  )
+  return error
+
+def index_error(node, list_or_string, index, context):
+  _, error = index_into(
+    node,
+    positioned(list_or_string, node.list_or_string_node, context),
+    positioned(index, node.index_node, context),
+    context
+  )
+  return error
 
 class Interpreter:
   def visit(self, node, context):
@@ -21,14 +202,10 @@ class Interpreter:
   ###################################
 
   def visit_NumberNode(self, node, context):
-    return RuntimeResult().success(
-      Number(node.token.value).set_context(context).set_position(node.position_start, node.position_end)
-    )
+    return RuntimeResult().success(Number.of(node.token.value))
 
   def visit_StringNode(self, node, context):
-    return RuntimeResult().success(
-      String(node.token.value).set_context(context).set_position(node.position_start, node.position_end)
-    )
+    return RuntimeResult().success(String(node.token.value))
 
   def visit_ListNode(self, node, context):
     runtimeResult = RuntimeResult()
@@ -38,14 +215,19 @@ class Interpreter:
       elements.append(runtimeResult.register(self.visit(element_node, context)))
       if runtimeResult.should_return(): return runtimeResult
 
-    return runtimeResult.success(
-      List(elements).set_context(context).set_position(node.position_start, node.position_end)
-    )
+    return runtimeResult.success(List(elements))
 
   def visit_VarAccessNode(self, node, context):
     runtimeResult = RuntimeResult()
     variable_name = node.variable_name_token.value
-    value = context.symbol_table.get(variable_name)
+
+    # A name no function binds can only be found at the end of the caller
+    # chain; one a function of any program binds may be in a caller's frame
+    symbol_table = context.symbol_table
+    if node.scope == SCOPE_GLOBAL or node.scope == SCOPE_BUILTIN:
+      root = symbol_table.root
+      if variable_name not in root.frame_names: symbol_table = root
+    value = symbol_table.get(variable_name)
 
     if value is None:
       return runtimeResult.failure(RuntimeError(
@@ -54,11 +236,6 @@ class Interpreter:
         context
       ))
 
-    # Don't copy instances to preserve attribute state
-    if isinstance(value, Instance):
-      value = value.set_position(node.position_start, node.position_end).set_context(context)
-    else:
-      value = value.copy().set_position(node.position_start, node.position_end).set_context(context)
     return runtimeResult.success(value)
 
   def visit_VarAssignNode(self, node, context):
@@ -69,39 +246,8 @@ class Interpreter:
 
     # Type checking if a type was specified
     if node.type_token:
-      type_name = node.type_token.value
-
-      # Check if the value matches the declared type
-      if type_name == 'int' and not isinstance(variable_value, Number) or (isinstance(variable_value, Number) and not isinstance(variable_value.value, int)):
-        return runtimeResult.failure(RuntimeError(
-          node.position_start, node.position_end,
-          f"Type mismatch: Expected 'int', got '{type(variable_value).__name__}'",
-          context
-        ))
-      elif type_name == 'float' and not isinstance(variable_value, Number):
-        return runtimeResult.failure(RuntimeError(
-          node.position_start, node.position_end,
-          f"Type mismatch: Expected 'float', got '{type(variable_value).__name__}'",
-          context
-        ))
-      elif type_name == 'string' and not isinstance(variable_value, String):
-        return runtimeResult.failure(RuntimeError(
-          node.position_start, node.position_end,
-          f"Type mismatch: Expected 'string', got '{type(variable_value).__name__}'",
-          context
-        ))
-      elif type_name == 'list' and not isinstance(variable_value, List):
-        return runtimeResult.failure(RuntimeError(
-          node.position_start, node.position_end,
-          f"Type mismatch: Expected 'list', got '{type(variable_value).__name__}'",
-          context
-        ))
-      elif type_name == 'function' and not isinstance(variable_value, BaseFunction):
-        return runtimeResult.failure(RuntimeError(
-          node.position_start, node.position_end,
-          f"Type mismatch: Expected 'function', got '{type(variable_value).__name__}'",
-          context
-        ))
+      error = check_declared_type(node, variable_value, context)
+      if error: return runtimeResult.failure(error)
 
     context.symbol_table.set(variable_name, variable_value)
     return runtimeResult.success(variable_value)
@@ -113,40 +259,14 @@ class Interpreter:
     right = runtimeResult.register(self.visit(node.right_node, context))
     if runtimeResult.should_return(): return runtimeResult
 
-    if node.operation_token.type == TT_PLUS:
-      result, error = left.added_to(right)
-    elif node.operation_token.type == TT_MINUS:
-      result, error = left.subtracted_by(right)
-    elif node.operation_token.type == TT_MULTIPLY:
-      result, error = left.multiplied_by(right)
-    elif node.operation_token.type == TT_DIVIDE:
-      # This is now used for both division and indexing
-      # If left is a List, this is indexing
-      # Otherwise, it's division
-      result, error = left.divided_by(right)
-    elif node.operation_token.type == TT_POWER:
-      result, error = left.powered_by(right)
-    elif node.operation_token.type == TT_EQUAL_EQUAL:
-      result, error = left.equals(right)
-    elif node.operation_token.type == TT_NOT_EQUAL:
-      result, error = left.not_equals(right)
-    elif node.operation_token.type == TT_LESS_THAN:
-      result, error = left.less_than(right)
-    elif node.operation_token.type == TT_GREATER_THAN:
-      result, error = left.greater_than(right)
-    elif node.operation_token.type == TT_LESS_THAN_EQUAL:
-      result, error = left.less_than_or_equal_to(right)
-    elif node.operation_token.type == TT_GREATER_THAN_EQUAL:
-      result, error = left.greater_than_or_equal_to(right)
-    elif node.operation_token.matches(TT_KEYWORD, 'and'):
-      result, error = left.anded_by(right)
-    elif node.operation_token.matches(TT_KEYWORD, 'or'):
-      result, error = left.ored_by(right)
+    operation = node.operation
+    if operation is None:
+      operation = node.operation = binary_operation(node.operation_token)
 
-    if error:
-      return runtimeResult.failure(error)
-    else:
-      return runtimeResult.success(result.set_position(node.position_start, node.position_end))
+    result = operation[1](left, right)
+    if result is None:
+      return runtimeResult.failure(operation_error(operation[0], node, left, right, context))
+    return runtimeResult.success(result)
 
   def visit_UnaryOpNode(self, node, context):
     runtimeResult = RuntimeResult()
@@ -156,14 +276,20 @@ class Interpreter:
     error = None
 
     if node.operation_token.type == TT_MINUS:
-      number, error = number.multiplied_by(Number(-1))
+      result, error = number.multiplied_by(Number.of(-1))
+      if error:
+        _, error = positioned(number, node.node, context).multiplied_by(Number.of(-1))
     elif node.operation_token.matches(TT_KEYWORD, 'not'):
-      number, error = number.notted()
+      result, error = number.notted()
+      if error:
+        _, error = positioned(number, node.node, context).notted()
+    else:
+      result = number
 
     if error:
       return runtimeResult.failure(error)
     else:
-      return runtimeResult.success(number.set_position(node.position_start, node.position_end))
+      return runtimeResult.success(result)
 
   def visit_IfNode(self, node, context):
     runtimeResult = RuntimeResult()
@@ -199,7 +325,7 @@ class Interpreter:
       step_value = runtimeResult.register(self.visit(node.step_value_node, context))
       if runtimeResult.should_return(): return runtimeResult
     else:
-      step_value = Number(1)
+      step_value = Number.of(1)
 
     index = start_value.value
 
@@ -209,7 +335,7 @@ class Interpreter:
       condition = lambda: index > end_value.value
 
     while condition():
-      context.symbol_table.set(node.variable_name_token.value, Number(index))
+      context.symbol_table.set(node.variable_name_token.value, Number.of(index))
       index += step_value.value
 
       value = runtimeResult.register(self.visit(node.body_node, context))
@@ -217,12 +343,9 @@ class Interpreter:
       if runtimeResult.loop_should_continue:continue
       if runtimeResult.loop_should_break: break
 
-      elements.append(value)
+      if not node.should_return_null: elements.append(value)
 
-    return runtimeResult.success(
-      Number.null if node.should_return_null else
-      List(elements).set_context(context).set_position(node.position_start, node.position_end)
-    )
+    return runtimeResult.success(Number.null if node.should_return_null else List(elements))
 
   def visit_WhileNode(self, node, context):
     runtimeResult = RuntimeResult()
@@ -237,12 +360,9 @@ class Interpreter:
 
       if runtimeResult.loop_should_continue:continue
       if runtimeResult.loop_should_break: break
-      elements.append(value)
+      if not node.should_return_null: elements.append(value)
 
-    return runtimeResult.success(
-      Number.null if node.should_return_null else
-      List(elements).set_context(context).set_position(node.position_start, node.position_end)
-    )
+    return runtimeResult.success(Number.null if node.should_return_null else List(elements))
 
   def visit_FuncDefNode(self, node, context):
     runtimeResult = RuntimeResult()
@@ -257,18 +377,24 @@ class Interpreter:
 
     return runtimeResult.success(function_value)
 
-  def visit_CallNode(self, node, context):
+  def visit_CallNode(self, node, context, is_tail_call=False):
     runtimeResult = RuntimeResult()
     arguments = []
 
     value_to_call = runtimeResult.register(self.visit(node.node_to_call, context))
     if runtimeResult.should_return(): return runtimeResult
-    value_to_call = value_to_call.copy().set_position(node.position_start, node.position_end)
+    # The called copy carries the call site: its position for argument errors
+    # and the calling context, which becomes the parent scope of the call
+    value_to_call = value_to_call.copy().set_position(node.position_start, node.position_end).set_context(context)
 
     for argument_node in node.argument_nodes:
       arguments.append(runtimeResult.register(self.visit(argument_node, context)))
       if runtimeResult.should_return(): return runtimeResult
 
+    if is_tail_call:
+      tail_call = TailCall.of(value_to_call, arguments, node.position_start)
+      if tail_call: return runtimeResult.success(tail_call)
+
     # Distinguish between user-defined and built-in functions
     if isinstance(value_to_call, BuiltInFunction):
         return_value = runtimeResult.register(value_to_call.execute(node, arguments, node.position_start))
@@ -277,13 +403,17 @@ class Interpreter:
 
     # return_value = runtimeResult.register(value_to_call.execute(node, arguments, node.position_start))
     if runtimeResult.should_return(): return runtimeResult
-    return_value = return_value.copy().set_position(node.position_start, node.position_end).set_context(context)
     return runtimeResult.success(return_value)
 
   def visit_ReturnNode(self, node, context):
     runtimeResult = RuntimeResult()
 
-    if node.node_to_return:
+    if node.is_tail_call:
+      # The returning function makes the call; see BaseFunction.call
+      visit_call = self.visit_CallNode if type(node.node_to_return) is CallNode else self.visit_MethodCallNode
+      value = runtimeResult.register(visit_call(node.node_to_return, context, is_tail_call=True))
+      if runtimeResult.should_return(): return runtimeResult
+    elif node.node_to_return:
       value = runtimeResult.register(self.visit(node.node_to_return, context))
       if runtimeResult.should_return(): return runtimeResult
     else:
@@ -310,39 +440,10 @@ class Interpreter:
     index = runtimeResult.register(self.visit(node.index_node, context))
     if runtimeResult.should_return(): return runtimeResult
 
-    # Perform the indexing operation
-    if isinstance(list_or_string, List):
-      # For lists, use the divided_by method which already handles indexing
-      result, error = list_or_string.divided_by(index)
-    elif isinstance(list_or_string, String):
-      # For strings, implement indexing
-      try:
-        idx = int(index.value)
-        if idx < 0 or idx >= len(list_or_string.value):
-          return runtimeResult.failure(RuntimeError(
-            node.position_start, node.position_end,
-            f"Index {idx} out of range for string of length {len(list_or_string.value)}",
-            context
-          ))
-        result = String(list_or_string.value[idx])
-        error = None
-      except ValueError:
-        return runtimeResult.failure(RuntimeError(
-          node.position_start, node.position_end,
-          f"Index must be an integer",
-          context
-        ))
-    else:
-      return runtimeResult.failure(RuntimeError(
-        node.position_start, node.position_end,
-        f"Cannot index into {type(list_or_string).__name__}",
-        context
-      ))
-
+    result, error = index_into(node, list_or_string, index, context)
     if error:
-      return runtimeResult.failure(error)
-    else:
-      return runtimeResult.success(result.set_position(node.position_start, node.position_end))
+      return runtimeResult.failure(index_error(node, list_or_string, index, context))
+    return runtimeResult.success(result)
 
   def visit_ClassDefNode(self, node, context):
     runtimeResult = RuntimeResult()
@@ -421,7 +522,7 @@ class Interpreter:
     instance = runtimeResult.register(class_def.create_instance(arguments, node.position_start))
     if runtimeResult.should_return(): return runtimeResult
 
-    return runtimeResult.success(instance.set_position(node.position_start, node.position_end))
+    return runtimeResult.success(instance)
 
   def visit_AttributeAccessNode(self, node, context):
     runtimeResult = RuntimeResult()
@@ -440,7 +541,7 @@ class Interpreter:
           f"'{obj.class_def.name}' object has no attribute '{attribute_name}'",
           context
         ))
-      return runtimeResult.success(attribute.set_position(node.position_start, node.position_end))
+      return runtimeResult.success(attribute)
     else:
       return runtimeResult.failure(RuntimeError(
         node.object_node.position_start, node.object_node.position_end,
@@ -448,7 +549,7 @@ class Interpreter:
         context
       ))
 
-  def visit_MethodCallNode(self, node, context):
+  def visit_MethodCallNode(self, node, context, is_tail_call=False):
     runtimeResult = RuntimeResult()
 
     # Get the object
@@ -479,11 +580,14 @@ class Interpreter:
         arguments.append(runtimeResult.register(self.visit(arg_node, context)))
         if runtimeResult.should_return(): return runtimeResult
 
+      if is_tail_call:
+        return runtimeResult.success(TailCall.of(method, arguments, node.position_start))
+
       # Call method
       result = runtimeResult.register(method.execute(node, arguments, node.position_start))
       if runtimeResult.should_return(): return runtimeResult
 
-      return runtimeResult.success(result.set_position(node.position_start, node.position_end))
+      return runtimeResult.success(result)
     else:
       return runtimeResult.failure(RuntimeError(
         node.object_node.position_start, node.object_node.position_end,
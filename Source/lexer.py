@@ -2,320 +2,207 @@
 # LEXER
 #######################################
 
+import re
+import sys
+
 from position import *
-from constants import *
 from tokens import *
 from errors import *
 
+# One alternative per kind of lexeme, tried at each offset in this order.
+# Comments only match their opening characters; the lexer skips the rest.
+TOKEN_PATTERN = re.compile(r'''
+    (?P<space>[ \t]+)
+  | (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<newline>[;\n])
+  | (?P<number>[0-9]+(?:\.[0-9]*)?)
+  | (?P<comment>\#|//|/\*)
+  | (?P<operator>==|=>|!=|<=|>=|[-+*/^()\[\]{}:,.=<>])
+  | (?P<string>"[^"]*"?)
+''', re.VERBOSE)
+
+OPERATOR_TOKEN_TYPES = {
+  '+': TT_PLUS,
+  '-': TT_MINUS,
+  '*': TT_MULTIPLY,
+  '/': TT_DIVIDE,
+  '^': TT_POWER,
+  '(': TT_LEFT_PAREN,
+  ')': TT_RIGHT_PAREN,
+  '[': TT_LEFT_SQUARE,
+  ']': TT_RIGHT_SQUARE,
+  '{': TT_LEFT_BRACE,
+  '}': TT_RIGHT_BRACE,
+  ':': TT_COLON,
+  ',': TT_COMMA,
+  '.': TT_DOT,
+  '=': TT_EQUAL,
+  '==': TT_EQUAL_EQUAL,
+  '=>': TT_ARROW,
+  '!=': TT_NOT_EQUAL,
+  '<': TT_LESS_THAN,
+  '<=': TT_LESS_THAN_EQUAL,
+  '>': TT_GREATER_THAN,
+  '>=': TT_GREATER_THAN_EQUAL,
+}
+
+# The type and value of every keyword's tokens. A Lexer adds each
+# identifier it meets to a copy of this (see Lexer.names)
+KEYWORD_TOKENS = {keyword: (TT_KEYWORD, keyword) for keyword in KEYWORDS}
+
+# What the lexer carries from one token to the next: the newlines since the
+# last identifier or number, and whether a 'func' came before them
+LEXER_START_STATE = (0, False)
+
+def next_lexer_state(state, token):
+  """The state generate_tokens is in after yielding `token` from `state`."""
+  consecutive_newlines, last_token_was_func = state
+  if token.type == TT_NEWLINE:
+    consecutive_newlines += 1
+    return consecutive_newlines, last_token_was_func and consecutive_newlines < 2
+  if token.type in (TT_IDENTIFIER, TT_KEYWORD):
+    return 0, last_token_was_func or token.value == 'func'
+  if token.type in (TT_INT, TT_FLOAT):
+    return 0, last_token_was_func
+  return state
+
 class Lexer:
-  def __init__(self, function, text):
+  """
+  Splits source text into tokens with one compiled pattern.
+
+  The scanner works on string offsets only: tokens keep the offsets they
+  start and end at, and Positions (with their line and column) are made
+  from them when the parser or an error needs one.
+  """
+
+  def __init__(self, function, text, source=None):
     self.function = function
     self.text = text
-    self.position = Position(-1, 0, -1, function, text)
-    self.current_character = None
-    self.advance()
-
-  def advance(self):
-    self.position.advance(self.current_character)
-    if self.position.index < len(self.text):
-      self.current_character = self.text[self.position.index]
-    else: self.current_character = None
+    self.source = source or SourceText(function, text)
+    self.error = None
+    # Every word scanned so far, with its token type and its interned
+    # string: all tokens of a name share that string, as do the symbol
+    # tables the name is looked up in, so dict lookups hit on identity
+    self.names = dict(KEYWORD_TOKENS)
 
   def Tokenize(self):
-    tokens = []
-
-    # Track newlines and function definitions
-    consecutive_newlines = 0
-    last_token_was_func = False
-    # last_func_position = None
-
-    while self.current_character is not None:
-        if self.current_character in ' \t':
-            self.advance()
-        elif self.current_character == '#':
-            # If we're right after a function and haven't seen a blank line,
-            # insert a special token
-            if last_token_was_func and consecutive_newlines < 2:
-                tokens.append(Token(TT_NO_BLANK_LINE, position_start=self.position, position_end=self.position))
-            self.skip_comment()
-        elif self.current_character == '/' and self.check_next_character('/'):
-            # If we're right after a function and haven't seen a blank line,
-            # insert a special token
-            if last_token_was_func and consecutive_newlines < 2:
-                tokens.append(Token(TT_NO_BLANK_LINE, position_start=self.position, position_end=self.position))
-            self.skip_double_slash_comment()
-        elif self.current_character == '/' and self.check_next_character('*'):
-            # If we're right after a function and haven't seen a blank line,
-            # insert a special token
-            if last_token_was_func and consecutive_newlines < 2:
-                tokens.append(Token(TT_NO_BLANK_LINE, position_start=self.position, position_end=self.position))
-            self.skip_block_comment()
-        elif self.current_character in ';\n':
-            tokens.append(Token(TT_NEWLINE, position_start=self.position))
-            self.advance()
-            consecutive_newlines += 1
-
-            # If we've seen 2 or more consecutive newlines, reset the function flag
-            if consecutive_newlines >= 2:
-                last_token_was_func = False
-        else:
-            # Process actual code tokens
-            if self.current_character in DIGITS:
-                tokens.append(self.digitize())
-                consecutive_newlines = 0
-            elif self.current_character in LETTERS:
-                token = self.identifize()
-                tokens.append(token)
-
-                # Check if this is a function definition
-                if token.type == TT_KEYWORD and token.value == 'func':
-                    last_token_was_func = True
-                    # last_func_position = token.position_start.copy()
-
-                consecutive_newlines = 0
-            elif self.current_character == '}':
-                tokens.append(Token(TT_RIGHT_BRACE, position_start=self.position))
-                self.advance()
-
-                # Mark that we just ended a function
-                # This is a simplistic approach - in reality you'd need to track
-                # if this brace is actually ending a function
-                # last_token_was_func_end = True
-                # last_func_end_position = self.position.copy()
-            elif self.current_character == ':':
-              tokens.append(Token(TT_COLON, position_start=self.position))
-              self.advance()
-            elif self.current_character == '"':
-              tokens.append(self.stringify())
-            elif self.current_character == '+':
-              tokens.append(Token(TT_PLUS, position_start=self.position))
-              self.advance()
-            elif self.current_character == '-':
-              tokens.append(Token(TT_MINUS, position_start=self.position))
-              self.advance()
-            elif self.current_character == '*':
-              tokens.append(Token(TT_MULTIPLY, position_start=self.position))
-              self.advance()
-            elif self.current_character == '/':
-              tokens.append(Token(TT_DIVIDE, position_start=self.position))
-              self.advance()
-            elif self.current_character == '^':
-              tokens.append(Token(TT_POWER, position_start=self.position))
-              self.advance()
-            elif self.current_character == '(':
-              tokens.append(Token(TT_LEFT_PAREN, position_start=self.position))
-              self.advance()
-            elif self.current_character == ')':
-              tokens.append(Token(TT_RIGHT_PAREN, position_start=self.position))
-              self.advance()
-            elif self.current_character == '[':
-              tokens.append(Token(TT_LEFT_SQUARE, position_start=self.position))
-              self.advance()
-            elif self.current_character == ']':
-              tokens.append(Token(TT_RIGHT_SQUARE, position_start=self.position))
-              self.advance()
-            elif self.current_character == '{':
-              tokens.append(Token(TT_LEFT_BRACE, position_start=self.position))
-              self.advance()
-            elif self.current_character == '}':
-              tokens.append(Token(TT_RIGHT_BRACE, position_start=self.position))
-              self.advance()
-            elif self.current_character == '!':
-              token, error = self.not_equals()
-              if error: return [], error
-              tokens.append(token)
-            elif self.current_character == '=':
-              tokens.append(self.equalize())
-            elif self.current_character == '<':
-              tokens.append(self.less_than())
-            elif self.current_character == '>':
-              tokens.append(self.greater_than())
-            elif self.current_character == ',':
-              tokens.append(Token(TT_COMMA, position_start=self.position))
-              self.advance()
-            elif self.current_character == '.':
-              tokens.append(Token(TT_DOT, position_start=self.position))
-              self.advance()
-            else:
-              position_start = self.position.copy()
-              char = self.current_character
-              self.advance()
-              return [], IllegalCharacterError(position_start, self.position, "'" + char + "'")
-
-    tokens.append(Token(TT_END_OF_FILE, position_start=self.position))
+    tokens = list(self.generate_tokens())
+    if self.error: return [], self.error
     return tokens, None
 
-  def digitize(self):
-    number_string = ''
-    dot_count = 0
-    position_start = self.position.copy()
-
-    while self.current_character is not None and self.current_character in DIGITS + '.':
-      if self.current_character == '.':
-        if dot_count == 1: break
-        dot_count += 1
-      number_string += self.current_character
-      self.advance()
-
-    if dot_count == 0:
-      return Token(TT_INT, int(number_string), position_start, self.position)
-    else:
-      return Token(TT_FLOAT, float(number_string), position_start, self.position)
-
-  def stringify(self):
-    string = ''
-    position_start = self.position.copy()
-    escape_character = False
-    self.advance()
-
-    escape_characters = {
-      'n': '\n',
-      't': '\t'
-    }
-
-    while self.current_character is not None and (self.current_character != '"' or escape_character):
-      if escape_character:
-        string += escape_characters.get(self.current_character, self.current_character)
-      elif self.current_character != '\\':
-        string += self.current_character
-      self.advance()
-      escape_character = False
-
-    self.advance()
-    return Token(TT_STRING, string, position_start, self.position)
-
-  def identifize(self):
-    identifier_string = ''
-    position_start = self.position.copy()
-
-    while self.current_character is not None and self.current_character in LETTERS_AND_DIGITS + '_':
-      identifier_string += self.current_character
-      self.advance()
+  def generate_tokens(self, index=0, state=LEXER_START_STATE):
+    """
+    Yields tokens as they are scanned, ending with END_OF_FILE.
 
-    token_type = TT_KEYWORD if identifier_string in KEYWORDS else TT_IDENTIFIER
-    return Token(token_type, identifier_string, position_start, self.position)
+    An illegal character stops the scan: the error is left in `self.error`
+    and END_OF_FILE is yielded where it was found. Scanning can start at
+    any token boundary `index`, in the `state` the lexer was in there.
+    """
+    text = self.text
+    source = self.source
+    match = TOKEN_PATTERN.match
+    names = self.names
+    end = len(text)
 
-  def not_equals(self):
-    position_start = self.position.copy()
-    self.advance()
-
-    if self.current_character == '=':
-      self.advance()
-      return Token(TT_NOT_EQUAL, position_start=position_start, position_end=self.position), None
-
-    self.advance()
-    return None, ExpectedCharacterError(position_start, self.position, "'=' (after '!')")
-
-  def equalize(self):
-    token_type = TT_EQUAL
-    position_start = self.position.copy()
-    self.advance()
-
-    if self.current_character == '=':
-      self.advance()
-      token_type = TT_EQUAL_EQUAL
-
-    elif self.current_character == '>':
-      self.advance()
-      token_type = TT_ARROW
-
-    return Token(token_type, position_start=position_start, position_end=self.position)
+    # Track newlines and function definitions
+    consecutive_newlines, last_token_was_func = state
 
-  def less_than(self):
-    token_type = TT_LESS_THAN
-    position_start = self.position.copy()
-    self.advance()
+    while index < end:
+      found = match(text, index)
 
-    if self.current_character == '=':
-      self.advance()
-      token_type = TT_LESS_THAN_EQUAL
+      if found is None:
+        position_start = Position(index, source)
+        if text[index] == '!':
+          self.error = ExpectedCharacterError(position_start, Position(index + 2, source), "'=' (after '!')")
+        else:
+          self.error = IllegalCharacterError(position_start, Position(index + 1, source), "'" + text[index] + "'")
+        break
+
+      kind = found.lastgroup
+      match_end = found.end()
+
+      if kind == 'space':
+        pass
+      elif kind == 'identifier':
+        word = found.group()
+        name = names.get(word)
+        if name is None:
+          name = names[word] = (TT_IDENTIFIER, sys.intern(word))
+        token_type, identifier_string = name
+        yield Token(token_type, identifier_string, index, match_end, source)
+
+        # Check if this is a function definition
+        if identifier_string == 'func' and token_type == TT_KEYWORD:
+          last_token_was_func = True
+        consecutive_newlines = 0
+      elif kind == 'operator':
+        token_type = OPERATOR_TOKEN_TYPES[found.group()]
+        yield Token(token_type, None, index, match_end, source)
+      elif kind == 'newline':
+        # The end of a '\n' token stays on the newline's line
+        position_end = Position(match_end, source, PAST_NEWLINE) if text[index] == '\n' else match_end
+        yield Token(TT_NEWLINE, None, index, position_end, source)
+        consecutive_newlines += 1
+
+        # If we've seen 2 or more consecutive newlines, reset the function flag
+        if consecutive_newlines >= 2:
+          last_token_was_func = False
+      elif kind == 'number':
+        number_string = found.group()
+        value = float(number_string) if '.' in number_string else int(number_string)
+        yield Token(TT_FLOAT if '.' in number_string else TT_INT, value, index, match_end, source)
+        consecutive_newlines = 0
+      elif kind == 'string':
+        token = self.make_string(found.group(), index)
+        yield token
+        match_end = token.end
+      else:
+        # If we're right after a function and haven't seen a blank line,
+        # insert a special token
+        if last_token_was_func and consecutive_newlines < 2:
+          yield Token(TT_NO_BLANK_LINE, None, index, index, source)
+        match_end = self.skip_comment(found.group(), match_end)
 
-    return Token(token_type, position_start=position_start, position_end=self.position)
+      index = match_end
 
-  def greater_than(self):
-    token_type = TT_GREATER_THAN
-    position_start = self.position.copy()
-    self.advance()
+    yield Token(TT_END_OF_FILE, None, index, index + 1, source)
 
-    if self.current_character == '=':
-      self.advance()
-      token_type = TT_GREATER_THAN_EQUAL
+  def make_string(self, lexeme, start):
+    # A backslash is dropped; the character after it is kept as it is
+    if len(lexeme) >= 2 and lexeme[-1] == '"':
+      string, end = lexeme[1:-1], start + len(lexeme)
+    else:
+      # An unterminated string runs one past the end of the text
+      string, end = lexeme[1:], start + len(lexeme) + 1
+    return Token(TT_STRING, string.replace('\\', ''), start, end, self.source)
 
-    return Token(token_type, position_start=position_start, position_end=self.position)
+  def skip_comment(self, opening, index):
+    """Returns the offset just past the comment whose `opening` ends at `index`."""
+    text = self.text
 
-  def skip_comment(self):
-    self.advance()
-    while self.current_character != '\n': self.advance()
-    self.advance()
+    if opening == '/*':
+      return self.skip_block_comment(index)
 
-  def skip_block_comment(self):
-    self.advance()  # Skip the *
-    self.advance()  # Skip the opening /
+    # Line comments ('#', '//' and '///' doc comments) swallow their newline
+    newline = text.find('\n', index)
+    return len(text) if newline < 0 else newline + 1
 
+  def skip_block_comment(self, index):
+    # Block comments ('/* */' and '/** */' doc comments) nest
+    text = self.text
     nesting_level = 1
 
-    while self.current_character is not None and nesting_level > 0:
-      # Check for nested block comment start
-      if self.current_character == '/' and self.check_next_character('*'):
-        self.advance()  # Skip /
-        self.advance()  # Skip *
+    while nesting_level > 0:
+      comment_end = text.find('*/', index)
+      if comment_end < 0: return len(text)
+
+      # An opening may overlap the closing, as in '/*/'
+      comment_start = text.find('/*', index, comment_end + 1)
+      if comment_start >= 0:
         nesting_level += 1
-      # Check for block comment end
-      elif self.current_character == '*' and self.check_next_character('/'):
-        self.advance()  # Skip *
-        self.advance()  # Skip /
-        nesting_level -= 1
+        index = comment_start + 2
       else:
-        self.advance()
-
-  def check_next_character(self, string):
-    for offset, character in enumerate(string):
-        next_character_position = self.position.index + 1 + offset
-        if next_character_position >= len(self.text): return False
-        if self.text[next_character_position] != character: return False
-    return True
-
-  def skip_double_slash_comment(self):
-    self.advance()
-    self.advance()
-    while self.current_character is not None:
-        if self.current_character == '\n':
-          self.advance()
-          break
-        self.advance()
-
-  def make_doc_comment(self):
-    comment = ''
-    pos_start = self.pos.copy()
-
-    # Consume the three slashes
-    self.advance()
-    self.advance()
-    self.advance()
-
-    # Collect the rest of the line
-    while self.current_char is not None and self.current_char != '\n':
-        comment += self.current_char
-        self.advance()
-
-    return Token(TT_COMMENT, '///' + comment, pos_start, self.pos)
-
-  def make_doc_block_comment(self):
-    comment = ''
-    pos_start = self.pos.copy()
-
-    # Consume the opening /**
-    self.advance()
-    self.advance()
-    self.advance()
-
-    # Collect until closing */
-    while self.current_char is not None:
-        if self.current_char == '*' and self.peek() == '/':
-            self.advance()
-            self.advance()
-            break
-        comment += self.current_char
-        self.advance()
+        nesting_level -= 1
+        index = comment_end + 2
 
-    return Token(TT_COMMENT, '/**' + comment + '*/', pos_start, self.pos)
+    return index
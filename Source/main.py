@@ -4,12 +4,18 @@
 
 import sys
 import os
+import argparse
 
 from symbol_table import *
 from values import *
 from parser import *
 from interpreter import *
+from closure_compiler import *
+from vm import *
+from resolver import Resolver
+from optimizer import Optimizer
 from lexer import *
+from ast_cache import parse_source
 
 global_symbol_table = SymbolTable()
 
@@ -38,35 +44,85 @@ builtins = {
     "getattr":     BuiltInFunction.getattr,
     "setattr":     BuiltInFunction.setattr,
     "str":         BuiltInFunction.str,
+    "list_add":    BuiltInFunction.list_add,
+    "list_mul":    BuiltInFunction.list_mul,
+    "sum":         BuiltInFunction.sum,
+    "min":         BuiltInFunction.min,
+    "max":         BuiltInFunction.max,
+    "dot":         BuiltInFunction.dot,
+    "range":       BuiltInFunction.range,
+    "map_new":     BuiltInFunction.map_new,
+    "is_map":      BuiltInFunction.is_map,
+    "map_get":     BuiltInFunction.map_get,
+    "map_set":     BuiltInFunction.map_set,
+    "map_has":     BuiltInFunction.map_has,
+    "map_delete":  BuiltInFunction.map_delete,
+    "map_keys":    BuiltInFunction.map_keys,
+    "map_size":    BuiltInFunction.map_size,
+    "join":        BuiltInFunction.join,
+    "string_builder": BuiltInFunction.string_builder,
+    "build":       BuiltInFunction.build,
 }
 
 for name, value in builtins.items():
     global_symbol_table.set(name, value)
 
-def run(fn, text):
-    lexer = Lexer(fn, text)
-    tokens, error = lexer.Tokenize()
+ENGINES = ('interpreter', 'closure', 'vm')
+
+def prepare(node, engine='interpreter'):
+    """Prepares `node` for `engine`; the result runs it against a context."""
+    if engine == 'interpreter':
+        return lambda context: Interpreter().visit(node, context)
+    if engine == 'closure':
+        return ClosureCompiler(global_symbol_table).compile_body(node)
+    if engine == 'vm':
+        virtual_machine = VirtualMachine(global_symbol_table)
+        code = virtual_machine.compile(node)
+        return lambda context: virtual_machine.run(code, context)
+    raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+
+def execute(node, context, engine='interpreter'):
+    return prepare(node, engine)(context)
+
+def check(fn, text, use_cache=True, jobs=1):
+    """Parses every function body of `text` and resolves it without running it; returns the first error."""
+    node, error = parse_source(fn, text, use_cache, jobs)
+    if error:
+        return error
+    return Resolver(global_symbol_table, builtins).resolve(node)
+
+def run(fn, text, engine='interpreter', use_cache=True, jobs=1, lazy=False):
+    node, error = parse_source(fn, text, use_cache, jobs, lazy)
     if error:
         return None, error
 
-    parser = Parser(tokens)
-    ast = parser.parse()
-    if ast.error:
-        return None, ast.error
+    error = Resolver(global_symbol_table, builtins).resolve(node)
+    if error:
+        return None, error
+    node = Optimizer(global_symbol_table).optimize(node)
 
     context = Context('<program>')
     context.symbol_table = global_symbol_table
-    interpreter = Interpreter()
-    result = interpreter.visit(ast.node, context)
+    result = execute(node, context, engine)
 
     return result.value, result.error
 
 def main():
-    if len(sys.argv) < 2:
-        print(f"Usage: python3 {os.path.basename(__file__)} <file.jc>")
-        sys.exit(1)
-
-    filename = sys.argv[1]
+    argument_parser = argparse.ArgumentParser(prog=f"python3 {os.path.basename(__file__)}")
+    argument_parser.add_argument("file", help="the .jcode file to run")
+    argument_parser.add_argument("--engine", choices=ENGINES, default="interpreter",
+                                 help="execution engine (default: interpreter)")
+    argument_parser.add_argument("--no-cache", action="store_true",
+                                 help="always parse the file instead of using its cached tree (see ast_cache.cache_directory)")
+    argument_parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                                 help="parse a large file across N processes (0: one per core; default: 1)")
+    argument_parser.add_argument("--lazy", action="store_true",
+                                 help="parse each function body on its first call; syntax errors in bodies show up then")
+    argument_parser.add_argument("--check", action="store_true",
+                                 help="only parse and resolve the whole file, reporting any error, without running it")
+    arguments = argument_parser.parse_args()
+
+    filename = arguments.file
 
     if not os.path.isfile(filename):
         print(f"File not found: {filename}")
@@ -75,7 +131,10 @@ def main():
     with open(filename, 'r', encoding='utf-8') as f:
         text = f.read()
 
-    value, error = run(filename, text)
+    if arguments.check:
+        error = check(filename, text, not arguments.no_cache, arguments.jobs)
+    else:
+        value, error = run(filename, text, arguments.engine, not arguments.no_cache, arguments.jobs, arguments.lazy)
 
     if error:
         print(error.as_string() if hasattr(error, 'as_string') else str(error))
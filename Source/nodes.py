@@ -3,6 +3,8 @@
 #######################################
 
 class NumberNode:
+  __slots__ = ('token', 'position_start', 'position_end')
+
   def __init__(self, token):
     self.token = token
     self.position_start = self.token.position_start
@@ -12,6 +14,8 @@ class NumberNode:
     return f'{self.token}'
 
 class StringNode:
+  __slots__ = ('token', 'position_start', 'position_end')
+
   def __init__(self, token):
     self.token = token
     self.position_start = self.token.position_start
@@ -21,6 +25,8 @@ class StringNode:
     return f'{self.token}'
 
 class ListNode:
+  __slots__ = ('element_nodes', 'position_start', 'position_end')
+
   def __init__(self, element_nodes, position_start, position_end):
     self.element_nodes = element_nodes
     self.position_start = position_start
@@ -28,12 +34,23 @@ class ListNode:
 
 
 class VarAccessNode:
+  __slots__ = ('variable_name_token', 'position_start', 'position_end', 'scope', 'slot')
+
   def __init__(self, variable_name_token):
     self.variable_name_token = variable_name_token
     self.position_start = self.variable_name_token.position_start
     self.position_end = self.variable_name_token.position_end
 
+    # Where the name lives, filled in by the resolver
+    self.scope = None
+    self.slot = None
+
 class VarAssignNode:
+  __slots__ = (
+    'variable_name_token', 'value_node', 'type_token', 'is_constant',
+    'position_start', 'position_end', 'scope', 'slot',
+  )
+
   def __init__(self, variable_name_token, value_node, type_token=None, is_constant=False):
     self.variable_name_token = variable_name_token
     self.value_node = value_node
@@ -43,7 +60,16 @@ class VarAssignNode:
     self.position_start = self.variable_name_token.position_start
     self.position_end = self.value_node.position_end
 
+    # Where the name lives, filled in by the resolver
+    self.scope = None
+    self.slot = None
+
 class BinaryOperationNode:
+  __slots__ = (
+    'left_node', 'operation_token', 'right_node', 'position_start',
+    'position_end', 'operation',
+  )
+
   def __init__(self, left_node, operation_token, right_node):
     self.left_node = left_node
     self.operation_token = operation_token
@@ -51,10 +77,15 @@ class BinaryOperationNode:
     self.position_start = self.left_node.position_start
     self.position_end = self.right_node.position_end
 
+    # (method name, handler) for the operator, filled in the first time it runs
+    self.operation = None
+
   def __repr__(self):
     return f'({self.left_node}, {self.operation_token}, {self.right_node})'
 
 class UnaryOpNode:
+  __slots__ = ('operation_token', 'node', 'position_start', 'position_end')
+
   def __init__(self, operation_token, node):
     self.operation_token = operation_token
     self.node = node
@@ -65,6 +96,8 @@ class UnaryOpNode:
     return f'({self.operation_token}, {self.node})'
 
 class IfNode:
+  __slots__ = ('cases', 'else_case', 'position_start', 'position_end')
+
   def __init__(self, cases, else_case):
     self.cases = cases
     self.else_case = else_case
@@ -72,6 +105,12 @@ class IfNode:
     self.position_end = (self.else_case or self.cases[len(self.cases) - 1])[0].position_end
 
 class ForNode:
+  __slots__ = (
+    'variable_name_token', 'start_value_node', 'end_value_node',
+    'step_value_node', 'body_node', 'should_return_null', 'position_start',
+    'position_end', 'scope', 'slot',
+  )
+
   def __init__(self, variable_name_token, start_value_node, end_value_node, step_value_node, body_node, should_return_null):
     self.variable_name_token = variable_name_token
     self.start_value_node = start_value_node
@@ -82,7 +121,16 @@ class ForNode:
     self.position_start = self.variable_name_token.position_start
     self.position_end = self.body_node.position_end
 
+    # Where the name lives, filled in by the resolver
+    self.scope = None
+    self.slot = None
+
 class WhileNode:
+  __slots__ = (
+    'condition_node', 'body_node', 'should_return_null', 'position_start',
+    'position_end',
+  )
+
   def __init__(self, condition_node, body_node, should_return_null):
     self.condition_node = condition_node
     self.body_node = body_node
@@ -91,6 +139,12 @@ class WhileNode:
     self.position_end = self.body_node.position_end
 
 class FuncDefNode:
+  __slots__ = (
+    'variable_name_token', 'argument_name_tokens', 'argument_type_tokens',
+    'body_node', 'should_auto_return', 'return_type_token', 'xml_doc',
+    'position_start', 'position_end', 'scope', 'slot', 'local_names',
+  )
+
   def __init__(self, variable_name_token, argument_name_tokens, body_node, should_auto_return, argument_type_tokens=None, return_type_token=None, xml_doc=None):
     self.variable_name_token = variable_name_token
     self.argument_name_tokens = argument_name_tokens
@@ -108,8 +162,16 @@ class FuncDefNode:
       self.position_start = self.body_node.position_start
 
     self.position_end = self.body_node.position_end
+    if type(body_node) is LazyBodyNode: body_node.definition = self
+
+    # Where the name lives and the body's frame layout, filled in by the resolver
+    self.scope = None
+    self.slot = None
+    self.local_names = None
 
 class CallNode:
+  __slots__ = ('node_to_call', 'argument_nodes', 'position_start', 'position_end')
+
   def __init__(self, node_to_call, argument_nodes):
     self.node_to_call = node_to_call
     self.argument_nodes = argument_nodes
@@ -121,22 +183,33 @@ class CallNode:
       self.position_end = self.node_to_call.position_end
 
 class ReturnNode:
+  __slots__ = ('node_to_return', 'position_start', 'position_end', 'is_tail_call')
+
   def __init__(self, node_to_return, position_start, position_end):
     self.node_to_return = node_to_return
     self.position_start = position_start
     self.position_end = position_end
 
+    # Set by the resolver for `return f(...)` inside a function
+    self.is_tail_call = False
+
 class ContinueNode:
+  __slots__ = ('position_start', 'position_end')
+
   def __init__(self, position_start, position_end):
     self.position_start = position_start
     self.position_end = position_end
 
 class BreakNode:
+  __slots__ = ('position_start', 'position_end')
+
   def __init__(self, position_start, position_end):
     self.position_start = position_start
     self.position_end = position_end
 
 class IndexNode:
+  __slots__ = ('list_or_string_node', 'index_node', 'position_start', 'position_end')
+
   def __init__(self, list_or_string_node, index_node, position_start, position_end):
     self.list_or_string_node = list_or_string_node
     self.index_node = index_node
@@ -144,6 +217,11 @@ class IndexNode:
     self.position_end = position_end
 
 class ClassDefNode:
+  __slots__ = (
+    'class_name_token', 'parent_class_token', 'method_nodes', 'position_start',
+    'position_end', 'scope', 'slot',
+  )
+
   def __init__(self, class_name_token, parent_class_token, method_nodes, position_start, position_end):
     self.class_name_token = class_name_token
     self.parent_class_token = parent_class_token  # For inheritance (extends)
@@ -151,7 +229,17 @@ class ClassDefNode:
     self.position_start = position_start
     self.position_end = position_end
 
+    # Where the name lives, filled in by the resolver
+    self.scope = None
+    self.slot = None
+
 class MethodDefNode:
+  __slots__ = (
+    'method_name_token', 'argument_name_tokens', 'argument_type_tokens',
+    'body_node', 'should_auto_return', 'return_type_token', 'is_constructor',
+    'position_start', 'position_end', 'local_names',
+  )
+
   def __init__(self, method_name_token, argument_name_tokens, body_node, should_auto_return, argument_type_tokens=None, return_type_token=None, is_constructor=False):
     self.method_name_token = method_name_token
     self.argument_name_tokens = argument_name_tokens
@@ -169,8 +257,14 @@ class MethodDefNode:
       self.position_start = self.body_node.position_start
 
     self.position_end = self.body_node.position_end
+    if type(body_node) is LazyBodyNode: body_node.definition = self
+
+    # The body's frame layout, filled in by the resolver
+    self.local_names = None
 
 class InstanceCreationNode:
+  __slots__ = ('class_name_token', 'argument_nodes', 'position_start', 'position_end')
+
   def __init__(self, class_name_token, argument_nodes, position_start, position_end):
     self.class_name_token = class_name_token
     self.argument_nodes = argument_nodes  # Arguments for constructor
@@ -178,6 +272,8 @@ class InstanceCreationNode:
     self.position_end = position_end
 
 class AttributeAccessNode:
+  __slots__ = ('object_node', 'attribute_name_token', 'position_start', 'position_end')
+
   def __init__(self, object_node, attribute_name_token, position_start, position_end):
     self.object_node = object_node  # The object being accessed
     self.attribute_name_token = attribute_name_token  # The attribute/method name
@@ -185,9 +281,60 @@ class AttributeAccessNode:
     self.position_end = position_end
 
 class MethodCallNode:
+  __slots__ = (
+    'object_node', 'method_name_token', 'argument_nodes', 'position_start',
+    'position_end',
+  )
+
   def __init__(self, object_node, method_name_token, argument_nodes, position_start, position_end):
     self.object_node = object_node  # The object whose method is being called
     self.method_name_token = method_name_token  # The method name
     self.argument_nodes = argument_nodes  # Arguments for the method call
     self.position_start = position_start
     self.position_end = position_end
+
+class LazyBodyNode:
+  """
+  A function or method body the parser skipped (see Parser.lazy_body): its
+  tokens from after the '{' to the closing '}', and every name bound
+  anywhere in it, which the resolver needs before the body is parsed.
+
+  load() parses it when its function is first called, puts the tree in
+  the definition's body_node and runs the `passes` the resolver and
+  optimizer left for it. The outcome is kept, so this happens once.
+  """
+
+  __slots__ = (
+    'tokens', 'bound_names', 'definition', 'passes', 'body_node', 'error',
+    'position_start', 'position_end',
+  )
+
+  def __init__(self, tokens, bound_names, position_start, position_end):
+    self.tokens = tokens
+    self.bound_names = bound_names
+    self.definition = None
+    self.passes = []
+    self.body_node = None
+    self.error = None
+    self.position_start = position_start
+    self.position_end = position_end
+
+  def load(self):
+    """Returns (body node, error)."""
+    if self.body_node is None and self.error is None:
+      from parser import Parser
+
+      parseResult = Parser(self.tokens).lazy_body_statements()
+      self.error = parseResult.error
+      if not self.error:
+        self.definition.body_node = parseResult.node
+        for run_pass in self.passes:
+          self.error = run_pass()
+          if self.error: break
+
+      if self.error:
+        self.definition.body_node = self
+      else:
+        self.body_node = self.definition.body_node
+      self.passes = None
+    return self.body_node, self.error
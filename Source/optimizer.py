@@ -0,0 +1,223 @@
+#######################################
+# OPTIMIZER
+#######################################
+
+from tokens import *
+from nodes import *
+from values import Number, String
+from interpreter import binary_operation
+from resolver import SCOPE_BUILTIN
+
+# Folding `"ab" * 100000` would only move the work into a huge constant
+MAX_FOLDED_STRING_LENGTH = 1024
+# Nor is `10 ^ 10 ^ 10` worth working out before the program starts
+MAX_FOLDED_INT_BITS = 4096
+
+class Optimizer:
+  """
+  Folds constant expressions and prunes dead `if` branches before execution.
+
+  Operands are literals or builtins the resolver proved are never rebound
+  (true, false, null, math_pi). Builtins are only folded at the top level
+  of the program: a function body outlives it, and a later program sharing
+  the global table (the shell, run()) may rebind them. An operation is folded by running the same
+  Value method the engines would, so an operation that fails (division by
+  zero, an illegal operation) is left in place to fail at runtime with its
+  usual error and position. Folded literals span the expression they
+  replace, so errors involving them still point at the original source.
+  """
+
+  def __init__(self, global_symbol_table=None):
+    self.global_symbol_table = global_symbol_table
+    self.function_depth = 0
+
+  def optimize(self, node):
+    method_name = f'optimize_{type(node).__name__}'
+    method = getattr(self, method_name, None)
+    return method(node) if method else node
+
+  ###################################
+
+  def constant_value(self, node):
+    """Returns the value `node` always evaluates to, or None."""
+    if isinstance(node, NumberNode): return Number(node.token.value)
+    if isinstance(node, StringNode): return String(node.token.value)
+
+    if (isinstance(node, VarAccessNode) and node.scope == SCOPE_BUILTIN
+        and self.global_symbol_table and self.function_depth == 0):
+      value = self.global_symbol_table.get(node.variable_name_token.value)
+      if isinstance(value, Number): return value
+    return None
+
+  def literal_node(self, value, node):
+    """Returns a literal node for `value` spanning `node`, or None."""
+    if isinstance(value, Number):
+      token_type = TT_FLOAT if isinstance(value.value, float) else TT_INT
+      return NumberNode(Token(token_type, value.value, node.position_start, node.position_end))
+
+    if isinstance(value, String) and len(value.value) <= MAX_FOLDED_STRING_LENGTH:
+      return StringNode(Token(TT_STRING, value.value, node.position_start, node.position_end))
+    return None
+
+  def too_large(self, method_name, left, arguments):
+    """Whether the result of the operation would be too large to fold."""
+    if not arguments or not isinstance(arguments[0], Number): return False
+    right = arguments[0].value
+
+    if method_name == 'multiplied_by' and isinstance(left, String):
+      return isinstance(right, int) and len(left.value) * right > MAX_FOLDED_STRING_LENGTH
+
+    if method_name == 'powered_by' and type(left.value) is int and type(right) is int and right > 0:
+      return abs(left.value) > 1 and left.value.bit_length() * right > MAX_FOLDED_INT_BITS
+    return False
+
+  def fold(self, node, method_name, left, *arguments):
+    # The result is only worked out when it is small enough to keep, and an
+    # operation Python cannot do is left to fail when it runs, if it ever does
+    if self.too_large(method_name, left, arguments): return node
+    try:
+      result, error = getattr(left, method_name)(*arguments)
+    except (OverflowError, MemoryError, ValueError, ZeroDivisionError, TypeError):
+      return node
+    if error: return node
+    return self.literal_node(result, node) or node
+
+  ###################################
+
+  def optimize_ListNode(self, node):
+    node.element_nodes = [self.optimize(element_node) for element_node in node.element_nodes]
+    return node
+
+  def optimize_VarAssignNode(self, node):
+    node.value_node = self.optimize(node.value_node)
+    return node
+
+  def optimize_BinaryOperationNode(self, node):
+    node.left_node = self.optimize(node.left_node)
+    node.right_node = self.optimize(node.right_node)
+
+    left = self.constant_value(node.left_node)
+    right = self.constant_value(node.right_node)
+    if left is None or right is None: return node
+
+    method_name, _ = binary_operation(node.operation_token)
+    return self.fold(node, method_name, left, right)
+
+  def optimize_UnaryOpNode(self, node):
+    node.node = self.optimize(node.node)
+
+    if node.operation_token.type == TT_MINUS:
+      operand = self.constant_value(node.node)
+      if operand is None: return node
+      return self.fold(node, 'multiplied_by', operand, Number(-1))
+
+    if node.operation_token.matches(TT_KEYWORD, 'not'):
+      operand = self.constant_value(node.node)
+      if operand is None: return node
+      return self.fold(node, 'notted', operand)
+
+    # Unary plus evaluates to its operand unchanged
+    return node.node
+
+  def optimize_IfNode(self, node):
+    cases = []
+    else_case = None
+
+    # Bodies are only optimized once their case is known to be able to run
+    for condition, expression, should_return_null in node.cases:
+      condition = self.optimize(condition)
+
+      condition_value = self.constant_value(condition)
+      if condition_value is None:
+        cases.append((condition, self.optimize(expression), should_return_null))
+        continue
+
+      # A case that can never run is dropped; one that always runs ends the chain
+      if not condition_value.is_true(): continue
+      else_case = (self.optimize(expression), should_return_null)
+      break
+    else:
+      if node.else_case:
+        expression, should_return_null = node.else_case
+        else_case = (self.optimize(expression), should_return_null)
+
+    if cases:
+      node.cases = cases
+      node.else_case = else_case
+      return node
+
+    if else_case is None:
+      # No branch can run; keep one so the `if` still evaluates to null
+      node.cases = node.cases[:1]
+      node.else_case = None
+      return node
+
+    expression, should_return_null = else_case
+    if not should_return_null: return expression
+
+    # The taken branch still has to evaluate to null rather than its value
+    always = NumberNode(Token(TT_INT, 1, node.position_start, node.position_end))
+    node.cases = [(always, expression, True)]
+    node.else_case = None
+    return node
+
+  def optimize_ForNode(self, node):
+    node.start_value_node = self.optimize(node.start_value_node)
+    node.end_value_node = self.optimize(node.end_value_node)
+    if node.step_value_node:
+      node.step_value_node = self.optimize(node.step_value_node)
+    node.body_node = self.optimize(node.body_node)
+    return node
+
+  def optimize_WhileNode(self, node):
+    node.condition_node = self.optimize(node.condition_node)
+    node.body_node = self.optimize(node.body_node)
+    return node
+
+  def optimize_body(self, definition_node):
+    if type(definition_node.body_node) is LazyBodyNode:
+      # Optimized once it is parsed (see LazyBodyNode.load)
+      definition_node.body_node.passes.append(lambda: self.optimize_body(definition_node))
+    else:
+      self.function_depth += 1
+      try:
+        definition_node.body_node = self.optimize(definition_node.body_node)
+      finally:
+        self.function_depth -= 1
+
+  def optimize_FuncDefNode(self, node):
+    self.optimize_body(node)
+    return node
+
+  def optimize_CallNode(self, node):
+    node.node_to_call = self.optimize(node.node_to_call)
+    node.argument_nodes = [self.optimize(argument_node) for argument_node in node.argument_nodes]
+    return node
+
+  def optimize_ReturnNode(self, node):
+    if node.node_to_return:
+      node.node_to_return = self.optimize(node.node_to_return)
+    return node
+
+  def optimize_IndexNode(self, node):
+    node.list_or_string_node = self.optimize(node.list_or_string_node)
+    node.index_node = self.optimize(node.index_node)
+    return node
+
+  def optimize_ClassDefNode(self, node):
+    for method_node in node.method_nodes:
+      self.optimize_body(method_node)
+    return node
+
+  def optimize_InstanceCreationNode(self, node):
+    node.argument_nodes = [self.optimize(argument_node) for argument_node in node.argument_nodes]
+    return node
+
+  def optimize_AttributeAccessNode(self, node):
+    node.object_node = self.optimize(node.object_node)
+    return node
+
+  def optimize_MethodCallNode(self, node):
+    node.object_node = self.optimize(node.object_node)
+    node.argument_nodes = [self.optimize(argument_node) for argument_node in node.argument_nodes]
+    return node
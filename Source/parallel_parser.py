@@ -0,0 +1,153 @@
+#######################################
+# PARALLEL PARSER
+#######################################
+
+import copyreg
+import gc
+import io
+import multiprocessing
+import os
+import pickle
+import re
+from bisect import bisect_left
+
+from position import SourceText
+from lexer import Lexer, LEXER_START_STATE, next_lexer_state
+from parser import Parser
+from token_stream import TokenStream
+from nodes import ListNode
+
+# Where a file may be split: a `func` or `class` at the start of a line
+DEFINITION_PATTERN = re.compile(r'^(?:func|class)\b', re.MULTILINE)
+
+# Files smaller than this are parsed in one piece
+MINIMUM_CHUNK_SIZE = 16 * 1024
+
+def chunk_boundaries(text, chunk_count):
+  """Offsets of definitions that split `text` into about `chunk_count` chunks of equal size."""
+  definition_starts = [found.start() for found in DEFINITION_PATTERN.finditer(text)]
+  boundaries = [0]
+  for chunk in range(1, chunk_count):
+    next_start = bisect_left(definition_starts, len(text) * chunk // chunk_count)
+    if next_start < len(definition_starts) and definition_starts[next_start] > boundaries[-1]:
+      boundaries.append(definition_starts[next_start])
+  return boundaries
+
+class ChunkEnd:
+  """
+  Ends a chunk's statement list at the next chunk's first statement (see
+  Parser.more_statements), and checks the next chunk may be parsed on its
+  own: its first token must start a statement of this list, after a blank
+  line since the last function, and with no 'func' pending in the lexer.
+  """
+
+  def __init__(self, end):
+    self.end = end
+    self.parser = None
+    self.lexer_state = LEXER_START_STATE
+    self.reached = False
+    self.clean = False
+
+  def track(self, tokens):
+    for token in tokens:
+      if token.start < self.end: self.lexer_state = next_lexer_state(self.lexer_state, token)
+      yield token
+
+  def parsed(self, start, end, last_func_end_position, had_blank_line_after_func):
+    pass
+
+  def reuse(self, token_index, last_func_end_position, had_blank_line_after_func):
+    start = self.parser.current_token.start
+    if start < self.end: return False
+
+    self.reached = True
+    self.clean = start == self.end and had_blank_line_after_func and not self.lexer_state[1]
+    return True
+
+#######################################
+# WORKERS
+#######################################
+
+worker_source = None
+
+def start_worker(filename, text):
+  global worker_source
+  worker_source = SourceText(filename, text)
+
+def reduce_source(source):
+  # Every chunk would carry the whole text: the parent puts it back
+  return SourceText, (source.name, None)
+
+def parse_chunk(start, end):
+  """
+  Parses the statements from offset `start` up to `end` (None for the rest
+  of the file), returning them pickled, or None if the chunk can't be
+  parsed on its own or has an error.
+  """
+  source = worker_source
+  lexer = Lexer(source.name, source.text, source)
+  if end is None:
+    token_stream = TokenStream(lexer.generate_tokens(start))
+    result = Parser(token_stream).parse()
+    token_stream.drain()
+    if lexer.error: return None
+  else:
+    chunk_end = ChunkEnd(end)
+    parser = Parser(TokenStream(chunk_end.track(lexer.generate_tokens(start))))
+    chunk_end.parser = parser
+    result = parser.statements(chunk_end)
+    if not chunk_end.clean: return None
+  if result.error: return None
+
+  buffer = io.BytesIO()
+  pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+  pickler.dispatch_table = copyreg.dispatch_table.copy()
+  pickler.dispatch_table[SourceText] = reduce_source
+  pickler.dump(result.node)
+  return buffer.getvalue()
+
+def load_chunk(data, text):
+  chunk = pickle.loads(data)
+  chunk.position_start.source.text = text
+  return chunk
+
+#######################################
+# PARSE
+#######################################
+
+def parse(filename, text, workers=None):
+  """
+  Lexes and parses `text` across `workers` processes (every core by
+  default), returning (node, error) as ast_cache.parse does.
+
+  The file is split at top-level `func` and `class` definitions into a few
+  chunks per worker. Each worker lexes and parses its chunk in place in the
+  whole text, so positions need no adjusting, and the statement lists are
+  joined in order. If a split turns out not to fall between two top-level
+  statements the parser would have parsed the same way apart, or any chunk
+  has an error, the file is parsed again in one piece, so the result and
+  any error are always the ones a single parse gives.
+  """
+  import ast_cache
+
+  workers = workers or os.cpu_count() or 1
+  boundaries = chunk_boundaries(text, min(workers * 4, len(text) // MINIMUM_CHUNK_SIZE))
+  if workers < 2 or len(boundaries) < 2: return ast_cache.parse(filename, text)
+
+  chunks = list(zip(boundaries, boundaries[1:] + [None]))
+  with multiprocessing.Pool(min(workers, len(chunks)), start_worker, (filename, text)) as pool:
+    results = pool.starmap(parse_chunk, chunks)
+  if None in results: return ast_cache.parse(filename, text)
+
+  # As in ast_cache.load: loading only makes new objects
+  gc_was_enabled = gc.isenabled()
+  gc.disable()
+  try:
+    chunk_nodes = [load_chunk(data, text) for data in results]
+  finally:
+    if gc_was_enabled: gc.enable()
+
+  statements = []
+  for chunk_node in chunk_nodes:
+    statements.extend(chunk_node.element_nodes)
+  return ListNode(statements, chunk_nodes[0].position_start, chunk_nodes[-1].position_end), None
@@ -9,10 +9,40 @@ from nodes import *
 from utils import suggest_keyword
 from xml_doc_parser import XmlDocComment
 
+# The parser never backtracks: each production is picked from the current
+# token (and, at the end of a program, the one after it). These are the
+# tokens an expression can start with; a statement can also start with
+# 'return', 'continue' or 'break'. Anything else ends a statement list.
+EXPRESSION_START_TYPES = {
+  TT_INT, TT_FLOAT, TT_STRING, TT_IDENTIFIER,
+  TT_PLUS, TT_MINUS, TT_LEFT_PAREN, TT_LEFT_SQUARE,
+}
+EXPRESSION_START_KEYWORDS = {'var', 'class', 'not', 'if', 'for', 'while', 'func', 'new'}
+STATEMENT_START_KEYWORDS = EXPRESSION_START_KEYWORDS | {'return', 'continue', 'break'}
+
+# An identifier after one of these, or after a type ('int x'), is a name
+# being bound; see Parser.lazy_body
+BINDING_KEYWORDS = {'var', 'for', 'func', 'class'}
+
+# How tightly each operator below 'and'/'or' binds. The operand of a unary
+# '+' or '-', and of '*', '/' and '^', is parsed at FACTOR_PRECEDENCE.
+COMPARISON_PRECEDENCE = 1
+FACTOR_PRECEDENCE = 4
+BINARY_PRECEDENCE = {
+  TT_EQUAL_EQUAL: 1, TT_NOT_EQUAL: 1,
+  TT_LESS_THAN: 1, TT_GREATER_THAN: 1, TT_LESS_THAN_EQUAL: 1, TT_GREATER_THAN_EQUAL: 1,
+  TT_PLUS: 2, TT_MINUS: 2,
+  TT_MULTIPLY: 3, TT_DIVIDE: 3,
+  TT_POWER: 4,
+}
+
 class Parser:
-  def __init__(self, tokens):
+  def __init__(self, tokens, token_index=0, lazy_bodies=False):
+    # A list of tokens, or a TokenStream that only keeps the last few
     self.tokens = tokens
-    self.token_index = -1
+    self.token_index = token_index - 1
+    # Skip function bodies where possible (see lazy_body); needs a list of tokens
+    self.lazy_bodies = lazy_bodies
     self.advance()
 
   def advance(self):
@@ -20,25 +50,36 @@ class Parser:
     self.update_current_token()
     return self.current_token
 
-  def reverse(self, amount=1):
-    self.token_index -= amount
-    self.update_current_token()
-    return self.current_token
-
   def update_current_token(self):
-    if 0 <= self.token_index < len(self.tokens):
-      self.current_token = self.tokens[self.token_index]
+    token = self.token_at(self.token_index)
+    if token: self.current_token = token
+
+  def token_at(self, index):
+    if index < 0: return None
+    try:
+      return self.tokens[index]
+    except IndexError:
+      return None
 
   def peek_next_token(self):
     """Look ahead at the next token without advancing"""
-    peek_index = self.token_index + 1
-    if peek_index < len(self.tokens):
-      return self.tokens[peek_index]
-    return None
+    return self.token_at(self.token_index + 1)
 
-  def parse(self):
-    parseResult = self.statements()
+  def starts_expression(self):
+    token = self.current_token
+    if token.type == TT_KEYWORD: return token.value in EXPRESSION_START_KEYWORDS
+    return token.type in EXPRESSION_START_TYPES
 
+  def starts_statement(self):
+    token = self.current_token
+    if token.type == TT_KEYWORD: return token.value in STATEMENT_START_KEYWORDS
+    return token.type in EXPRESSION_START_TYPES
+
+  def parse(self, top_level=None):
+    return self.end_of_program(self.statements(top_level))
+
+  def end_of_program(self, parseResult):
+    """Fails `parseResult` if the program's statements stopped before the end of the file."""
     # Check for the special NO_BLANK_LINE token
     if not parseResult.error and self.current_token.type == TT_NO_BLANK_LINE:
       return parseResult.failure(InvalidSyntaxError(
@@ -76,9 +117,92 @@ class Parser:
 
     return parseResult
 
+  def lazy_body(self):
+    """
+    In lazy mode, skips the body of a function or method whose '{' is the
+    current token and returns a LazyBodyNode for it; returns None if the
+    body has to be parsed now.
+
+    The body is taken to run to the matching '}'. That is where parsing
+    would end it unless some block inside can end another way, so a body
+    with an 'end', a ':' block (ended by 'end' or by its enclosing block)
+    or an 'if'/'elif' block with '{' (ended by its enclosing block) is
+    parsed now.
+    """
+    if not self.lazy_bodies or self.current_token.type != TT_LEFT_BRACE: return None
+
+    tokens = self.tokens
+    start = index = self.token_index + 1
+    previous = self.current_token
+    depth = 0
+    in_if_header = False
+    bound_names = set()
+
+    while True:
+      token = tokens[index]
+      token_type = token.type
+
+      if token_type == TT_RIGHT_BRACE:
+        if depth == 0: break
+        depth -= 1
+      elif token_type == TT_LEFT_BRACE:
+        if in_if_header: return None
+        depth += 1
+      elif token_type == TT_NEWLINE:
+        if previous.type == TT_COLON: return None
+        in_if_header = False
+      elif token_type == TT_KEYWORD:
+        if token.value == 'if' or token.value == 'elif': in_if_header = True
+        elif token.value == 'end': return None
+        elif token.value == 'class': bound_names.add('self')
+      elif token_type == TT_IDENTIFIER:
+        if previous.type == TT_IDENTIFIER or (previous.type == TT_KEYWORD and previous.value in BINDING_KEYWORDS):
+          bound_names.add(token.value)
+      elif token_type == TT_END_OF_FILE or token_type == TT_NO_BLANK_LINE:
+        return None
+
+      previous = token
+      index += 1
+
+    # As the body would be parsed: from after the '{' and a newline
+    first_token = tokens[start + 1] if tokens[start].type == TT_NEWLINE else tokens[start]
+    closing_brace = tokens[index]
+
+    # The token after the '}' comes along, so the body is parsed seeing what it would have
+    body = LazyBodyNode(
+      tokens[start:index + 2], bound_names,
+      first_token.position_start.copy(), closing_brace.position_end.copy()
+    )
+    self.token_index = index
+    self.advance()
+    return body
+
+  def lazy_body_statements(self):
+    """Parses the tokens of a LazyBodyNode: a body's statements and its closing '}'."""
+    parseResult = ParseResult()
+
+    if self.current_token.type == TT_NEWLINE:
+      parseResult.register_advancement()
+      self.advance()
+
+    body = parseResult.register(self.statements())
+    if parseResult.error: return parseResult
+
+    if self.token_index != len(self.tokens) - 2:
+      return parseResult.failure(InvalidSyntaxError(
+        self.current_token.position_start, self.current_token.position_end,
+        "Expected '}' or 'end'"
+      ))
+    return parseResult.success(body)
+
   ###################################
 
-  def statements(self):
+  def statements(self, top_level=None):
+    """
+    Parses a list of statements. `top_level` is only given for the
+    program's own list: it is told where each statement starts and ends
+    (see more_statements).
+    """
     parseResult = ParseResult()
     statements = []
     position_start = self.current_token.position_start.copy()
@@ -101,17 +225,29 @@ class Parser:
       ))
 
     # Process the first statement
+    statement_start = self.token_index
     statement = parseResult.register(self.statement())
     if parseResult.error: return parseResult
     statements.append(statement)
+    if top_level: top_level.parsed(statement_start, self.token_index, last_func_end_position, had_blank_line_after_func)
 
     # Check if this statement is a function definition
     if isinstance(statement, FuncDefNode):
       last_func_end_position = statement.position_end
       had_blank_line_after_func = False  # Reset blank line flag after function
 
-    more_statements = True
+    return self.more_statements(parseResult, statements, position_start, last_func_end_position, had_blank_line_after_func, top_level)
 
+  def more_statements(self, parseResult, statements, position_start, last_func_end_position, had_blank_line_after_func, top_level=None):
+    """
+    Parses the rest of a statement list, after `statements`.
+
+    `top_level.reuse(token_index, last_func_end_position, had_blank_line_after_func)`
+    is asked before each statement is parsed: if it already has that
+    statement (and the ones after it) it returns True, and the list stops
+    there with the current token on it. `top_level.parsed` is told the
+    token range of each statement that is parsed.
+    """
     while True:
       # Count consecutive newlines
       newline_count = 0
@@ -142,19 +278,17 @@ class Parser:
           "Expected at least one blank line after this function definition"
         ))
 
-      if newline_count == 0:
-        more_statements = False
-
-      if not more_statements: break
+      # Statements are separated by newlines, and a token that can't start
+      # one ends the list ('}', 'end', 'else', ...)
+      if newline_count == 0 or not self.starts_statement(): break
+      if top_level and top_level.reuse(self.token_index, last_func_end_position, had_blank_line_after_func): break
 
       # Process the next statement
-      statement = parseResult.try_register(self.statement())
-      if not statement:
-        self.reverse(parseResult.to_reverse_count)
-        more_statements = False
-        continue
-
+      statement_start = self.token_index
+      statement = parseResult.register(self.statement())
+      if parseResult.error: return parseResult
       statements.append(statement)
+      if top_level: top_level.parsed(statement_start, self.token_index, last_func_end_position, had_blank_line_after_func)
 
       # Update tracking of function definitions
       if isinstance(statement, FuncDefNode):
@@ -177,8 +311,10 @@ class Parser:
       parseResult.register_advancement()
       self.advance()
 
-      expression = parseResult.try_register(self.expression())
-      if not expression: self.reverse(parseResult.to_reverse_count)
+      expression = None
+      if self.starts_expression():
+        expression = parseResult.register(self.expression())
+        if parseResult.error: return parseResult
       return parseResult.success(ReturnNode(expression, position_start, self.current_token.position_start.copy()))
 
     if self.current_token.matches(TT_KEYWORD, 'continue'):
@@ -295,7 +431,7 @@ class Parser:
       if parseResult.error: return parseResult
       return parseResult.success(UnaryOpNode(operation_token, node))
 
-    node = parseResult.register(self.binary_operation(self.arithmatic_expression, (TT_EQUAL_EQUAL, TT_NOT_EQUAL, TT_LESS_THAN, TT_GREATER_THAN, TT_LESS_THAN_EQUAL, TT_GREATER_THAN_EQUAL)))
+    node = parseResult.register(self.binary_expression(COMPARISON_PRECEDENCE))
 
     if parseResult.error:
       return parseResult.failure(InvalidSyntaxError(
@@ -305,27 +441,42 @@ class Parser:
 
     return parseResult.success(node)
 
-  def arithmatic_expression(self):
-    return self.binary_operation(self.term, (TT_PLUS, TT_MINUS))
-
-  def term(self):
-    return self.binary_operation(self.factor, (TT_MULTIPLY, TT_DIVIDE))
-
-  def factor(self):
+  def binary_expression(self, precedence):
+    """
+    Parses a chain of comparison and arithmetic operators that bind at
+    least as tightly as `precedence` (see BINARY_PRECEDENCE), by precedence
+    climbing: one loop iteration per operator rather than a call for every
+    level of the grammar between the comparison and the operand.
+    """
     parseResult = ParseResult()
     token = self.current_token
 
+    # Unary '+' and '-' take a power expression: -2 ^ 2 is -(2 ^ 2)
     if token.type in (TT_PLUS, TT_MINUS):
       parseResult.register_advancement()
       self.advance()
-      factor = parseResult.register(self.factor())
+      operand = parseResult.register(self.binary_expression(FACTOR_PRECEDENCE))
+      if parseResult.error: return parseResult
+      left = UnaryOpNode(token, operand)
+    else:
+      left = parseResult.register(self.call())
       if parseResult.error: return parseResult
-      return parseResult.success(UnaryOpNode(token, factor))
 
-    return self.power()
+    while True:
+      operation_token = self.current_token
+      operation_precedence = BINARY_PRECEDENCE.get(operation_token.type)
+      if operation_precedence is None or operation_precedence < precedence: break
+
+      parseResult.register_advancement()
+      self.advance()
+
+      # '^' is right associative, everything else associates to the left
+      if operation_token.type != TT_POWER: operation_precedence += 1
+      right = parseResult.register(self.binary_expression(operation_precedence))
+      if parseResult.error: return parseResult
+      left = BinaryOperationNode(left, operation_token, right)
 
-  def power(self):
-    return self.binary_operation(self.call, (TT_POWER, ), self.factor)
+    return parseResult.success(left)
 
   def call(self):
     parseResult = ParseResult()
@@ -841,7 +992,7 @@ class Parser:
             "Expected '{' or NEWLINE"
         ))
 
-    return res.success(WhileNode(condition, body))
+    return res.success(WhileNode(condition, body, True))
 
   def function_definition(self):
       parseResult = ParseResult()
@@ -989,6 +1140,17 @@ class Parser:
 
       # Multi-line function body
       elif self.current_token.type == TT_LEFT_BRACE or self.current_token.type == TT_COLON:
+          body = self.lazy_body()
+          if body:
+              parseResult.register_advancement()
+              return parseResult.success(FuncDefNode(
+                  variable_name_token,
+                  argument_name_tokens,
+                  body,
+                  False,
+                  argument_type_tokens
+              ))
+
           parseResult.register_advancement()
           self.advance()
 
@@ -1304,6 +1466,19 @@ class Parser:
 
     # Method body (similar to function definition)
     if self.current_token.type == TT_LEFT_BRACE or self.current_token.type == TT_COLON:
+      body = self.lazy_body()
+      if body:
+        parseResult.register_advancement()
+        return parseResult.success(MethodDefNode(
+          method_name_token,
+          argument_name_tokens,
+          body,
+          False,
+          argument_type_tokens,
+          None,
+          is_constructor
+        ))
+
       parseResult.register_advancement()
       self.advance()
 
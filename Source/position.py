@@ -2,23 +2,89 @@
 # POSITION
 #######################################
 
+from bisect import bisect_right
+
+class SourceText:
+  """A file's name and text, shared by every position in it."""
+
+  __slots__ = ('name', 'text', 'line_starts')
+
+  def __init__(self, name, text):
+    self.name = name
+    self.text = text
+    self.line_starts = None
+
+  def line_of(self, index):
+    # Only error reporting asks for lines, so the table is built on first use
+    if self.line_starts is None:
+      line_starts = [0]
+      newline = self.text.find('\n')
+      while newline >= 0:
+        line_starts.append(newline + 1)
+        newline = self.text.find('\n', newline + 1)
+      self.line_starts = line_starts
+
+    line_number = max(bisect_right(self.line_starts, index) - 1, 0)
+    return line_number, index - self.line_starts[line_number]
+
+# `line_column` of a position just past a newline it stepped over without
+# reading (the end of a newline token): it still reports the newline's line
+PAST_NEWLINE = 'past newline'
+
 class Position:
-  def __init__(self, index, line_number, column, function_name, function_text):
+  """
+  An offset into a source file; the line and column are worked out from it.
+
+  Every token holds two positions, so they keep nothing but the offset and
+  the shared SourceText. `line_column` is only set once a position stepped
+  over a newline without reading it, which keeps it on the newline's line.
+  """
+
+  __slots__ = ('index', 'source', 'line_column')
+
+  def __init__(self, index, source, line_column=None):
     self.index = index
-    self.line_number = line_number
-    self.column = column
-    self.function_name = function_name
-    self.function_text = function_text
+    self.source = source
+    self.line_column = line_column
 
-  def advance(self, current_character=None):
-    self.index += 1
-    self.column += 1
+  def __reduce__(self):
+    # Pickled as a call, not a class and a dict of slots: trees full of
+    # positions load in about half the time (see ast_cache, parallel_parser)
+    return Position, (self.index, self.source, self.line_column)
+
+  def line_and_column(self):
+    if self.line_column is None: return self.source.line_of(self.index)
+    # Compared by value: a position loaded by pickle has its own copy of the string
+    if self.line_column == PAST_NEWLINE:
+      line_number, column = self.source.line_of(self.index - 1)
+      return line_number, column + 1
+    return self.line_column
+
+  @property
+  def line_number(self):
+    return self.line_and_column()[0]
+
+  @property
+  def column(self):
+    return self.line_and_column()[1]
 
-    if current_character == '\n':
-      self.line_number += 1
-      self.column = 0
+  @property
+  def function_name(self):
+    return self.source.name
 
+  @property
+  def function_text(self):
+    return self.source.text
+
+  def advance(self, current_character=None):
+    if self.line_column is not None:
+      line_number, column = self.line_and_column()
+      self.line_column = (line_number + 1, 0) if current_character == '\n' else (line_number, column + 1)
+    elif current_character is None and 0 <= self.index < len(self.source.text) and self.source.text[self.index] == '\n':
+      self.line_column = PAST_NEWLINE
+
+    self.index += 1
     return self
 
   def copy(self):
-    return Position(self.index, self.line_number, self.column, self.function_name, self.function_text)
+    return Position(self.index, self.source, self.line_column)
@@ -0,0 +1,250 @@
+#######################################
+# RESOLVER
+#######################################
+
+from nodes import *
+from errors import ConstantReassignmentError
+
+# Every variable is addressed as (scope, slot). jcode scopes dynamically, so
+# a function can only address its own frame by index; names it does not
+# bind itself are looked up through its callers, unless no function binds
+# them at all, in which case they can only ever be globals or builtins.
+#
+# Programs sharing a global table (the shell, run()) call each other's
+# functions, so "no function" means none in any of them: the names every
+# program's functions bind are kept in the table's `frame_names`. A later
+# program can still add to it after a body is resolved, so engines check
+# it again when they read a global.
+
+SCOPE_LOCAL   = 'LOCAL'    # slot in the running function's frame
+SCOPE_GLOBAL  = 'GLOBAL'   # entry in the global symbol table, unless a frame binds the name
+SCOPE_BUILTIN = 'BUILTIN'  # builtin the program never rebinds, read at its top level
+SCOPE_DYNAMIC = 'DYNAMIC'  # bound by some function; found through the caller chain
+
+def child_nodes(node):
+  if isinstance(node, ListNode): return node.element_nodes
+  if isinstance(node, VarAssignNode): return [node.value_node]
+  if isinstance(node, BinaryOperationNode): return [node.left_node, node.right_node]
+  if isinstance(node, UnaryOpNode): return [node.node]
+  if isinstance(node, IfNode):
+    children = []
+    for condition, expression, _ in node.cases:
+      children.append(condition)
+      children.append(expression)
+    if node.else_case: children.append(node.else_case[0])
+    return children
+  if isinstance(node, ForNode):
+    return [child for child in (node.start_value_node, node.end_value_node, node.step_value_node, node.body_node) if child]
+  if isinstance(node, WhileNode): return [node.condition_node, node.body_node]
+  if isinstance(node, CallNode): return [node.node_to_call] + node.argument_nodes
+  if isinstance(node, ReturnNode): return [node.node_to_return] if node.node_to_return else []
+  if isinstance(node, IndexNode): return [node.list_or_string_node, node.index_node]
+  if isinstance(node, InstanceCreationNode): return node.argument_nodes
+  if isinstance(node, AttributeAccessNode): return [node.object_node]
+  if isinstance(node, MethodCallNode): return [node.object_node] + node.argument_nodes
+  return []
+
+def binding_name(node):
+  if isinstance(node, ClassDefNode): return node.class_name_token.value
+  return node.variable_name_token.value
+
+def scope_bindings(node, bindings=None):
+  """Collects the nodes that bind a name in the scope `node` runs in."""
+  if bindings is None: bindings = []
+
+  if isinstance(node, (VarAssignNode, ForNode)):
+    bindings.append(node)
+  elif isinstance(node, FuncDefNode):
+    if node.variable_name_token: bindings.append(node)
+    # Nested bodies run in their own frame
+    return bindings
+  elif isinstance(node, ClassDefNode):
+    bindings.append(node)
+    return bindings
+
+  for child in child_nodes(node):
+    scope_bindings(child, bindings)
+  return bindings
+
+def function_definitions(node, definitions=None):
+  """Collects every function and method definition, however deeply nested."""
+  if definitions is None: definitions = []
+
+  if isinstance(node, FuncDefNode):
+    definitions.append((node, [token.value for token in node.argument_name_tokens]))
+    function_definitions(node.body_node, definitions)
+  elif isinstance(node, ClassDefNode):
+    for method_node in node.method_nodes:
+      definitions.append((method_node, ['self'] + [token.value for token in method_node.argument_name_tokens]))
+      function_definitions(method_node.body_node, definitions)
+  else:
+    for child in child_nodes(node):
+      function_definitions(child, definitions)
+  return definitions
+
+class Scope:
+  def __init__(self, local_names=None, parent=None, allows_tail_calls=False, outer_constants=frozenset()):
+    self.parent = parent
+    self.allows_tail_calls = allows_tail_calls
+    # None for the program itself, whose variables are globals
+    self.slot_indices = None if local_names is None else {name: index for index, name in enumerate(local_names)}
+    # Constants the enclosing scopes had bound where this one is defined,
+    # and those this one has bound so far, in program order
+    self.outer_constants = outer_constants
+    self.constants = set()
+
+  def visible_constants(self):
+    return self.outer_constants | self.constants
+
+class Resolver:
+  """
+  Assigns every variable read and write a (scope, slot) address after parsing.
+
+  Function and method bodies get a frame layout (`local_names`) so engines
+  can keep their locals in an array, globals and untouched builtins are
+  reached directly, and reassigning a constant with '=' is reported here
+  instead of at runtime. `return f(...)` in a function body is marked as a
+  tail call.
+  """
+
+  def __init__(self, global_symbol_table=None, builtins=None):
+    self.global_symbol_table = global_symbol_table
+    self.builtins = builtins or {}
+
+  def resolve(self, node):
+    self.function_locals = set()
+    self.bound_names = {binding_name(binding) for binding in scope_bindings(node)}
+
+    for definition_node, argument_names in function_definitions(node):
+      self.function_locals.update(argument_names)
+      # A body not parsed yet only has the names it binds, nested functions' included
+      if type(definition_node.body_node) is LazyBodyNode:
+        self.function_locals.update(definition_node.body_node.bound_names)
+      else:
+        self.function_locals.update(binding_name(binding) for binding in scope_bindings(definition_node.body_node))
+    self.bound_names.update(self.function_locals)
+    if self.global_symbol_table is not None:
+      self.global_symbol_table.frame_names.update(self.function_locals)
+      self.function_locals = self.global_symbol_table.frame_names
+
+    self.scope = Scope()
+    return self.visit(node)
+
+  def visit(self, node):
+    method_name = f'visit_{type(node).__name__}'
+    method = getattr(self, method_name, self.visit_children)
+    return method(node)
+
+  def visit_children(self, node):
+    for child in child_nodes(node):
+      error = self.visit(child)
+      if error: return error
+    return None
+
+  ###################################
+
+  def lookup(self, name):
+    slot_indices = self.scope.slot_indices
+
+    if slot_indices is not None:
+      if name in slot_indices: return SCOPE_LOCAL, slot_indices[name]
+      if name in self.function_locals: return SCOPE_DYNAMIC, None
+      # A body outlives the program, and a later one may rebind the builtin
+      return SCOPE_GLOBAL, None
+
+    if self.is_untouched_builtin(name): return SCOPE_BUILTIN, None
+    return SCOPE_GLOBAL, None
+
+  def is_untouched_builtin(self, name):
+    if name not in self.builtins or name in self.bound_names: return False
+    # An earlier program sharing the global table (the shell, run()) may have rebound it
+    if self.global_symbol_table is None: return True
+    return self.global_symbol_table.symbols.get(name) is self.builtins[name]
+
+  def is_constant(self, name):
+    return name in self.scope.constants or name in self.scope.outer_constants
+
+  def bind(self, node, name_token, is_constant=False):
+    name = name_token.value
+
+    # Only '=' reassigns a constant; 'var' declares a fresh variable over it
+    if is_constant:
+      if self.is_constant(name):
+        return ConstantReassignmentError(name_token.position_start, name_token.position_end, name)
+      self.scope.constants.add(name)
+
+    if self.scope.slot_indices is None:
+      node.scope, node.slot = SCOPE_GLOBAL, None
+    else:
+      node.scope, node.slot = SCOPE_LOCAL, self.scope.slot_indices[name]
+    return None
+
+  def visit_function(self, node, argument_names, outer_constants=None):
+    if outer_constants is None: outer_constants = self.scope.visible_constants()
+
+    if type(node.body_node) is LazyBodyNode:
+      # Resolved once it is parsed, in the scope it is defined in and with
+      # the constants bound before its definition
+      scope = self.scope
+      node.body_node.passes.append(lambda: self.resume_function(node, argument_names, scope, outer_constants))
+      return None
+
+    local_names = list(argument_names)
+    for binding in scope_bindings(node.body_node):
+      if binding_name(binding) not in local_names: local_names.append(binding_name(binding))
+    node.local_names = local_names
+
+    self.scope = Scope(local_names, self.scope, not node.should_auto_return, outer_constants)
+    try:
+      return self.visit(node.body_node)
+    finally:
+      self.scope = self.scope.parent
+
+  def resume_function(self, node, argument_names, scope, outer_constants):
+    outer_scope, self.scope = self.scope, scope
+    try:
+      return self.visit_function(node, argument_names, outer_constants)
+    finally:
+      self.scope = outer_scope
+
+  ###################################
+
+  def visit_VarAccessNode(self, node):
+    node.scope, node.slot = self.lookup(node.variable_name_token.value)
+    return None
+
+  def visit_VarAssignNode(self, node):
+    error = self.visit(node.value_node)
+    if error: return error
+    return self.bind(node, node.variable_name_token, node.is_constant)
+
+  def visit_ForNode(self, node):
+    for child in (node.start_value_node, node.end_value_node, node.step_value_node):
+      if child:
+        error = self.visit(child)
+        if error: return error
+
+    error = self.bind(node, node.variable_name_token)
+    if error: return error
+    return self.visit(node.body_node)
+
+  def visit_ReturnNode(self, node):
+    node.is_tail_call = self.scope.allows_tail_calls and isinstance(node.node_to_return, (CallNode, MethodCallNode))
+    return self.visit_children(node)
+
+  def visit_FuncDefNode(self, node):
+    argument_names = [token.value for token in node.argument_name_tokens]
+    error = self.visit_function(node, argument_names)
+    if error: return error
+
+    if node.variable_name_token:
+      return self.bind(node, node.variable_name_token)
+    return None
+
+  def visit_ClassDefNode(self, node):
+    for method_node in node.method_nodes:
+      argument_names = ['self'] + [token.value for token in method_node.argument_name_tokens]
+      error = self.visit_function(method_node, argument_names)
+      if error: return error
+
+    return self.bind(node, node.class_name_token)
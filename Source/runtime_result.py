@@ -53,3 +53,51 @@ class RuntimeResult:
       self.loop_should_continue or
       self.loop_should_break
     )
+
+  def unwrap(self):
+    # Re-raises anything other than a plain value as the matching signal
+    if self.error: raise ErrorSignal(self.error)
+    if self.function_return_value: raise ReturnSignal(self.function_return_value)
+    if self.loop_should_continue: raise ContinueSignal()
+    if self.loop_should_break: raise BreakSignal()
+    return self.value
+
+  @staticmethod
+  def capture(run, context):
+    # Runs a signal-raising runner and reports the outcome as a RuntimeResult
+    try:
+      return RuntimeResult().success(run(context))
+    except ErrorSignal as signal:
+      return RuntimeResult().failure(signal.error)
+    except ReturnSignal as signal:
+      return RuntimeResult().success_return(signal.value)
+    except ContinueSignal:
+      return RuntimeResult().success_continue()
+    except BreakSignal:
+      return RuntimeResult().success_break()
+
+#######################################
+# SIGNALS
+#######################################
+
+# Engines that return values directly raise these instead of wrapping every
+# result; nothing is allocated for them unless control flow actually changes.
+
+class ControlFlowSignal(Exception):
+  pass
+
+class ErrorSignal(ControlFlowSignal):
+  def __init__(self, error):
+    super().__init__()
+    self.error = error
+
+class ReturnSignal(ControlFlowSignal):
+  def __init__(self, value):
+    super().__init__()
+    self.value = value
+
+class ContinueSignal(ControlFlowSignal):
+  pass
+
+class BreakSignal(ControlFlowSignal):
+  pass
@@ -7,27 +7,27 @@ class SymbolTable:
     self.symbols = {}
     self.constants = set()  # Track which symbols are constants
     self.parent = parent
+    # The global table at the end of the caller chain
+    self.root = parent.root if parent else self
+    if parent is None:
+      # Names a function frame binds, in any program run against this table;
+      # a caller's frame may hold one of these where the global table does not
+      self.frame_names = set()
 
   def get(self, name):
-    value = self.symbols.get(name, None)
-    if value is None and self.parent:
-      return self.parent.get(name)
-    return value
+    # Walked in a loop: tail calls let the caller chain grow far past Python's recursion limit
+    symbol_table = self
+    while symbol_table:
+      value = symbol_table.get_local(name)
+      if value is not None: return value
+      symbol_table = symbol_table.parent
+    return None
 
-  def set(self, name, value, is_constant=False):
-    # Check if trying to reassign a constant in the current scope
-    if name in self.constants:
-      # We'll raise a custom error that will be caught and converted to a proper error with position info
-      raise Exception(f"CONSTANT_REASSIGNMENT:{name}")
-
-    # Check parent scopes for constants with the same name
-    if self.parent and name not in self.symbols:
-      parent = self.parent
-      while parent:
-        if name in parent.constants:
-          raise Exception(f"CONSTANT_REASSIGNMENT:{name}")
-        parent = parent.parent
+  def get_local(self, name):
+    return self.symbols.get(name, None)
 
+  def set(self, name, value, is_constant=False):
+    # Reassigning a constant is rejected by the resolver before the program runs
     self.symbols[name] = value
 
     # If this is a constant, mark it
@@ -40,3 +40,34 @@ class SymbolTable:
       raise Exception(f"CONSTANT_REASSIGNMENT:{name}")
 
     del self.symbols[name]
+
+class FrameSymbolTable(SymbolTable):
+  """
+  A function frame whose compiled locals live in a fixed slot array.
+
+  Engines that resolve locals ahead of time read and write `slots` by index.
+  Lookups by name (from callees, builtins or nested definitions) still see
+  those locals, and names outside the layout behave like a plain SymbolTable.
+  """
+
+  def __init__(self, slot_indices, parent=None):
+    super().__init__(parent)
+    self.slot_indices = slot_indices
+    self.slots = [None] * len(slot_indices)
+
+  def get_local(self, name):
+    index = self.slot_indices.get(name)
+    if index is not None:
+      value = self.slots[index]
+      if value is not None: return value
+    return self.symbols.get(name, None)
+
+  def set(self, name, value, is_constant=False):
+    index = self.slot_indices.get(name)
+    if index is None:
+      return super().set(name, value, is_constant)
+
+    self.slots[index] = value
+
+    if is_constant:
+      self.constants.add(name)
@@ -0,0 +1,39 @@
+#######################################
+# TOKEN STREAM
+#######################################
+
+class TokenStream:
+  """
+  Tokens pulled from a generator (see Lexer.generate_tokens) as the parser
+  reaches them.
+
+  The parser never goes back, and looks at most one token past the current
+  one, so only the last `window` tokens are buffered. Parsing starts before
+  lexing finishes, and memory does not grow with the size of the file.
+  """
+
+  def __init__(self, tokens, window=2):
+    self.tokens = iter(tokens)
+    self.window = window
+    self.buffer = []
+    self.offset = 0  # Stream index of buffer[0]
+
+  def __getitem__(self, index):
+    buffer = self.buffer
+    buffer_index = index - self.offset
+    if buffer_index < 0:
+      raise Exception(f'Token {index} is no longer buffered')
+
+    while buffer_index >= len(buffer):
+      token = next(self.tokens, None)
+      if token is None: raise IndexError(index)
+      buffer.append(token)
+      if len(buffer) > self.window:
+        del buffer[0]
+        self.offset += 1
+        buffer_index -= 1
+    return buffer[buffer_index]
+
+  def drain(self):
+    """Lexes whatever the parser did not read, so a lexing error further on is still found."""
+    for _ in self.tokens: pass
@@ -2,6 +2,8 @@
 # TOKENS
 #######################################
 
+from position import Position
+
 TT_INT			            = 'INT'
 TT_FLOAT    	          = 'FLOAT'
 TT_STRING		            = 'STRING'
@@ -58,17 +60,40 @@ KEYWORDS = [
 ]
 
 class Token:
-  def __init__(self, type_, value=None, position_start=None, position_end=None):
+  """
+  A lexeme's type and value, plus where it starts and ends.
+
+  The lexer passes `source` and plain offsets into it, and a Position is
+  only made when the parser or an error asks for one. Tokens built from
+  existing Positions keep them as they are.
+  """
+
+  __slots__ = ('type', 'value', 'source', 'start', 'end')
+
+  def __init__(self, type_, value=None, position_start=None, position_end=None, source=None):
     self.type = type_
     self.value = value
+    self.source = source
+    self.start = position_start
+    self.end = position_end
+
+    if position_start is not None and position_end is None:
+      # A single-character token ends one past where it starts
+      self.end = position_start + 1 if source else position_start.copy().advance()
+
+  def __reduce__(self):
+    # As Position.__reduce__
+    return Token, (self.type, self.value, self.start, self.end, self.source)
 
-    if position_start:
-      self.position_start = position_start.copy()
-      self.position_end = position_start.copy()
-      self.position_end.advance()
+  @property
+  def position_start(self):
+    start = self.start
+    return Position(start, self.source) if type(start) is int else start
 
-    if position_end:
-      self.position_end = position_end.copy()
+  @property
+  def position_end(self):
+    end = self.end
+    return Position(end, self.source) if type(end) is int else end
 
   def matches(self, type_, value):
     return self.type == type_ and self.value == value
@@ -8,14 +8,21 @@ from runtime_result import *
 from errors import *
 from context import *
 from symbol_table import *
+from nodes import LazyBodyNode
 
 import math
+import operator
 import os
+from array import array
+from itertools import islice, repeat
 
 class Value:
+  __slots__ = ('position_start', 'position_end', 'context')
+
   def __init__(self):
-    self.set_position()
-    self.set_context()
+    self.position_start = None
+    self.position_end = None
+    self.context = None
 
   def set_position(self, position_start=None, position_end=None):
     self.position_start = position_start
@@ -65,7 +72,7 @@ class Value:
   def ored_by(self, other_number):
     return None, self.illegal_operation(other_number)
 
-  def notted(self, other_number):
+  def notted(self, other_number=None):
     return None, self.illegal_operation(other_number)
 
   def execute(self, node, arguments, position):
@@ -87,30 +94,42 @@ class Value:
     )
 
 class Number(Value):
+  __slots__ = ('value',)
+
   null: 'Number'
   false: 'Number'
   true: 'Number'
   math_PI: 'Number'
+  small_ints: 'list'
 
   def __init__(self, value):
-    super().__init__()
+    self.position_start = None
+    self.position_end = None
+    self.context = None
     self.value = value
 
+  @staticmethod
+  def of(value):
+    """Returns a Number for `value`, shared for small ints; never mutate the result."""
+    if type(value) is int and SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+      return Number.small_ints[value - SMALL_INT_MIN]
+    return Number(value)
+
   def added_to(self, other_number):
     if isinstance(other_number, Number):
-      return Number(self.value + other_number.value).set_context(self.context), None
+      return Number.of(self.value + other_number.value), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def subtracted_by(self, other_number):
     if isinstance(other_number, Number):
-      return Number(self.value - other_number.value).set_context(self.context), None
+      return Number.of(self.value - other_number.value), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def multiplied_by(self, other_number):
     if isinstance(other_number, Number):
-      return Number(self.value * other_number.value).set_context(self.context), None
+      return Number.of(self.value * other_number.value), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
@@ -123,68 +142,68 @@ class Number(Value):
           self.context
         )
 
-      return Number(self.value / other_number.value).set_context(self.context), None
+      return Number(self.value / other_number.value), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def powered_by(self, other_number):
     if isinstance(other_number, Number):
-      return Number(self.value ** other_number.value).set_context(self.context), None
+      return Number.of(self.value ** other_number.value), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def equals(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value == other_number.value)).set_context(self.context), None
+      return (Number.true if self.value == other_number.value else Number.false), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def not_equals(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value != other_number.value)).set_context(self.context), None
+      return (Number.true if self.value != other_number.value else Number.false), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def less_than(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value < other_number.value)).set_context(self.context), None
+      return (Number.true if self.value < other_number.value else Number.false), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def greater_than(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value > other_number.value)).set_context(self.context), None
+      return (Number.true if self.value > other_number.value else Number.false), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def less_than_or_equal_t(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value <= other_number.value)).set_context(self.context), None
+      return (Number.true if self.value <= other_number.value else Number.false), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def greater_than_or_equal_to(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value >= other_number.value)).set_context(self.context), None
+      return (Number.true if self.value >= other_number.value else Number.false), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def anded_by(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value and other_number.value)).set_context(self.context), None
+      return Number.of(int(self.value and other_number.value)), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
   def ored_by(self, other_number):
     if isinstance(other_number, Number):
-      return Number(int(self.value or other_number.value)).set_context(self.context), None
+      return Number.of(int(self.value or other_number.value)), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
-  def notted(self, other_number):
+  def notted(self, other_number=None):
     _ = other_number
-    if self.value == 0: return Number(1).set_context(self.context), None
-    else: return Number(0).set_context(self.context), None
+    if self.value == 0: return Number.true, None
+    else: return Number.false, None
 
   def copy(self):
     copy = Number(self.value)
@@ -201,16 +220,18 @@ class Number(Value):
   def __repr__(self):
     return str(self.value)
 
+# Numbers are never mutated once created, so counting loops and comparisons
+# can share one instance per small int; false and true are the shared 0 and 1.
+# null stays a distinct 0 so str() can tell it apart.
+SMALL_INT_MIN = -5
+SMALL_INT_MAX = 256
+
+Number.small_ints = [Number(value) for value in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)]
 Number.null = Number(0)
-Number.false = Number(0)
-Number.true = Number(1)
+Number.false = Number.of(0)
+Number.true = Number.of(1)
 Number.math_PI = Number(math.pi)
 
-# Mark the singleton objects
-Number.null._is_null_singleton = True
-Number.false._is_false_singleton = True
-Number.true._is_true_singleton = True
-
 class String(Value):
   def __init__(self, value):
     super().__init__()
@@ -243,22 +264,225 @@ class String(Value):
   def __repr__(self):
     return f'"{self.value}"'
 
+class ListStorage:
+  """
+  The items behind one or more Lists (see ListElements).
+
+  While every item is an int Number, or every one a float Number, only
+  the numbers are kept, packed in an array('q') or array('d'): 8 bytes an
+  item instead of a Number object each. Items are boxed into Numbers
+  again as they are read. The first item of any other kind (or an int
+  too big for 64 bits) unpacks them into a list of values for good.
+  `null` is kept boxed, since it is told apart from 0 by identity.
+
+  `shared` is set once a second list is made on the storage.
+  """
+
+  __slots__ = ('items', 'shared')
+
+  def __init__(self, values=()):
+    self.shared = False
+    if type(values) is array:
+      self.items = values
+      return
+    self.items = packed(values)
+    if self.items is None: self.items = list(values)
+
+  def box(self, number):
+    return Number.of(number) if self.items.typecode == 'q' else Number(number)
+
+  def unpack(self):
+    self.items = [self.box(number) for number in self.items]
+
+  def append(self, value):
+    items = self.items
+    if type(items) is not list:
+      if type(value) is Number and value is not Number.null:
+        number = value.value
+        number_type = type(number)
+        if number_type is (int if items.typecode == 'q' else float):
+          try:
+            items.append(number)
+            return
+          except OverflowError: pass
+        elif number_type is float and not items:
+          self.items = array('d', (number,))
+          return
+      self.unpack()
+    self.items.append(value)
+
+  def extend(self, elements):
+    """Adds the items of the ListElements `elements` at the end."""
+    items = self.items
+    other_items = elements.contents()
+    if other_items is items: other_items = other_items[:]
+
+    if type(items) is list:
+      if type(other_items) is list:
+        items.extend(other_items)
+        return
+    elif type(other_items) is not list and items.typecode == other_items.typecode:
+      items.extend(other_items)
+      return
+    for value in list(elements):
+      self.append(value)
+
+  def pop(self, index):
+    items = self.items
+    if type(items) is list: return items.pop(index)
+    return self.box(items.pop(index))
+
+class ListElements:
+  """
+  The elements of a List, used as a Python list of values: the first
+  `length` items of a ListStorage.
+
+  `list + value` and `list * other` make new elements on the same storage,
+  adding to it in place when the list ends where the storage does, so the
+  list added to keeps seeing only its own items and building a list with
+  '+' takes amortized O(1) a step. Elements that don't end at the end of
+  their storage copy it before adding to it, and pop copies a shared one
+  before changing it.
+  """
+
+  __slots__ = ('storage', 'length')
+
+  def __init__(self, values=()):
+    self.storage = ListStorage(values)
+    self.length = len(self.storage.items)
+
+  @staticmethod
+  def on(storage, length):
+    elements = ListElements.__new__(ListElements)
+    elements.storage = storage
+    elements.length = length
+    return elements
+
+  def contents(self):
+    """The packed array or list of values of these elements; only a copy if they are a prefix of their storage."""
+    items = self.storage.items
+    return items if len(items) == self.length else items[:self.length]
+
+  def copied(self):
+    return ListElements.on(ListStorage(self.contents()[:]), self.length)
+
+  def tail_storage(self):
+    """The storage, copied first unless these elements end where it does."""
+    storage = self.storage
+    if len(storage.items) != self.length:
+      storage = self.storage = ListStorage(self.contents())
+    return storage
+
+  def owned_storage(self):
+    """The storage, copied first if other elements share it."""
+    storage = self.storage
+    if storage.shared or len(storage.items) != self.length:
+      storage = self.storage = ListStorage(self.contents()[:])
+    return storage
+
+  def plus(self, value):
+    """New elements: these, then `value`."""
+    storage = self.tail_storage()
+    storage.shared = True
+    storage.append(value)
+    return ListElements.on(storage, self.length + 1)
+
+  def concatenated(self, elements):
+    """New elements: these, then the ListElements `elements`."""
+    length = self.length + elements.length
+    storage = self.tail_storage()
+    storage.shared = True
+    storage.extend(elements)
+    return ListElements.on(storage, length)
+
+  def append(self, value):
+    self.tail_storage().append(value)
+    self.length += 1
+
+  def extend(self, elements):
+    length = elements.length
+    self.tail_storage().extend(elements)
+    self.length += length
+
+  def pop(self, index):
+    value = self.owned_storage().pop(index)
+    self.length -= 1
+    return value
+
+  def __getitem__(self, index):
+    storage = self.storage
+    items = storage.items
+    length = self.length
+    if len(items) != length:
+      if index < 0: index += length
+      if index < 0 or index >= length: raise IndexError('list index out of range')
+    if type(items) is list: return items[index]
+    return storage.box(items[index])
+
+  def __len__(self):
+    return self.length
+
+  def __iter__(self):
+    items = self.storage.items
+    if type(items) is not list: items = map(self.storage.box, items)
+    return islice(items, self.length)
+
+def packed(values):
+  """An array('q') or array('d') of the numbers of `values`, or None if they can't all be packed."""
+  typecode = None
+  for value in values:
+    if type(value) is not Number or value is Number.null: return None
+    number_type = type(value.value)
+    # Ints and floats together are not packed: the ints would read back as floats
+    value_typecode = 'q' if number_type is int else 'd' if number_type is float else None
+    if value_typecode is None or (typecode is not None and value_typecode != typecode): return None
+    typecode = value_typecode
+
+  try:
+    return array(typecode or 'q', [value.value for value in values])
+  except OverflowError:
+    return None
+
+def list_numbers(list_):
+  """The numbers of `list_`'s elements (its packed array as it is), or None if one isn't a Number."""
+  items = list_.elements.contents()
+  if type(items) is not list: return items
+  if not all(isinstance(element, Number) for element in items): return None
+  return [element.value for element in items]
+
+def number_typecode(numbers):
+  """'q' or 'd' if `numbers` (an array, or one number) are ints or floats, None if that isn't known."""
+  if type(numbers) is array: return numbers.typecode
+  if type(numbers) is int: return 'q'
+  if type(numbers) is float: return 'd'
+  return None
+
+def number_list(numbers, typecode=None):
+  """A List of the ints and floats `numbers`, packed straight into an array of `typecode` if given."""
+  if typecode == 'd': return List(ListElements(array('d', numbers)))
+
+  numbers = list(numbers)
+  if typecode == 'q':
+    try:
+      return List(ListElements(array('q', numbers)))
+    except OverflowError: pass
+  return List([Number.of(number) if type(number) is int else Number(number) for number in numbers])
+
 class List(Value):
   def __init__(self, elements):
     super().__init__()
-    self.elements = elements
+    # Copies share the same elements
+    self.elements = elements if type(elements) is ListElements else ListElements(elements)
 
   def added_to(self, other_number):
-    new_list = self.copy()
-    new_list.elements.append(other_number)
-    return new_list, None
+    return List(self.elements.plus(other_number)), None
 
   def subtracted_by(self, other_number):
     if isinstance(other_number, Number):
-      new_list = self.copy()
+      elements = self.elements.copied()
       try:
-        new_list.elements.pop(other_number.value)
-        return new_list, None
+        elements.pop(other_number.value)
+        return List(elements), None
       except IndexError:
         return None, RuntimeError(
           other_number.position_start, other_number.position_end,
@@ -270,9 +494,7 @@ class List(Value):
 
   def multiplied_by(self, other_number):
     if isinstance(other_number, List):
-      new_list = self.copy()
-      new_list.elements.extend(other_number.elements)
-      return new_list, None
+      return List(self.elements.concatenated(other_number.elements)), None
     else:
       return None, Value.illegal_operation(self, other_number)
 
@@ -305,6 +527,108 @@ class List(Value):
   def __repr__(self):
     return f'[{", ".join([repr(string) for string in self.elements])}]'
 
+class Map(Value):
+  """
+  A hash map from Numbers and Strings to values.
+
+  `entries` is keyed by the keys' Python values, so a lookup is one dict
+  lookup: a Number and a String never share a key, and 1 and 1.0 are the
+  same key, as they are equal in jcode. Keys keep the order they were
+  first set in.
+  """
+
+  def __init__(self, entries=None):
+    super().__init__()
+    # Copies share the same entries
+    self.entries = {} if entries is None else entries
+
+  @staticmethod
+  def key(value):
+    """The entries key for `value`, or None if it cannot be a key."""
+    if isinstance(value, (Number, String)): return value.value
+    return None
+
+  @staticmethod
+  def key_value(key):
+    return String(key) if isinstance(key, str) else Number.of(key)
+
+  def keys(self):
+    return List([Map.key_value(key) for key in self.entries])
+
+  def divided_by(self, other_number):
+    key = Map.key(other_number)
+    if key is None:
+      return None, Value.illegal_operation(self, other_number)
+
+    value = self.entries.get(key)
+    if value is None:
+      return None, RuntimeError(
+        other_number.position_start, other_number.position_end,
+        f'Key {other_number!r} is not in map',
+        self.context
+      )
+    return value, None
+
+  def is_true(self):
+    return len(self.entries) > 0
+
+  def copy(self):
+    copy = Map(self.entries)
+    copy.set_position(self.position_start, self.position_end)
+    copy.set_context(self.context)
+    return copy
+
+  def __str__(self):
+    return repr(self)
+
+  def __repr__(self):
+    return f'{{{", ".join([f"{Map.key_value(key)!r}: {value!r}" for key, value in self.entries.items()])}}}'
+
+class StringBuilder(Value):
+  """
+  A string assembled from parts: append() adds a part and build() joins
+  them once, where adding each part to a String copies everything so far.
+  """
+
+  def __init__(self, parts=None):
+    super().__init__()
+    # Copies share the same parts
+    self.parts = [] if parts is None else parts
+
+  def build(self):
+    text = ''.join(self.parts)
+    # Later builds start from the joined text instead of every part again
+    self.parts[:] = [text]
+    return String(text)
+
+  def is_true(self):
+    return any(self.parts)
+
+  def copy(self):
+    copy = StringBuilder(self.parts)
+    copy.set_position(self.position_start, self.position_end)
+    copy.set_context(self.context)
+    return copy
+
+  def __repr__(self):
+    return f'<string builder of {sum(map(len, self.parts))} characters>'
+
+class LazyBodyRunner:
+  """
+  Stands in for the body runner of a function whose body is parsed on its
+  first call (see LazyBodyNode); load() makes the engine's runner then.
+  """
+
+  __slots__ = ('make_runner', 'runner')
+
+  def __init__(self, make_runner):
+    self.make_runner = make_runner
+    self.runner = None
+
+  def load(self):
+    if self.runner is None: self.runner = self.make_runner()
+    return self.runner
+
 class BaseFunction(Value):
   def __init__(self, name):
     super().__init__()
@@ -316,9 +640,32 @@ class BaseFunction(Value):
     if new_context.parent and new_context.parent.symbol_table:
         parent_symbol_table = new_context.parent.symbol_table
     else: parent_symbol_table = None
-    new_context.symbol_table = SymbolTable(parent_symbol_table)
+
+    # Bodies compiled with a local slot layout get an array-backed frame
+    slot_indices = getattr(getattr(self, 'body_runner', None), 'slot_indices', None)
+    if slot_indices is not None:
+      new_context.symbol_table = FrameSymbolTable(slot_indices, parent_symbol_table)
+    else:
+      new_context.symbol_table = SymbolTable(parent_symbol_table)
     return new_context
 
+  def run_body(self, execution_context):
+    # Engines that pre-compile function bodies attach a body runner;
+    # otherwise fall back to walking the body node
+    if self.body_runner:
+      return self.body_runner(execution_context)
+
+    from interpreter import Interpreter
+    return Interpreter().visit(self.body_node, execution_context)
+
+  def load_body(self):
+    # Parses a body left for the first call, returning its syntax error if it has one
+    body_node, error = self.body_node.load()
+    if error: return error
+    self.body_node = body_node
+    if type(self.body_runner) is LazyBodyRunner: self.body_runner = self.body_runner.load()
+    return None
+
   def check_arguments(self, argument_names, arguments, execution_context=None):
     runtimeResult = RuntimeResult()
 
@@ -342,10 +689,7 @@ class BaseFunction(Value):
 
   def populate_args(self, argument_names, arguments, execution_context):
     for i in range(len(arguments)):
-      argument_name = argument_names[i]
-      argument_value = arguments[i]
-      argument_value.set_context(execution_context)
-      execution_context.symbol_table.set(argument_name, argument_value)
+      execution_context.symbol_table.set(argument_names[i], arguments[i])
 
   def check_and_populate_args(self, argument_names, arguments, execution_context):
     runtimeResult = RuntimeResult()
@@ -354,35 +698,47 @@ class BaseFunction(Value):
     self.populate_args(argument_names, arguments, execution_context)
     return runtimeResult.success(None)
 
+  def call(self, arguments, position_start):
+    # A body that ends in `return f(...)` hands the call back as a TailCall;
+    # making it here keeps tail recursion at a constant Python stack depth
+    function = self
+    while True:
+      runtimeResult = RuntimeResult()
+      if type(function.body_node) is LazyBodyNode:
+        error = function.load_body()
+        if error: return runtimeResult.failure(error)
+      execution_context = function.generate_new_context(position_start)
+
+      runtimeResult.register(function.check_and_populate_args(function.argument_names, arguments, execution_context))
+      if runtimeResult.should_return(): return runtimeResult
+
+      value = runtimeResult.register(function.run_body(execution_context))
+      if runtimeResult.should_return() and runtimeResult.function_return_value is None: return runtimeResult
+
+      if function.should_auto_return: return_value = value
+      elif runtimeResult.function_return_value is not None:
+        return_value = runtimeResult.function_return_value
+      else: return_value = Number.null
+
+      if type(return_value) is not TailCall: return runtimeResult.success(return_value)
+      function, arguments, position_start = return_value.function, return_value.arguments, return_value.position_start
+
 class Function(BaseFunction):
-  def __init__(self, name, body_node, argument_names, should_auto_return):
+  def __init__(self, name, body_node, argument_names, should_auto_return, body_runner=None):
     super().__init__(name)
     self.body_node = body_node
     self.argument_names = argument_names
     self.should_auto_return = should_auto_return
+    self.body_runner = body_runner
 
   def execute(self, node, arguments, position_start):
-    from interpreter import Interpreter
     _ = node
-    runtimeResult = RuntimeResult()
-    interpreter = Interpreter()
-    execution_context = self.generate_new_context(position_start)
-
-    runtimeResult.register(self.check_and_populate_args(self.argument_names, arguments, execution_context))
-    if runtimeResult.should_return(): return runtimeResult
-
-    value = runtimeResult.register(interpreter.visit(self.body_node, execution_context))
-    if runtimeResult.should_return() and runtimeResult.function_return_value is None: return runtimeResult
-
-    if self.should_auto_return: return_value = value
-    elif runtimeResult.function_return_value is not None:
-      return_value = runtimeResult.function_return_value
-    else: return_value = Number.null
-
-    return runtimeResult.success(return_value)
+    return self.call(arguments, position_start)
 
   def copy(self):
-    copy = Function(self.name, self.body_node, self.argument_names, self.should_auto_return)
+    # Once loaded, the body is shared with every later copy
+    if type(self.body_node) is LazyBodyNode and self.body_node.body_node is not None: self.load_body()
+    copy = Function(self.name, self.body_node, self.argument_names, self.should_auto_return, self.body_runner)
     copy.set_context(self.context)
     copy.set_position(self.position_start, self.position_end)
     return copy
@@ -416,6 +772,24 @@ class BuiltInFunction(BaseFunction):
   getattr: 'BuiltInFunction'
   setattr: 'BuiltInFunction'
   str: 'BuiltInFunction'
+  list_add: 'BuiltInFunction'
+  list_mul: 'BuiltInFunction'
+  sum: 'BuiltInFunction'
+  min: 'BuiltInFunction'
+  max: 'BuiltInFunction'
+  dot: 'BuiltInFunction'
+  range: 'BuiltInFunction'
+  map_new: 'BuiltInFunction'
+  is_map: 'BuiltInFunction'
+  map_get: 'BuiltInFunction'
+  map_set: 'BuiltInFunction'
+  map_has: 'BuiltInFunction'
+  map_delete: 'BuiltInFunction'
+  map_keys: 'BuiltInFunction'
+  map_size: 'BuiltInFunction'
+  join: 'BuiltInFunction'
+  string_builder: 'BuiltInFunction'
+  build: 'BuiltInFunction'
 
   def __init__(self, name):
     super().__init__(name)
@@ -484,7 +858,7 @@ class BuiltInFunction(BaseFunction):
         break
       except ValueError:
         print(f"'{text}' must be an integer. Try again!")
-    return RuntimeResult().success(Number(number))
+    return RuntimeResult().success(Number.of(number))
   #execute_input_int.argument_names = []
 
   @argument_names()
@@ -523,10 +897,14 @@ class BuiltInFunction(BaseFunction):
     list_ = execution_context.symbol_table.get("list")
     value = execution_context.symbol_table.get("value")
 
+    if isinstance(list_, StringBuilder):
+      list_.parts.append(str(value))
+      return RuntimeResult().success(Number.null)
+
     if not isinstance(list_, List):
       return RuntimeResult().failure(RuntimeError(
         self.position_start, self.position_end,
-        "First argument must be list",
+        "First argument must be list or string builder",
         execution_context
       ))
 
@@ -598,9 +976,262 @@ class BuiltInFunction(BaseFunction):
         execution_context
       ))
 
-    return RuntimeResult().success(Number(len(list_.elements)))
+    return RuntimeResult().success(Number.of(len(list_.elements)))
   #execute_len.argument_names = ["list"]
 
+  # Bulk operations on lists of numbers, run over the whole list in one
+  # call instead of a jcode loop; packed lists are read without boxing
+
+  def get_numbers(self, execution_context, name, ordinal):
+    """The numbers of the list argument `name`, or an error."""
+    list_ = execution_context.symbol_table.get(name)
+
+    if not isinstance(list_, List):
+      return None, RuntimeError(
+        self.position_start, self.position_end,
+        f"{ordinal} must be list",
+        execution_context
+      )
+
+    numbers = list_numbers(list_)
+    if numbers is None:
+      return None, RuntimeError(
+        self.position_start, self.position_end,
+        f"{ordinal} must be a list of numbers",
+        execution_context
+      )
+    return numbers, None
+
+  def elementwise(self, execution_context, operation):
+    numbers, error = self.get_numbers(execution_context, "list", "First argument")
+    if error: return RuntimeResult().failure(error)
+
+    operand = execution_context.symbol_table.get("operand")
+    if isinstance(operand, Number):
+      operand_numbers = operand.value
+      results = map(operation, numbers, repeat(operand_numbers, len(numbers)))
+    elif isinstance(operand, List):
+      operand_numbers, error = self.get_numbers(execution_context, "operand", "Second argument")
+      if error: return RuntimeResult().failure(error)
+      if len(operand_numbers) != len(numbers):
+        return RuntimeResult().failure(RuntimeError(
+          self.position_start, self.position_end,
+          "Lists must be the same length",
+          execution_context
+        ))
+      results = map(operation, numbers, operand_numbers)
+    else:
+      return RuntimeResult().failure(RuntimeError(
+        self.position_start, self.position_end,
+        "Second argument must be list or number",
+        execution_context
+      ))
+
+    # Ints with ints give ints; any float makes every result a float
+    typecodes = (number_typecode(numbers), number_typecode(operand_numbers))
+    if None in typecodes: typecode = None
+    else: typecode = 'q' if typecodes == ('q', 'q') else 'd'
+    return RuntimeResult().success(number_list(results, typecode))
+
+  @argument_names('list', 'operand')
+  def execute_list_add(self, execution_context):
+    return self.elementwise(execution_context, operator.add)
+
+  @argument_names('list', 'operand')
+  def execute_list_mul(self, execution_context):
+    return self.elementwise(execution_context, operator.mul)
+
+  @argument_names('list')
+  def execute_sum(self, execution_context):
+    numbers, error = self.get_numbers(execution_context, "list", "Argument")
+    if error: return RuntimeResult().failure(error)
+    return RuntimeResult().success(Number.of(sum(numbers)))
+
+  def extreme(self, execution_context, function):
+    numbers, error = self.get_numbers(execution_context, "list", "Argument")
+    if error: return RuntimeResult().failure(error)
+
+    if not numbers:
+      return RuntimeResult().failure(RuntimeError(
+        self.position_start, self.position_end,
+        "Argument must not be an empty list",
+        execution_context
+      ))
+    return RuntimeResult().success(Number.of(function(numbers)))
+
+  @argument_names('list')
+  def execute_min(self, execution_context):
+    return self.extreme(execution_context, min)
+
+  @argument_names('list')
+  def execute_max(self, execution_context):
+    return self.extreme(execution_context, max)
+
+  @argument_names('listA', 'listB')
+  def execute_dot(self, execution_context):
+    numbersA, error = self.get_numbers(execution_context, "listA", "First argument")
+    if error: return RuntimeResult().failure(error)
+    numbersB, error = self.get_numbers(execution_context, "listB", "Second argument")
+    if error: return RuntimeResult().failure(error)
+
+    if len(numbersA) != len(numbersB):
+      return RuntimeResult().failure(RuntimeError(
+        self.position_start, self.position_end,
+        "Lists must be the same length",
+        execution_context
+      ))
+    return RuntimeResult().success(Number.of(sum(map(operator.mul, numbersA, numbersB))))
+
+  @argument_names('start', 'end')
+  def execute_range(self, execution_context):
+    start = execution_context.symbol_table.get("start")
+    end = execution_context.symbol_table.get("end")
+
+    if not (isinstance(start, Number) and type(start.value) is int and isinstance(end, Number) and type(end.value) is int):
+      return RuntimeResult().failure(RuntimeError(
+        self.position_start, self.position_end,
+        "Arguments must be integers",
+        execution_context
+      ))
+
+    # The numbers a 'for i = start to end' loop counts through
+    return RuntimeResult().success(List(ListElements(array('q', range(start.value, end.value)))))
+
+  # Maps: each lookup is one dict lookup, where a jcode loop over parallel
+  # key and value lists is a scan
+
+  def get_map(self, execution_context):
+    """The map argument, or an error."""
+    map_ = execution_context.symbol_table.get("map")
+
+    if not isinstance(map_, Map):
+      return None, RuntimeError(
+        self.position_start, self.position_end,
+        "First argument must be map",
+        execution_context
+      )
+    return map_, None
+
+  def get_map_key(self, execution_context):
+    """The map argument and the entries key of the key argument, or an error."""
+    map_, error = self.get_map(execution_context)
+    if error: return None, None, error
+
+    key = Map.key(execution_context.symbol_table.get("key"))
+    if key is None:
+      return None, None, RuntimeError(
+        self.position_start, self.position_end,
+        "Second argument must be number or string",
+        execution_context
+      )
+    return map_, key, None
+
+  def missing_key(self, execution_context):
+    return RuntimeResult().failure(RuntimeError(
+      self.position_start, self.position_end,
+      f"Key {execution_context.symbol_table.get('key')!r} is not in map",
+      execution_context
+    ))
+
+  @argument_names()
+  def execute_map_new(self, execution_context):
+    _ = execution_context
+    return RuntimeResult().success(Map())
+
+  @argument_names('value')
+  def execute_is_map(self, execution_context):
+    is_map = isinstance(execution_context.symbol_table.get("value"), Map)
+    return RuntimeResult().success(Number.true if is_map else Number.false)
+
+  @argument_names('map', 'key')
+  def execute_map_get(self, execution_context):
+    map_, key, error = self.get_map_key(execution_context)
+    if error: return RuntimeResult().failure(error)
+
+    value = map_.entries.get(key)
+    if value is None: return self.missing_key(execution_context)
+    return RuntimeResult().success(value)
+
+  @argument_names('map', 'key', 'value')
+  def execute_map_set(self, execution_context):
+    map_, key, error = self.get_map_key(execution_context)
+    if error: return RuntimeResult().failure(error)
+
+    map_.entries[key] = execution_context.symbol_table.get("value")
+    return RuntimeResult().success(Number.null)
+
+  @argument_names('map', 'key')
+  def execute_map_has(self, execution_context):
+    map_, key, error = self.get_map_key(execution_context)
+    if error: return RuntimeResult().failure(error)
+
+    return RuntimeResult().success(Number.true if key in map_.entries else Number.false)
+
+  @argument_names('map', 'key')
+  def execute_map_delete(self, execution_context):
+    map_, key, error = self.get_map_key(execution_context)
+    if error: return RuntimeResult().failure(error)
+
+    value = map_.entries.pop(key, None)
+    if value is None: return self.missing_key(execution_context)
+    return RuntimeResult().success(value)
+
+  @argument_names('map')
+  def execute_map_keys(self, execution_context):
+    map_, error = self.get_map(execution_context)
+    if error: return RuntimeResult().failure(error)
+
+    return RuntimeResult().success(map_.keys())
+
+  @argument_names('map')
+  def execute_map_size(self, execution_context):
+    map_, error = self.get_map(execution_context)
+    if error: return RuntimeResult().failure(error)
+
+    return RuntimeResult().success(Number.of(len(map_.entries)))
+
+  # Strings: join and build() make the result once, where a loop of '+'
+  # copies the whole string so far on every step
+
+  @argument_names('list', 'separator')
+  def execute_join(self, execution_context):
+    list_ = execution_context.symbol_table.get("list")
+    separator = execution_context.symbol_table.get("separator")
+
+    if not isinstance(list_, List):
+      return RuntimeResult().failure(RuntimeError(
+        self.position_start, self.position_end,
+        "First argument must be list",
+        execution_context
+      ))
+
+    if not isinstance(separator, String):
+      return RuntimeResult().failure(RuntimeError(
+        self.position_start, self.position_end,
+        "Second argument must be string",
+        execution_context
+      ))
+
+    return RuntimeResult().success(String(separator.value.join([str(element) for element in list_.elements])))
+
+  @argument_names()
+  def execute_string_builder(self, execution_context):
+    _ = execution_context
+    return RuntimeResult().success(StringBuilder())
+
+  @argument_names('builder')
+  def execute_build(self, execution_context):
+    builder = execution_context.symbol_table.get("builder")
+
+    if not isinstance(builder, StringBuilder):
+      return RuntimeResult().failure(RuntimeError(
+        self.position_start, self.position_end,
+        "Argument must be string builder",
+        execution_context
+      ))
+
+    return RuntimeResult().success(builder.build())
+
   @argument_names('function')
   def execute_run(self, execution_context):
     from main import run
@@ -742,12 +1373,8 @@ class BuiltInFunction(BaseFunction):
     value = execution_context.symbol_table.get("value")
 
     if isinstance(value, Number):
-      # Handle boolean values by checking value and context
-      if value.value == 1 and hasattr(value, '_is_true_singleton'):
-        return RuntimeResult().success(String("true"))
-      elif value.value == 0 and hasattr(value, '_is_false_singleton'):
-        return RuntimeResult().success(String("false"))
-      elif value.value == 0 and hasattr(value, '_is_null_singleton'):
+      # null is the one 0 that is not false
+      if value is Number.null:
         return RuntimeResult().success(String("null"))
       # Check by value for common boolean cases
       elif value.value == 1:
@@ -791,6 +1418,24 @@ BuiltInFunction.hasattr     = BuiltInFunction("hasattr")
 BuiltInFunction.getattr     = BuiltInFunction("getattr")
 BuiltInFunction.setattr     = BuiltInFunction("setattr")
 BuiltInFunction.str         = BuiltInFunction("str")
+BuiltInFunction.list_add    = BuiltInFunction("list_add")
+BuiltInFunction.list_mul    = BuiltInFunction("list_mul")
+BuiltInFunction.sum         = BuiltInFunction("sum")
+BuiltInFunction.min         = BuiltInFunction("min")
+BuiltInFunction.max         = BuiltInFunction("max")
+BuiltInFunction.dot         = BuiltInFunction("dot")
+BuiltInFunction.range       = BuiltInFunction("range")
+BuiltInFunction.map_new     = BuiltInFunction("map_new")
+BuiltInFunction.is_map      = BuiltInFunction("is_map")
+BuiltInFunction.map_get     = BuiltInFunction("map_get")
+BuiltInFunction.map_set     = BuiltInFunction("map_set")
+BuiltInFunction.map_has     = BuiltInFunction("map_has")
+BuiltInFunction.map_delete  = BuiltInFunction("map_delete")
+BuiltInFunction.map_keys    = BuiltInFunction("map_keys")
+BuiltInFunction.map_size    = BuiltInFunction("map_size")
+BuiltInFunction.join        = BuiltInFunction("join")
+BuiltInFunction.string_builder = BuiltInFunction("string_builder")
+BuiltInFunction.build       = BuiltInFunction("build")
 
 class Class(Value):
   def __init__(self, name, methods, parent_class=None):
@@ -811,7 +1456,6 @@ class Class(Value):
     return None
 
   def create_instance(self, arguments, position_start):
-    from interpreter import Interpreter
     runtimeResult = RuntimeResult()
 
     # Create new instance
@@ -820,8 +1464,11 @@ class Class(Value):
     # Look for constructor (__init__ method)
     constructor = self.get_method('__init__')
     if constructor:
+      if type(constructor.body_node) is LazyBodyNode:
+        error = constructor.load_body()
+        if error: return runtimeResult.failure(error)
+
       # Call constructor with instance as 'self'
-      interpreter = Interpreter()
       execution_context = constructor.generate_new_context(position_start)
 
       # Add 'self' as first argument (constructor already has 'self' in argument_names)
@@ -835,10 +1482,16 @@ class Class(Value):
       if runtimeResult.should_return(): return runtimeResult
 
       # Execute constructor body
-      value = runtimeResult.register(interpreter.visit(constructor.body_node, execution_context))
+      value = runtimeResult.register(constructor.run_body(execution_context))
       if runtimeResult.should_return() and runtimeResult.function_return_value is None:
         return runtimeResult
 
+      # The constructor's result is dropped, but a call it returns still has to run
+      tail_call = runtimeResult.function_return_value
+      if type(tail_call) is TailCall:
+        runtimeResult.register(tail_call.function.call(tail_call.arguments, tail_call.position_start))
+        if runtimeResult.should_return(): return runtimeResult
+
     return runtimeResult.success(instance)
 
   def copy(self):
@@ -883,36 +1536,23 @@ class Instance(Value):
     return f"<{self.class_def.name} instance>"
 
 class Method(BaseFunction):
-  def __init__(self, name, body_node, argument_names, should_auto_return, is_constructor=False):
+  def __init__(self, name, body_node, argument_names, should_auto_return, is_constructor=False, body_runner=None):
     super().__init__(name)
     self.body_node = body_node
     # Always include 'self' as the first parameter for methods
     self.argument_names = ['self'] + argument_names
     self.should_auto_return = should_auto_return
     self.is_constructor = is_constructor
+    self.body_runner = body_runner
 
   def execute(self, node, arguments, position_start):
-    from interpreter import Interpreter
     _ = node
-    runtimeResult = RuntimeResult()
-    interpreter = Interpreter()
-    execution_context = self.generate_new_context(position_start)
-
-    runtimeResult.register(self.check_and_populate_args(self.argument_names, arguments, execution_context))
-    if runtimeResult.should_return(): return runtimeResult
-
-    value = runtimeResult.register(interpreter.visit(self.body_node, execution_context))
-    if runtimeResult.should_return() and runtimeResult.function_return_value is None: return runtimeResult
-
-    if self.should_auto_return: return_value = value
-    elif runtimeResult.function_return_value is not None:
-      return_value = runtimeResult.function_return_value
-    else: return_value = Number.null
-
-    return runtimeResult.success(return_value)
+    return self.call(arguments, position_start)
 
   def copy(self):
-    copy = Method(self.name, self.body_node, self.argument_names, self.should_auto_return, self.is_constructor)
+    # Once loaded, the body is shared with every later copy
+    if type(self.body_node) is LazyBodyNode and self.body_node.body_node is not None: self.load_body()
+    copy = Method(self.name, self.body_node, self.argument_names, self.should_auto_return, self.is_constructor, self.body_runner)
     copy.set_context(self.context)
     copy.set_position(self.position_start, self.position_end)
     return copy
@@ -939,3 +1579,27 @@ class BoundMethod(Value):
 
   def __repr__(self):
     return f"<bound method {self.method.name} of {self.instance}>"
+
+class TailCall:
+  """
+  A call made in `return f(...)` position inside a function, returned
+  instead of made so the function returning it can make the call in its
+  own loop (see BaseFunction.call) rather than a nested Python frame.
+  """
+
+  __slots__ = ('function', 'arguments', 'position_start')
+
+  def __init__(self, function, arguments, position_start):
+    self.function = function
+    self.arguments = arguments
+    self.position_start = position_start
+
+  @staticmethod
+  def of(value_to_call, arguments, position_start):
+    """Returns the TailCall for calling `value_to_call`, or None to call it on the spot."""
+    if type(value_to_call) is BoundMethod:
+      return TailCall(value_to_call.method, [value_to_call.instance] + arguments, position_start)
+    if type(value_to_call) in (Function, Method):
+      return TailCall(value_to_call, arguments, position_start)
+    # Builtins run to completion without calling back into jcode functions
+    return None
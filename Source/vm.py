@@ -0,0 +1,412 @@
+#######################################
+# VIRTUAL MACHINE
+#######################################
+
+from runtime_result import RuntimeResult
+from values import *
+from errors import *
+from bytecode import *
+from interpreter import check_declared_type, index_into, positioned, operation_error, index_error, BINARY_OPERATION_HANDLERS
+
+# BINARY_OP's argument indexes both tuples
+BINARY_OPERATION_HANDLER_TABLE = tuple(BINARY_OPERATION_HANDLERS[method_name] for method_name in BINARY_OPERATION_METHODS)
+
+class CompiledBody:
+  """Runs a compiled function body; `slot_indices` gives its frame layout."""
+
+  def __init__(self, vm, code):
+    self.vm = vm
+    self.code = code
+    self.slot_indices = code.slot_indices
+
+  def __call__(self, context):
+    return self.vm.run(self.code, context)
+
+class VirtualMachine:
+  def __init__(self, global_symbol_table=None):
+    self.global_symbol_table = global_symbol_table
+
+  def compile(self, node):
+    return BytecodeCompiler(self.global_symbol_table).compile_program(node)
+
+  def execute(self, node, context):
+    return self.run(self.compile(node), context)
+
+  def run(self, code, context):
+    instructions = code.instructions
+    nodes = code.nodes
+    constants = code.constants
+    names = code.names
+    local_names = code.local_names
+    symbol_table = context.symbol_table
+    slots = getattr(symbol_table, 'slots', None)
+    global_symbols = self.global_symbol_table.symbols if self.global_symbol_table else None
+    frame_names = self.global_symbol_table.frame_names if self.global_symbol_table else None
+
+    stack = []
+    blocks = []  # (break target, continue target, stack depth, first body instruction)
+    signal = None
+    ip = 0
+    end = len(instructions)
+
+    while ip < end:
+      opcode = instructions[ip]
+      argument = instructions[ip + 1]
+      ip += 2
+
+      if opcode == LOAD_FAST:
+        value = slots[argument]
+        if value is None:
+          value = symbol_table.get(local_names[argument])
+        if value is None:
+          node = nodes[(ip - 2) >> 1]
+          return RuntimeResult().failure(RuntimeError(
+            node.position_start, node.position_end,
+            f"'{local_names[argument]}' is not defined",
+            context
+          ))
+        stack.append(value)
+
+      elif opcode == LOAD_NAME:
+        value = symbol_table.get(names[argument])
+        if value is None:
+          node = nodes[(ip - 2) >> 1]
+          return RuntimeResult().failure(RuntimeError(
+            node.position_start, node.position_end,
+            f"'{names[argument]}' is not defined",
+            context
+          ))
+        stack.append(value)
+
+      elif opcode == LOAD_GLOBAL:
+        # A later program's function may bind the name in a caller's frame
+        if names[argument] in frame_names: value = symbol_table.get(names[argument])
+        else: value = global_symbols.get(names[argument])
+        if value is None:
+          node = nodes[(ip - 2) >> 1]
+          return RuntimeResult().failure(RuntimeError(
+            node.position_start, node.position_end,
+            f"'{names[argument]}' is not defined",
+            context
+          ))
+        stack.append(value)
+
+      elif opcode == BINARY_OP:
+        right = stack.pop()
+        left = stack[-1]
+        result = BINARY_OPERATION_HANDLER_TABLE[argument](left, right)
+        if result is None:
+          return RuntimeResult().failure(operation_error(
+            BINARY_OPERATION_METHODS[argument], nodes[(ip - 2) >> 1], left, right, context
+          ))
+        stack[-1] = result
+
+      elif opcode == STORE_FAST:
+        slots[argument] = stack[-1]
+
+      elif opcode == STORE_NAME:
+        symbol_table.set(names[argument], stack[-1])
+
+      elif opcode == STORE_GLOBAL:
+        global_symbols[names[argument]] = stack[-1]
+
+      elif opcode == POP:
+        stack.pop()
+
+      elif opcode == JUMP:
+        ip = argument
+
+      elif opcode == POP_JUMP_IF_FALSE:
+        if not stack.pop().is_true(): ip = argument
+
+      elif opcode == FOR_ITER:
+        state = stack[-1]
+        index = state[1]
+        if not (index < state[2] if state[4] else index > state[2]):
+          ip = constants[argument][1]
+          continue
+
+        target = constants[argument][0]
+        if target >= 0:
+          slots[target] = Number.of(index)
+        else:
+          symbol_table.set(names[-1 - target], Number.of(index))
+        state[1] = index + state[3]
+
+      elif opcode == LOOP_APPEND:
+        value = stack.pop()
+        stack[-1][0].append(value)
+
+      elif opcode == CALL or opcode == TAIL_CALL:
+        node = nodes[(ip - 2) >> 1]
+        arguments = stack[len(stack) - argument:] if argument else []
+        if argument: del stack[len(stack) - argument:]
+
+        # The called copy carries the call site: its position for argument errors
+        # and the calling context, which becomes the parent scope of the call
+        value_to_call = stack[-1].copy().set_position(node.position_start, node.position_end).set_context(context)
+
+        # RETURN_VALUE hands a tail call to the returning function; see BaseFunction.call
+        tail_call = TailCall.of(value_to_call, arguments, node.position_start) if opcode == TAIL_CALL else None
+        if tail_call:
+          stack[-1] = tail_call
+          continue
+
+        # Distinguish between user-defined and built-in functions
+        if isinstance(value_to_call, BuiltInFunction):
+          result = value_to_call.execute(node, arguments, node.position_start)
+        else:
+          result = value_to_call.execute(None, arguments, node.position_start)
+
+        if result.should_return():
+          if result.error or result.function_return_value: return result
+          stack.pop()
+          signal = result
+        else:
+          stack[-1] = result.value
+
+      elif opcode == LOAD_STRING:
+        stack.append(String(constants[argument]))
+
+      elif opcode == LOAD_NULL:
+        stack.append(Number.null)
+
+      elif opcode == LOAD_CONST:
+        stack.append(constants[argument])
+
+      elif opcode == BUILD_LIST:
+        elements = stack[len(stack) - argument:] if argument else []
+        if argument: del stack[len(stack) - argument:]
+        stack.append(List(elements))
+
+      elif opcode == CHECK_TYPE:
+        error = check_declared_type(nodes[(ip - 2) >> 1], stack[-1], context)
+        if error: return RuntimeResult().failure(error)
+
+      elif opcode == UNARY_NEGATE:
+        number, error = stack[-1].multiplied_by(Number.of(-1))
+        if error:
+          _, error = positioned(stack[-1], nodes[(ip - 2) >> 1].node, context).multiplied_by(Number.of(-1))
+          return RuntimeResult().failure(error)
+        stack[-1] = number
+
+      elif opcode == UNARY_NOT:
+        number, error = stack[-1].notted()
+        if error:
+          _, error = positioned(stack[-1], nodes[(ip - 2) >> 1].node, context).notted()
+          return RuntimeResult().failure(error)
+        stack[-1] = number
+
+      elif opcode == FOR_PREPARE:
+        step_value = stack.pop()
+        end_value = stack.pop()
+        start_value = stack.pop()
+        ascending = step_value.value >= 0
+        stack.append([None if argument else [], start_value.value, end_value.value, step_value.value, ascending])
+
+      elif opcode == WHILE_PREPARE:
+        stack.append([None if argument else []])
+
+      elif opcode == SETUP_LOOP:
+        break_target, body_start = constants[argument]
+        blocks.append((break_target, ip, len(stack), body_start))
+
+      elif opcode == POP_BLOCK:
+        blocks.pop()
+
+      elif opcode == LOOP_END:
+        elements = stack[-1][0]
+        stack[-1] = Number.null if elements is None else List(elements)
+
+      elif opcode == BREAK:
+        signal = RuntimeResult().success_break()
+
+      elif opcode == CONTINUE:
+        signal = RuntimeResult().success_continue()
+
+      elif opcode == RETURN_VALUE:
+        return RuntimeResult().success_return(stack.pop())
+
+      elif opcode == INDEX:
+        node = nodes[(ip - 2) >> 1]
+        index = stack.pop()
+        result, error = index_into(node, stack[-1], index, context)
+        if error: return RuntimeResult().failure(index_error(node, stack[-1], index, context))
+        stack[-1] = result
+
+      elif opcode == MAKE_FUNCTION:
+        template = constants[argument]
+        node = template.node
+        stack.append(Function(
+          template.name, node.body_node, template.argument_names, node.should_auto_return,
+          self.body_for(template.code)
+        ).set_context(context).set_position(node.position_start, node.position_end))
+
+      elif opcode == MAKE_CLASS:
+        template = constants[argument]
+        node = template.node
+
+        # Get parent class if specified
+        parent_class = None
+        if node.parent_class_token:
+          parent_class_name = node.parent_class_token.value
+          parent_class = symbol_table.get(parent_class_name)
+          if parent_class is None:
+            return RuntimeResult().failure(RuntimeError(
+              node.parent_class_token.position_start, node.parent_class_token.position_end,
+              f"Parent class '{parent_class_name}' is not defined",
+              context
+            ))
+          if not isinstance(parent_class, Class):
+            return RuntimeResult().failure(RuntimeError(
+              node.parent_class_token.position_start, node.parent_class_token.position_end,
+              f"'{parent_class_name}' is not a class",
+              context
+            ))
+
+        methods = {}
+        for method_node, argument_names, method_code in template.methods:
+          method_name = method_node.method_name_token.value
+          methods[method_name] = Method(
+            method_name,
+            method_node.body_node,
+            argument_names,
+            method_node.should_auto_return,
+            method_node.is_constructor,
+            self.body_for(method_code)
+          ).set_context(context).set_position(method_node.position_start, method_node.position_end)
+
+        stack.append(Class(node.class_name_token.value, methods, parent_class).set_context(context).set_position(node.position_start, node.position_end))
+
+      elif opcode == LOAD_CLASS:
+        node = nodes[(ip - 2) >> 1]
+        class_name = names[argument]
+        class_def = symbol_table.get(class_name)
+
+        if class_def is None:
+          return RuntimeResult().failure(RuntimeError(
+            node.class_name_token.position_start, node.class_name_token.position_end,
+            f"Class '{class_name}' is not defined",
+            context
+          ))
+
+        if not isinstance(class_def, Class):
+          return RuntimeResult().failure(RuntimeError(
+            node.class_name_token.position_start, node.class_name_token.position_end,
+            f"'{class_name}' is not a class",
+            context
+          ))
+
+        stack.append(class_def)
+
+      elif opcode == NEW_INSTANCE:
+        node = nodes[(ip - 2) >> 1]
+        arguments = stack[len(stack) - argument:] if argument else []
+        if argument: del stack[len(stack) - argument:]
+
+        result = stack[-1].create_instance(arguments, node.position_start)
+        if result.should_return():
+          if result.error: return result
+          stack.pop()
+          signal = result
+        else:
+          stack[-1] = result.value
+
+      elif opcode == GET_ATTRIBUTE:
+        node = nodes[(ip - 2) >> 1]
+        obj = stack[-1]
+        attribute_name = node.attribute_name_token.value
+
+        if not isinstance(obj, Instance):
+          return RuntimeResult().failure(RuntimeError(
+            node.object_node.position_start, node.object_node.position_end,
+            f"Cannot access attribute of non-object",
+            context
+          ))
+
+        attribute = obj.get_attribute(attribute_name)
+        if attribute is None:
+          return RuntimeResult().failure(RuntimeError(
+            node.attribute_name_token.position_start, node.attribute_name_token.position_end,
+            f"'{obj.class_def.name}' object has no attribute '{attribute_name}'",
+            context
+          ))
+        stack[-1] = attribute
+
+      elif opcode == LOAD_METHOD:
+        node = nodes[(ip - 2) >> 1]
+        obj = stack[-1]
+        method_name = node.method_name_token.value
+
+        if not isinstance(obj, Instance):
+          return RuntimeResult().failure(RuntimeError(
+            node.object_node.position_start, node.object_node.position_end,
+            f"Cannot call method on non-object",
+            context
+          ))
+
+        method = obj.get_attribute(method_name)
+        if method is None:
+          return RuntimeResult().failure(RuntimeError(
+            node.method_name_token.position_start, node.method_name_token.position_end,
+            f"'{obj.class_def.name}' object has no method '{method_name}'",
+            context
+          ))
+
+        if not isinstance(method, BoundMethod):
+          return RuntimeResult().failure(RuntimeError(
+            node.method_name_token.position_start, node.method_name_token.position_end,
+            f"'{method_name}' is not a method",
+            context
+          ))
+
+        stack[-1] = method
+
+      elif opcode == CALL_METHOD or opcode == TAIL_CALL_METHOD:
+        node = nodes[(ip - 2) >> 1]
+        arguments = stack[len(stack) - argument:] if argument else []
+        if argument: del stack[len(stack) - argument:]
+
+        if opcode == TAIL_CALL_METHOD:
+          stack[-1] = TailCall.of(stack[-1], arguments, node.position_start)
+          continue
+
+        result = stack[-1].execute(node, arguments, node.position_start)
+        if result.should_return():
+          if result.error or result.function_return_value: return result
+          stack.pop()
+          signal = result
+        else:
+          stack[-1] = result.value
+
+      else:
+        raise Exception(f'Unknown opcode {opcode}')
+
+      if signal is not None:
+        # Unwind to the innermost loop whose body raised the break/continue;
+        # with no enclosing loop the signal propagates to the caller
+        at = ip - 2
+        while blocks and at < blocks[-1][3]:
+          blocks.pop()
+        if not blocks: return signal
+
+        break_target, continue_target, depth, _ = blocks[-1]
+        del stack[depth:]
+        if signal.loop_should_break:
+          blocks.pop()
+          ip = break_target
+        else:
+          ip = continue_target
+        signal = None
+
+    return RuntimeResult().success(stack[-1])
+
+  def body_for(self, code):
+    # One runner per code object, so every function built from it shares a frame layout
+    body = getattr(code, 'compiled_body', None)
+    if body is None:
+      if type(code) is LazyCode:
+        body = code.compiled_body = LazyBodyRunner(lambda: self.body_for(code.load()))
+      else:
+        body = code.compiled_body = CompiledBody(self, code)
+    return body
@@ -12,6 +12,7 @@ from values import *
 from parser import *
 from interpreter import *
 from lexer import *
+from ast_cache import parse_source
 
 global_symbol_table = SymbolTable()
 
@@ -40,29 +41,24 @@ builtins = {
 for name, value in builtins.items():
     global_symbol_table.set(name, value)
 
-def run(fn, text):
-    lexer = Lexer(fn, text)
-    tokens, error = lexer.Tokenize()
+def run(fn, text, use_cache=True):
+    node, error = parse_source(fn, text, use_cache)
     if error:
         return None, error
 
-    parser = Parser(tokens)
-    ast = parser.parse()
-    if ast.error:
-        return None, ast.error
-
     context = Context('<program>')
     context.symbol_table = global_symbol_table
-    result = Interpreter().visit(ast.node, context)
+    result = Interpreter().visit(node, context)
 
     return result.value, result.error
 
 def main():
-    if len(sys.argv) < 2:
-        print(f"Usage: python3 {os.path.basename(__file__)} <file.jc>")
+    arguments = [argument for argument in sys.argv[1:] if argument != "--no-cache"]
+    if len(arguments) < 1:
+        print(f"Usage: python3 {os.path.basename(__file__)} [--no-cache] <file.jc>")
         sys.exit(1)
 
-    filename = sys.argv[1]
+    filename = arguments[0]
 
     if not os.path.isfile(filename):
         print(f"File not found: {filename}")
@@ -71,7 +67,7 @@ def main():
     with open(filename, 'r', encoding='utf-8') as f:
         text = f.read()
 
-    value, error = run(filename, text)
+    value, error = run(filename, text, "--no-cache" not in sys.argv)
 
     if error:
         print(error.as_string() if hasattr(error, 'as_string') else str(error))